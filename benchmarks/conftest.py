@@ -0,0 +1,77 @@
+import pathlib
+import sys
+import textwrap
+import typing
+
+import pytest
+
+# Number of modules of the generated synthetic repos
+REPO_SIZES = [10, 100, 1000]
+
+MODULE_TEMPLATE = textwrap.dedent(
+    """
+    from mr import artifact
+    from mr import cached
+
+
+    @cached
+    def helper_{index}(size: int):
+        return size * {index}
+
+
+    @artifact
+    def part_{index}():
+        \"\"\"Part {index}\"\"\"
+        return helper_{index}(1)
+
+
+    @artifact(sample=True, short_desc="sample {index}", export_step=False)
+    def sample_{index}():
+        return helper_{index}(2)
+    """
+)
+
+
+def make_synthetic_repo(
+    root: pathlib.Path, package: str, module_count: int
+) -> pathlib.Path:
+    """Generate a repo with a package of ``module_count`` modules, spread in
+    subpackages of 100 modules, each with two artifacts and one cached function.
+    """
+    package_dir = root / package
+    package_dir.mkdir(parents=True)
+    (package_dir / "__init__.py").touch()
+    for index in range(module_count):
+        sub_dir = package_dir / f"sub{index // 100}"
+        if not sub_dir.exists():
+            sub_dir.mkdir()
+            (sub_dir / "__init__.py").touch()
+        (sub_dir / f"mod{index}.py").write_text(MODULE_TEMPLATE.format(index=index))
+    return root
+
+
+def unload_package(package: str):
+    for name in list(sys.modules):
+        if name == package or name.startswith(f"{package}."):
+            del sys.modules[name]
+
+
+@pytest.fixture(scope="session")
+def synthetic_repos(
+    tmp_path_factory: pytest.TempPathFactory,
+) -> typing.Iterator[dict[int, tuple[pathlib.Path, str]]]:
+    """Synthetic repos by module count, with the root folder and the package name.
+    The root folders are added to sys.path for importing the packages.
+    """
+    repos = {}
+    for size in REPO_SIZES:
+        package = f"synthetic_repo_{size}"
+        root = make_synthetic_repo(
+            tmp_path_factory.mktemp(f"repo_{size}"), package, size
+        )
+        repos[size] = (root, package)
+        sys.path.insert(0, str(root))
+    yield repos
+    for root, package in repos.values():
+        unload_package(package)
+        sys.path.remove(str(root))
@@ -0,0 +1,110 @@
+import importlib
+import pathlib
+import sys
+import typing
+
+import pytest
+
+from .conftest import REPO_SIZES
+from .conftest import unload_package
+from mr import Artifact
+from mr import cached
+from mr.config import ArtifactsConfig
+from mr.config import DefaultArtifactConfig
+from mr.config import RepoConfig
+from mr.discovery import discover
+from mr.registry import collect
+from mr.utils import apply_repo_config
+from mr.utils import load_module
+
+
+@cached
+def dispatched(value: int):
+    return value
+
+
+@pytest.mark.parametrize("size", REPO_SIZES)
+def test_collect(benchmark, synthetic_repos: dict, size: int):
+    """venusian scan of an already imported package."""
+    _, package = synthetic_repos[size]
+    module = importlib.import_module(package)
+    registry = benchmark(collect, [module])
+    assert sum(len(artifacts) for artifacts in registry.artifacts.values()) == 2 * size
+
+
+@pytest.mark.parametrize("size", REPO_SIZES)
+def test_collect_cold(benchmark, synthetic_repos: dict, size: int):
+    """Import and venusian scan of a package that is not imported yet."""
+    _, package = synthetic_repos[size]
+
+    def setup():
+        unload_package(package)
+        importlib.invalidate_caches()
+        return (package,), {}
+
+    def run(name: str):
+        return collect([importlib.import_module(name)])
+
+    registry = benchmark.pedantic(run, setup=setup, rounds=5)
+    assert sum(len(caches) for caches in registry.caches.values()) == size
+
+
+@pytest.mark.parametrize("size", REPO_SIZES)
+def test_discover(benchmark, synthetic_repos: dict, size: int):
+    """Static discovery of the repo without importing any module."""
+    root, _ = synthetic_repos[size]
+    registry = benchmark(discover, root)
+    assert sum(len(artifacts) for artifacts in registry.artifacts.values()) == 2 * size
+
+
+def test_load_module(benchmark, synthetic_repos: dict):
+    """Loading a single module file by path."""
+    root, package = synthetic_repos[REPO_SIZES[0]]
+    module_path = str(pathlib.Path(root) / package / "sub0" / "mod0.py")
+
+    def setup():
+        sys.modules.pop("mod0", None)
+        return (module_path,), {}
+
+    module = benchmark.pedantic(load_module, setup=setup, rounds=100)
+    assert hasattr(module, "part_0")
+
+
+@pytest.mark.parametrize("func_count", [0, 1, 10])
+def test_cached_dispatch(benchmark, func_count: int):
+    """Overhead of the cached wrapper with N lookup and store funcs."""
+    registry = collect([sys.modules[__name__]])
+    cached_obj = registry.caches[__name__]["dispatched"]
+    cached_obj.lookup_funcs[:] = [lambda args, kwargs: None] * func_count
+    cached_obj.store_funcs[:] = [lambda args, kwargs, result: False] * func_count
+    try:
+        assert benchmark(dispatched, 123) == 123
+    finally:
+        cached_obj.lookup_funcs.clear()
+        cached_obj.store_funcs.clear()
+
+
+@pytest.mark.parametrize("count", [1000, 10000])
+def test_apply_repo_config(benchmark, count: int):
+    """Applying repo config defaults over many artifacts."""
+    artifacts = [
+        Artifact(
+            module="mod",
+            name=f"artifact_{index}",
+            func=dispatched,
+            sample=False,
+            export_step=True if index % 2 else None,
+        )
+        for index in range(count)
+    ]
+    config = RepoConfig(
+        artifacts=ArtifactsConfig(
+            default_config=DefaultArtifactConfig(export_step=False, export_3mf=True)
+        )
+    )
+
+    def run(items: list[Artifact]) -> list[Artifact]:
+        return [apply_repo_config(artifact, config) for artifact in items]
+
+    resolved: typing.Any = benchmark(run, artifacts)
+    assert len(resolved) == count
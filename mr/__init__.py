@@ -1,14 +1,34 @@
-from .build_env import BuildEnv
-from .build_env import BuildEnvVars
-from .data_types import Artifact
-from .data_types import Cached
-from .data_types import Customizable
-from .data_types import Result
-from .decorator import artifact
-from .decorator import cached
-from .decorator import customizable
-from .exceptions import FieldError
-from .exceptions import GeneratorValidationError
+import importlib
+import typing
+
+if typing.TYPE_CHECKING:
+    from .build_env import BuildEnv
+    from .build_env import BuildEnvVars
+    from .data_types import Artifact
+    from .data_types import Cached
+    from .data_types import Customizable
+    from .data_types import Result
+    from .decorator import artifact
+    from .decorator import cached
+    from .decorator import customizable
+    from .exceptions import FieldError
+    from .exceptions import GeneratorValidationError
+
+# Public names and the modules defining them. They are imported lazily on first
+# access, so that applying the decorators doesn't pay for importing pydantic, etc.
+_LAZY_ATTRS = {
+    "Artifact": ".data_types",
+    "artifact": ".decorator",
+    "Cached": ".data_types",
+    "cached": ".decorator",
+    "Customizable": ".data_types",
+    "customizable": ".decorator",
+    "FieldError": ".exceptions",
+    "GeneratorValidationError": ".exceptions",
+    "Result": ".data_types",
+    "BuildEnvVars": ".build_env",
+    "BuildEnv": ".build_env",
+}
 
 __all__ = [
     "Artifact",
@@ -23,3 +43,17 @@ __all__ = [
     "BuildEnvVars",
     "BuildEnv",
 ]
+
+
+def __getattr__(name: str) -> typing.Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # Cache it in the module globals so that __getattr__ is not called again
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,232 @@
+import asyncio
+import concurrent.futures
+import dataclasses
+import multiprocessing.managers
+import time
+import traceback
+import typing
+
+from .build_engine import _build_artifact_with_limits
+from .build_engine import artifact_key
+from .build_engine import artifact_limits
+from .build_engine import BuildResult
+from .config import RepoConfig
+from .data_types import Artifact
+from .data_types import Customizable
+from .data_types import Result
+from .export import export_bytes
+from .export import ExportFormat
+from .generator import generate_model
+from .limits import ExecutionLimits
+from .limits import LimitKind
+from .registry import Registry
+from .utils import apply_repo_config
+from .validation import get_validator
+
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+
+
+def _call_artifact(func: typing.Callable) -> tuple[Result | None, str | None, float]:
+    start = time.perf_counter()
+    try:
+        value = func()
+    except Exception:
+        return None, traceback.format_exc(), time.perf_counter() - start
+    result = value if isinstance(value, Result) else Result(model=value)
+    return result, None, time.perf_counter() - start
+
+
+def _start_manager() -> multiprocessing.managers.SyncManager:
+    manager = multiprocessing.managers.SyncManager()
+    manager.start()
+    return manager
+
+
+def _artifact_limits(artifact: Artifact, timeout: float | None) -> ExecutionLimits:
+    limits = artifact_limits(artifact)
+    if timeout is None or (limits.timeout is not None and limits.timeout <= timeout):
+        return limits
+    return dataclasses.replace(limits, timeout=timeout)
+
+
+async def _build(
+    artifact: Artifact,
+    executor: concurrent.futures.Executor | None,
+    timeout: float | None,
+    cancel: typing.Any | None,
+) -> BuildResult:
+    loop = asyncio.get_running_loop()
+    limit_exceeded: LimitKind | None = None
+    try:
+        async with asyncio.timeout(timeout):
+            if cancel is None:
+                result, error, duration = await loop.run_in_executor(
+                    executor, _call_artifact, artifact.func
+                )
+            else:
+                # Functions are not sent across processes, the workers import them
+                # instead and build in a child process killed on timeout or once the
+                # cancel event is set, which keeps the worker available
+                (
+                    result,
+                    error,
+                    duration,
+                    limit_exceeded,
+                ) = await loop.run_in_executor(
+                    executor,
+                    _build_artifact_with_limits,
+                    artifact.module,
+                    artifact.name,
+                    _artifact_limits(artifact, timeout),
+                    None,
+                    None,
+                    cancel,
+                )
+    except TimeoutError:
+        if cancel is not None:
+            cancel.set()
+        return BuildResult(
+            artifact=artifact,
+            error=f"Timed out building {artifact_key(artifact)} after {timeout}s",
+            duration=timeout,
+            limit_exceeded=LimitKind.TIMEOUT,
+        )
+    except asyncio.CancelledError:
+        if cancel is not None:
+            cancel.set()
+        raise
+    except Exception:
+        return BuildResult(artifact=artifact, error=traceback.format_exc())
+    return BuildResult(
+        artifact=artifact,
+        result=result,
+        error=error,
+        duration=duration,
+        limit_exceeded=limit_exceeded,
+    )
+
+
+async def build_artifact(
+    artifact: Artifact,
+    executor: concurrent.futures.Executor | None = None,
+    timeout: float | None = None,
+    config: RepoConfig | None = None,
+) -> BuildResult:
+    """Build an artifact in the executor without blocking the event loop.
+
+    Failures of the artifact function and timeouts are returned as a failed
+    :class:`mr.build_engine.BuildResult`. On timeout or cancellation the call is
+    cancelled in the executor if it hasn't started yet. With a process pool
+    executor, the worker builds the artifact in a child process, which is killed on
+    timeout or cancellation so that the worker is free for the next call. A call
+    which is already running in a thread cannot be interrupted and finishes in the
+    background.
+
+    :param executor: The thread or process pool executor to run the artifact in, the
+        default executor of the event loop is used when not provided.
+    :param timeout: The max seconds to wait for the artifact.
+    :param config: The repo config to apply to the artifact.
+    """
+    if config is not None:
+        artifact = apply_repo_config(artifact, config)
+    if not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        return await _build(artifact, executor, timeout, None)
+    manager = await asyncio.to_thread(_start_manager)
+    try:
+        return await _build(artifact, executor, timeout, manager.Event())
+    finally:
+        manager.shutdown()
+
+
+async def build_all(
+    registry: Registry,
+    artifacts: list[Artifact] | None = None,
+    executor: concurrent.futures.Executor | None = None,
+    max_concurrency: int = 4,
+    timeout: float | None = None,
+    config: RepoConfig | None = None,
+) -> typing.AsyncIterator[BuildResult]:
+    """Build artifacts in the executor and yield their results as soon as they
+    finish.
+
+    At most ``max_concurrency`` artifacts are in flight at a time, the next one is
+    submitted only when one finishes. Closing the iterator or cancelling the task
+    iterating it cancels the artifacts in flight, see :func:`build_artifact`.
+
+    :param registry: The registry of collected artifacts.
+    :param artifacts: The artifacts to build, all of the artifacts in the registry
+        are built when not provided.
+    :param timeout: The max seconds to wait for each artifact.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    if artifacts is None:
+        artifacts = [
+            artifact
+            for module_artifacts in registry.artifacts.values()
+            for artifact in module_artifacts.values()
+        ]
+    if config is not None:
+        artifacts = [apply_repo_config(artifact, config) for artifact in artifacts]
+    pending_artifacts = iter(artifacts)
+    in_flight: set[asyncio.Task] = set()
+    # Cancel events of the builds in worker processes are shared through a manager
+    manager: multiprocessing.managers.SyncManager | None = None
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        manager = await asyncio.to_thread(_start_manager)
+
+    def submit_next() -> bool:
+        artifact = next(pending_artifacts, None)
+        if artifact is None:
+            return False
+        cancel = manager.Event() if manager is not None else None
+        in_flight.add(asyncio.create_task(_build(artifact, executor, timeout, cancel)))
+        return True
+
+    try:
+        while len(in_flight) < max_concurrency and submit_next():
+            pass
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.discard(task)
+                submit_next()
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if manager is not None:
+            manager.shutdown()
+
+
+def _generate(
+    customizable: Customizable, params: "BaseModel", export_format: ExportFormat
+) -> bytes:
+    return export_bytes(generate_model(customizable, params), export_format)
+
+
+async def generate(
+    customizable: Customizable,
+    parameters: str | bytes,
+    export_format: ExportFormat = ExportFormat.STEP,
+    executor: concurrent.futures.ThreadPoolExecutor | None = None,
+    timeout: float | None = None,
+) -> bytes:
+    """Validate the parameters JSON, then generate and export the model in the
+    executor without blocking the event loop. For a pool of warm worker processes,
+    use :meth:`mr.generator.GeneratorPool.submit` with :func:`asyncio.wrap_future`
+    instead.
+
+    :raises GeneratorValidationError: If the parameters are invalid, or the
+        customizable function rejects them with a ValueError.
+    :raises TimeoutError: If the generation takes longer than ``timeout`` seconds.
+    """
+    params = get_validator(customizable).validate_json(parameters)
+    loop = asyncio.get_running_loop()
+    async with asyncio.timeout(timeout):
+        return await loop.run_in_executor(
+            executor, _generate, customizable, params, export_format
+        )
@@ -0,0 +1,287 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import importlib
+import json
+import logging
+import multiprocessing
+import pathlib
+import shutil
+import sys
+import time
+import traceback
+import typing
+
+from . import constants
+from .config import RepoConfig
+from .data_types import Artifact
+from .data_types import Result
+from .limits import ExecutionLimits
+from .limits import LimitKind
+from .limits import run_with_limits
+from .registry import Registry
+from .utils import apply_pythonpaths
+from .utils import apply_repo_config
+
+# Python paths applied in the worker process, kept open for the worker's lifetime
+_worker_stack = contextlib.ExitStack()
+
+
+@dataclasses.dataclass(frozen=True)
+class BuildResult:
+    artifact: Artifact
+    result: Result | None = None
+    error: str | None = None
+    duration: float = 0.0
+    # True if the artifact was not built and its previous outputs are reused
+    reused: bool = False
+    # The execution limit the build was killed for exceeding
+    limit_exceeded: LimitKind | None = None
+    # Fingerprint of the built geometry and the export settings, see
+    # :func:`mr.incremental.geometry_fingerprint`
+    geometry: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def artifact_key(artifact: Artifact) -> str:
+    """Return the key identifying an artifact across builds, e.g. ``pkg.main:main``."""
+    return f"{artifact.module}:{artifact.name}"
+
+
+class DurationHistory:
+    """Historical build durations of artifacts stored as a JSON file."""
+
+    def __init__(self, path: str | pathlib.Path = constants.BUILD_DURATIONS_PATH):
+        self.logger = logging.getLogger(__name__)
+        self.path = pathlib.Path(path)
+        self.durations: dict[str, float] = {}
+        if self.path.exists():
+            try:
+                self.durations = json.loads(self.path.read_text())
+            except ValueError:
+                self.logger.warning(
+                    "Failed to load build durations from %s, ignored", self.path
+                )
+
+    def get(self, artifact: Artifact) -> float | None:
+        return self.durations.get(artifact_key(artifact))
+
+    def record(self, artifact: Artifact, duration: float):
+        self.durations[artifact_key(artifact)] = duration
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self.durations, indent=2, sort_keys=True))
+        tmp_path.replace(self.path)
+
+
+def schedule(artifacts: list[Artifact], history: DurationHistory) -> list[Artifact]:
+    """Order artifacts longest first by historical duration, so that the pool
+    picking them up in order packs the work evenly across workers. Artifacts
+    without history go first as their duration is unknown.
+    """
+
+    def key(artifact: Artifact) -> float:
+        duration = history.get(artifact)
+        return -duration if duration is not None else -float("inf")
+
+    return sorted(artifacts, key=key)
+
+
+def _init_worker(pythonpaths: list[str], repo_root: str | None):
+    _worker_stack.enter_context(
+        apply_pythonpaths(RepoConfig(pythonpaths=pythonpaths), repo_root=repo_root)
+    )
+
+
+def _resolve_func(module: str, name: str) -> typing.Callable:
+    module_obj = sys.modules.get(module)
+    if module_obj is None:
+        module_obj = importlib.import_module(module)
+    return getattr(module_obj, name)
+
+
+def _build_artifact(
+    module: str,
+    name: str,
+    mesh_tolerance: float | None = None,
+    mesh_directory: str | None = None,
+) -> tuple[Result | None, str | None, float]:
+    start = time.perf_counter()
+    try:
+        value = _resolve_func(module, name)()
+        result = value if isinstance(value, Result) else Result(model=value)
+        if mesh_tolerance is not None:
+            from .mesh import share
+
+            result = Result(
+                model=share(result.model, mesh_tolerance, mesh_directory),
+                versioned=share(result.versioned, mesh_tolerance, mesh_directory),
+            )
+    except Exception:
+        return None, traceback.format_exc(), time.perf_counter() - start
+    return result, None, time.perf_counter() - start
+
+
+def artifact_limits(artifact: Artifact) -> ExecutionLimits:
+    return ExecutionLimits(
+        timeout=artifact.timeout,
+        cpu_time=artifact.cpu_time,
+        max_memory=artifact.max_memory,
+    )
+
+
+def _build_artifact_with_limits(
+    module: str,
+    name: str,
+    limits: ExecutionLimits,
+    mesh_tolerance: float | None = None,
+    mesh_directory: str | None = None,
+    cancel: typing.Any | None = None,
+) -> tuple[Result | None, str | None, float, LimitKind | None]:
+    args = (module, name, mesh_tolerance, mesh_directory)
+    if not limits.enabled and cancel is None:
+        return *_build_artifact(*args), None
+    run = run_with_limits(_build_artifact, args, limits, cancel=cancel)
+    if run.cancelled:
+        return None, "Cancelled", run.duration, None
+    if run.exceeded is not None:
+        limit = getattr(limits, run.exceeded.value)
+        error = f"Exceeded the {run.exceeded.value} limit of {limit}"
+        return None, error, run.duration, run.exceeded
+    if run.error is not None:
+        return None, run.error, run.duration, None
+    return *run.value, None
+
+
+class BuildEngine:
+    """Build artifacts in parallel across a pool of worker processes.
+
+    The worker processes are reused across artifacts and across calls to
+    :meth:`build` until the engine is closed. Artifacts with execution limits are
+    built in a child process of the worker, which is killed once it exceeds the
+    limits.
+
+    When ``mesh_tolerance`` is set, the shapes built in the workers are tessellated
+    there and handed back as :class:`mr.mesh.SharedMesh` handles of memory-mapped
+    meshes instead of pickled shapes, which is much cheaper for big models when only
+    the 3MF outputs or previews are needed. STEP cannot be written from a mesh, so
+    the artifacts exporting STEP are handed back as shapes regardless. The handles
+    are released by :class:`mr.export.ExportPipeline` once exported; the ones left
+    are released when the engine is closed, after which they are no longer valid.
+    """
+
+    def __init__(
+        self,
+        config: RepoConfig,
+        max_workers: int | None = None,
+        repo_root: str | pathlib.Path | None = None,
+        history: DurationHistory | None = None,
+        mp_context: multiprocessing.context.BaseContext | None = None,
+        mesh_tolerance: float | None = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.mesh_tolerance = mesh_tolerance
+        # Folder of the shared mesh files of this engine, removed when closed
+        self.mesh_directory: str | None = None
+        if mesh_tolerance is not None:
+            from .mesh import make_directory
+
+            self.mesh_directory = str(make_directory())
+        self.history = history if history is not None else DurationHistory()
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(
+                list(config.pythonpaths),
+                str(repo_root) if repo_root is not None else None,
+            ),
+        )
+
+    def __enter__(self) -> typing.Self:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.mesh_directory is not None:
+            shutil.rmtree(self.mesh_directory, ignore_errors=True)
+            self.mesh_directory = None
+
+    def build(
+        self, registry: Registry, artifacts: list[Artifact] | None = None
+    ) -> typing.Iterator[BuildResult]:
+        """Build artifacts and yield their results as soon as they finish.
+
+        :param registry: The registry of collected artifacts.
+        :param artifacts: The artifacts to build, all of the artifacts in the registry
+            are built when not provided.
+        :return: An iterator of build results, in the order of completion.
+        """
+        if artifacts is None:
+            artifacts = [
+                artifact
+                for module_artifacts in registry.artifacts.values()
+                for artifact in module_artifacts.values()
+            ]
+        artifacts = [apply_repo_config(artifact, self.config) for artifact in artifacts]
+        futures: dict[concurrent.futures.Future, Artifact] = {}
+        for artifact in schedule(artifacts, self.history):
+            future = self.executor.submit(
+                _build_artifact_with_limits,
+                artifact.module,
+                artifact.name,
+                artifact_limits(artifact),
+                # STEP is exported from the shapes, not from meshes
+                None if artifact.export_step else self.mesh_tolerance,
+                self.mesh_directory,
+            )
+            futures[future] = artifact
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                artifact = futures[future]
+                try:
+                    result, error, duration, limit_exceeded = future.result()
+                except Exception:
+                    result, error, duration = None, traceback.format_exc(), 0.0
+                    limit_exceeded = None
+                if error is None:
+                    self.history.record(artifact, duration)
+                elif limit_exceeded is not None:
+                    self.logger.error(
+                        "Killed building artifact %s: %s", artifact_key(artifact), error
+                    )
+                else:
+                    self.logger.error(
+                        "Failed to build artifact %s", artifact_key(artifact)
+                    )
+                yield BuildResult(
+                    artifact=artifact,
+                    result=result,
+                    error=error,
+                    duration=duration,
+                    limit_exceeded=limit_exceeded,
+                )
+        finally:
+            for future in futures:
+                future.cancel()
+            self.history.save()
+
+
+def build_artifacts(
+    registry: Registry,
+    config: RepoConfig,
+    max_workers: int | None = None,
+    repo_root: str | pathlib.Path | None = None,
+) -> typing.Iterator[BuildResult]:
+    """Build all the artifacts in the registry in parallel with a one-off engine."""
+    with BuildEngine(config, max_workers=max_workers, repo_root=repo_root) as engine:
+        yield from engine.build(registry)
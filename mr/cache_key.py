@@ -0,0 +1,406 @@
+import dataclasses
+import enum
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import sys
+import threading
+import types
+import typing
+import weakref
+
+from .data_types import Cached
+from .data_types import Customizable
+
+# Code hashes of functions, computed once per process
+_code_hashes: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_code_hashes_lock = threading.Lock()
+_LIBRARY_PATHS: tuple[str, ...] | None = None
+
+
+def canonicalize(value: typing.Any) -> typing.Any:
+    """Convert a value into a JSON-serializable structure that is stable across
+    processes and runs, so it can be hashed as part of a cache key.
+
+    :param value: The value to canonicalize, usually a positional or keyword argument
+        of a cached function.
+    :return: A JSON-serializable representation of the value.
+    :raises TypeError: If the value has no stable representation (e.g. an arbitrary
+        object whose repr contains its memory address).
+    """
+    # Enums first, as the members of IntEnum and StrEnum are also ints and strs
+    if isinstance(value, enum.Enum):
+        return ["enum", _type_name(type(value)), canonicalize(value.value)]
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return ["float", value.hex()]
+    if isinstance(value, bytes):
+        return ["bytes", value.hex()]
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [canonicalize(item) for item in value]]
+    if isinstance(value, (set, frozenset)):
+        items = [canonicalize(item) for item in value]
+        return [type(value).__name__, sorted(items, key=_dumps)]
+    if isinstance(value, dict):
+        items = [[canonicalize(k), canonicalize(v)] for k, v in value.items()]
+        return ["dict", sorted(items, key=lambda item: _dumps(item[0]))]
+    if isinstance(value, pathlib.PurePath):
+        return ["path", str(value)]
+    # Only pydantic models can be instances of BaseModel, no need to import pydantic
+    # just for the check when it's not imported yet
+    pydantic = sys.modules.get("pydantic")
+    if pydantic is not None and isinstance(value, pydantic.BaseModel):
+        return ["model", _type_name(type(value)), value.model_dump(mode="json")]
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        fields = {
+            field.name: canonicalize(getattr(value, field.name))
+            for field in dataclasses.fields(value)
+        }
+        return ["dataclass", _type_name(type(value)), canonicalize(fields)]
+    raise TypeError(f"Cannot derive a stable cache key from value of {type(value)}")
+
+
+def decanonicalize(value: typing.Any) -> typing.Any:
+    """Convert a structure made by :func:`canonicalize` back into the value.
+
+    Only the builtin types and paths can be restored, as the structures of enums,
+    pydantic models and dataclasses only name their classes.
+
+    :raises ValueError: If the structure is invalid or cannot be restored.
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if not isinstance(value, list) or len(value) != 2:
+        raise ValueError(f"Invalid canonical value {value!r}")
+    tag, payload = value
+    if tag == "float" and isinstance(payload, str):
+        return float.fromhex(payload)
+    if tag == "bytes" and isinstance(payload, str):
+        return bytes.fromhex(payload)
+    if tag == "path" and isinstance(payload, str):
+        return pathlib.Path(payload)
+    if not isinstance(payload, list):
+        raise ValueError(f"Cannot restore canonical value of {tag!r}")
+    if tag in ("list", "tuple", "set", "frozenset"):
+        items = [decanonicalize(item) for item in payload]
+        return {"list": list, "tuple": tuple, "set": set, "frozenset": frozenset}[tag](
+            items
+        )
+    if tag == "dict":
+        if not all(isinstance(item, list) and len(item) == 2 for item in payload):
+            raise ValueError("Invalid canonical dict items")
+        return {decanonicalize(k): decanonicalize(v) for k, v in payload}
+    raise ValueError(f"Cannot restore canonical value of {tag!r}")
+
+
+def canonical_json(value: typing.Any) -> str:
+    """Return the canonicalized value as compact JSON with sorted keys, a string
+    that is stable across processes and runs to hash values with.
+
+    :raises TypeError: If the value cannot be canonicalized.
+    """
+    return _dumps(canonicalize(value))
+
+
+def _library_paths() -> tuple[str, ...]:
+    """Return the folders of the standard library and the installed packages."""
+    global _LIBRARY_PATHS
+    if _LIBRARY_PATHS is None:
+        import site
+        import sysconfig
+
+        paths = {
+            sysconfig.get_path(name)
+            for name in ("stdlib", "platstdlib", "purelib", "platlib")
+        }
+        paths.update(site.getsitepackages())
+        paths.add(site.getusersitepackages())
+        _LIBRARY_PATHS = tuple(
+            os.path.join(os.path.realpath(path), "") for path in paths if path
+        )
+    return _LIBRARY_PATHS
+
+
+def _is_repo_local(module_name: str | None) -> bool:
+    """Return True if the module is part of the user's repo, rather than this
+    library, the standard library or an installed package.
+    """
+    if not module_name or module_name.split(".")[0] == __package__:
+        return False
+    module = sys.modules.get(module_name)
+    filename = getattr(module, "__file__", None)
+    if filename is None:
+        return False
+    return not os.path.realpath(filename).startswith(_library_paths())
+
+
+def _const_payload(value: typing.Any) -> typing.Any:
+    if isinstance(value, types.CodeType):
+        return _code_payload(value)
+    try:
+        # Canonicalized, as the repr of a frozenset depends on the hash seed
+        return canonicalize(value)
+    except TypeError:
+        # The other literals of the code, like complex numbers and Ellipsis, have
+        # a stable repr
+        return repr(value)
+
+
+def _code_payload(code: types.CodeType) -> list:
+    # Line numbers are not part of co_code, so moving code around doesn't change it
+    return [
+        code.co_code.hex(),
+        [_const_payload(const) for const in code.co_consts],
+        list(code.co_names),
+    ]
+
+
+def _code_names(code: types.CodeType) -> set[str]:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _code_dependencies(
+    func: types.FunctionType,
+) -> typing.Iterator[tuple[dict, str, typing.Any]]:
+    """Yield the globals of the module defining them, a key and the values of the
+    globals, closure variables and default arguments a function refers to, including
+    the attributes with referenced names of the modules it refers to.
+    """
+    names = _code_names(func.__code__)
+    modules = []
+    for name in sorted(names):
+        if name in func.__globals__:
+            value = func.__globals__[name]
+            if isinstance(value, types.ModuleType):
+                modules.append(value)
+            yield func.__globals__, f"{func.__module__}.{name}", value
+    for index, cell in enumerate(func.__closure__ or ()):
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            # Empty cell
+            continue
+        yield (
+            func.__globals__,
+            f"{func.__module__}.{func.__qualname__}.<closure {index}>",
+            value,
+        )
+    for index, value in enumerate(func.__defaults__ or ()):
+        yield (
+            func.__globals__,
+            f"{func.__module__}.{func.__qualname__}.<default {index}>",
+            value,
+        )
+    for name, value in sorted((func.__kwdefaults__ or {}).items()):
+        yield (
+            func.__globals__,
+            f"{func.__module__}.{func.__qualname__}.<kwdefault {name}>",
+            value,
+        )
+    for module in modules:
+        if not _is_repo_local(module.__name__):
+            continue
+        for name in sorted(names):
+            if hasattr(module, name):
+                yield (
+                    vars(module),
+                    f"{module.__name__}.{name}",
+                    getattr(module, name),
+                )
+
+
+def _class_dependencies(cls: type) -> typing.Iterator[tuple[dict, str, typing.Any]]:
+    """Yield the globals of the module defining the class, a key and the values of
+    the base classes and the attributes of a class.
+    """
+    module = sys.modules.get(cls.__module__)
+    namespace = vars(module) if module is not None else {}
+    for index, base in enumerate(cls.__mro__[1:]):
+        yield namespace, f"{_type_name(cls)}.<base {index}>", base
+    for name, attr in sorted(vars(cls).items()):
+        if isinstance(attr, (staticmethod, classmethod)):
+            attr = attr.__func__
+        if isinstance(attr, property):
+            for accessor in ("fget", "fset", "fdel"):
+                value = getattr(attr, accessor)
+                if value is not None:
+                    yield namespace, f"{_type_name(cls)}.{name}.{accessor}", value
+            continue
+        # The attributes set up by python and ABCMeta rather than the class body
+        if not isinstance(attr, types.FunctionType) and (
+            (name.startswith("__") and name.endswith("__")) or name == "_abc_impl"
+        ):
+            continue
+        yield namespace, f"{_type_name(cls)}.{name}", attr
+
+
+def _module_source_hash(namespace: dict) -> str:
+    """Return the SHA-256 of the source file of the module with the globals.
+
+    :raises TypeError: If the module has no readable source file.
+    """
+    filename = namespace.get("__file__")
+    if filename is not None:
+        try:
+            return hashlib.sha256(pathlib.Path(filename).read_bytes()).hexdigest()
+        except OSError:
+            pass
+    raise TypeError(
+        f"Cannot derive a stable code hash from module {namespace.get('__name__')}"
+    )
+
+
+def _dependency_hash(func: types.FunctionType) -> str:
+    entries: list[list] = []
+    seen: set[int] = set()
+    queue: list[types.FunctionType] = [func]
+    while queue:
+        item = queue.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        entries.append(
+            [f"{item.__module__}.{item.__qualname__}", _code_payload(item.__code__)]
+        )
+        dependencies = list(_code_dependencies(item))
+        while dependencies:
+            namespace, key, value = dependencies.pop()
+            value = inspect.unwrap(value) if callable(value) else value
+            if isinstance(value, types.FunctionType):
+                if _is_repo_local(value.__module__):
+                    queue.append(value)
+                else:
+                    entries.append([key, ["ref", _type_name(value)]])
+            elif isinstance(value, type):
+                if not _is_repo_local(value.__module__):
+                    entries.append([key, ["ref", _type_name(value)]])
+                elif id(value) not in seen:
+                    seen.add(id(value))
+                    entries.append([key, ["class", _type_name(value)]])
+                    dependencies.extend(_class_dependencies(value))
+            elif isinstance(value, types.BuiltinFunctionType):
+                entries.append(
+                    [key, ["ref", f"{value.__module__}.{value.__qualname__}"]]
+                )
+            elif not isinstance(value, types.ModuleType) and _is_repo_local(
+                namespace.get("__name__")
+            ):
+                # Constants, closure variables, default arguments and class
+                # attributes of the repo. Values without a stable representation,
+                # like shapes, fall back to the source of the module defining them
+                try:
+                    entries.append([key, canonicalize(value)])
+                except TypeError:
+                    entries.append([key, ["source", _module_source_hash(namespace)]])
+    entries.sort(key=_dumps)
+    return hashlib.sha256(_dumps(entries).encode("utf8")).hexdigest()
+
+
+def code_hash(func: typing.Callable) -> str:
+    """Return a hash of the function's bytecode, combined with the bytecode of the
+    repo-local functions, classes (with their attributes and bases) and module
+    constants it refers to, found transitively via the names its code uses and its
+    default arguments.
+
+    The hash only changes when the logic of the function or of its repo-local
+    dependencies changes, not when unrelated code in the repo does. Functions from
+    this library, the standard library and installed packages are not followed. The
+    hash is computed once per function and process.
+
+    :raises TypeError: If the function is not a python function, or it refers to a
+        value without a stable representation from a module without source file.
+    """
+    func = inspect.unwrap(func)
+    if not isinstance(func, types.FunctionType):
+        raise TypeError(f"Cannot derive code hash from {func!r}")
+    with _code_hashes_lock:
+        value = _code_hashes.get(func)
+    if value is None:
+        value = _dependency_hash(func)
+        with _code_hashes_lock:
+            _code_hashes[func] = value
+    return value
+
+
+def make_call_key(cached: Cached, args: tuple, kwargs: dict) -> str:
+    """Make a canonical string identifying a call to a cached function within the
+    current process. Unlike :func:`make_cache_key`, it doesn't include the code hash.
+
+    :raises TypeError: If any of the arguments cannot be canonicalized.
+    """
+    return _dumps(
+        [cached.module, cached.name, canonicalize(args), canonicalize(kwargs)]
+    )
+
+
+def make_cache_key(cached: Cached, args: tuple, kwargs: dict) -> str:
+    """Make a content-addressed key for a call to a cached function.
+
+    The key is derived from the function's qualified name, its code hash and the
+    canonicalized arguments, so it stays the same across processes and runs as long
+    as neither the function nor the arguments change.
+
+    :param cached: The cached function object.
+    :param args: The positional arguments of the call.
+    :param kwargs: The keyword arguments of the call.
+    :return: The hex digest of the key.
+    :raises TypeError: If any of the arguments cannot be canonicalized.
+    """
+    payload = {
+        "func": f"{cached.module}.{getattr(cached.func, '__qualname__', cached.name)}",
+        "code": code_hash(cached.func),
+        "args": canonicalize(args),
+        "kwargs": canonicalize(kwargs),
+    }
+    return hashlib.sha256(_dumps(payload).encode("utf8")).hexdigest()
+
+
+def customizable_key_prefix(customizable: Customizable) -> dict:
+    """Return the part of the customizable output keys identifying the customizable
+    and its code, to be computed once for many keys of the same customizable.
+    """
+    return {
+        "customizable": f"{customizable.module}."
+        f"{getattr(customizable.func, '__qualname__', customizable.name)}",
+        "code": code_hash(customizable.func),
+    }
+
+
+def make_customizable_key(
+    customizable: Customizable,
+    parameters: typing.Any,
+    variant: str,
+    prefix: dict | None = None,
+) -> str:
+    """Make a content-addressed key for the output of a customizable.
+
+    :param customizable: The customizable object.
+    :param parameters: The validated instance of the customizable's parameters schema.
+    :param variant: The kind of output, e.g. the export format.
+    :param prefix: The customizable's :func:`customizable_key_prefix`, computed when
+        not provided.
+    :return: The hex digest of the key.
+    """
+    if prefix is None:
+        prefix = customizable_key_prefix(customizable)
+    payload = {
+        **prefix,
+        "parameters": canonicalize(parameters),
+        "variant": variant,
+    }
+    return hashlib.sha256(_dumps(payload).encode("utf8")).hexdigest()
+
+
+def _type_name(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _dumps(value: typing.Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
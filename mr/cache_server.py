@@ -0,0 +1,228 @@
+import argparse
+import hmac
+import http.server
+import json
+import logging
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import typing
+
+from .remote_cache import NAMESPACES
+
+# Keys are hex digests, which keeps them from escaping the storage folder
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{16,128}$")
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+
+    def log_message(self, format: str, *args: typing.Any):
+        self.server.logger.debug(format, *args)
+
+    def _entry_path(self) -> pathlib.Path | None:
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2:
+            return None
+        namespace, key = parts
+        if namespace not in NAMESPACES or not _KEY_PATTERN.match(key):
+            return None
+        return self.server.path / namespace / key[:2] / key
+
+    def _send(self, status: int, body: bytes = b"", content_type: str | None = None):
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes | None:
+        """Read the request body, or answer with an error and return None if its
+        length is missing or invalid.
+        """
+        content_length = self.headers.get("Content-Length")
+        if content_length is None:
+            self._send(411)
+            return None
+        try:
+            length = int(content_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send(400)
+            return None
+        return self.rfile.read(length)
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if token is None:
+            return True
+        authorization = self.headers.get("Authorization", "")
+        if hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            return True
+        self._send(401)
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        entry_path = self._entry_path()
+        if entry_path is None:
+            self._send(400)
+            return
+        try:
+            data = entry_path.read_bytes()
+        except FileNotFoundError:
+            self._send(404)
+            return
+        self._send(200, data, "application/octet-stream")
+
+    def do_PUT(self):
+        if not self._authorized():
+            return
+        entry_path = self._entry_path()
+        if entry_path is None:
+            self._send(400)
+            return
+        data = self._read_body()
+        if data is None:
+            return
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        # Concurrent uploads of the same key write the same content, the last rename
+        # wins and readers never see a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fo:
+                fo.write(data)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._send(204)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path.strip("/") != "find_missing":
+            self._send(404)
+            return
+        body = self._read_body()
+        if body is None:
+            return
+        try:
+            request = json.loads(body)
+            namespace = request["namespace"]
+            keys = request["keys"]
+        except (ValueError, KeyError, TypeError):
+            self._send(400)
+            return
+        if namespace not in NAMESPACES:
+            self._send(400)
+            return
+        missing = [
+            key
+            for key in keys
+            if not isinstance(key, str)
+            or not _KEY_PATTERN.match(key)
+            or not (self.server.path / namespace / key[:2] / key).exists()
+        ]
+        self._send(
+            200, json.dumps({"missing": missing}).encode("utf8"), "application/json"
+        )
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], path: pathlib.Path, token: str | None):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.token = token
+        super().__init__(address, _Handler)
+
+
+class CacheServer:
+    """File system backed server of the remote cache protocol spoken by
+    :class:`mr.remote_cache.RemoteCache`, for tests and for sharing a cache between
+    the machines of a local network.
+
+    Entries are stored as files under ``path``, sharded by the first two characters
+    of their keys. Entries are never evicted.
+
+    With a ``token``, requests without the ``Authorization: Bearer <token>`` header
+    are rejected with 401, pass it to the clients with the ``headers`` of
+    :class:`mr.remote_cache.RemoteCache`. The token is sent in clear text, serve it
+    behind a TLS proxy outside of a trusted network.
+    """
+
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str | None = None,
+    ):
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._server = _HTTPServer((host, port), self.path, token)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> typing.Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Serve a remote cache from a folder. Set the MR_CACHE_TOKEN "
+        "environment variable to require the token from the clients."
+    )
+    parser.add_argument("path", help="The folder to store the cache entries in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    # Read from the environment, as command line arguments are visible to all users
+    server = CacheServer(
+        args.path,
+        host=args.host,
+        port=args.port,
+        token=os.environ.get("MR_CACHE_TOKEN"),
+    )
+    print(f"Serving remote cache {args.path} at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from pydantic import BaseModel
+from pydantic import Field
+
+
+class DefaultArtifactConfig(BaseModel):
+    """Defaults used when the artifact decorator omits export_step, export_3mf or
+    the execution limits."""
+
+    export_step: bool = Field(
+        default=True,
+        description="The default `export_step` value for artifacts the value is not set on the artifact decorator.",
+    )
+    export_3mf: bool = Field(
+        default=True,
+        description="The default `export_3mf` value for artifacts the value is not set on the artifact decorator.",
+    )
+    timeout: float | None = Field(
+        default=None,
+        description="The default wall-clock timeout in seconds of building an artifact, no limit if not set.",
+    )
+    cpu_time: float | None = Field(
+        default=None,
+        description="The default CPU time limit in seconds of building an artifact, no limit if not set.",
+    )
+    max_memory: int | None = Field(
+        default=None,
+        description="The default cap in MiB of the resident memory of building an artifact, no limit if not set.",
+    )
+
+
+class ArtifactsConfig(BaseModel):
+    default_config: DefaultArtifactConfig = Field(
+        default_factory=DefaultArtifactConfig,
+        description="Defaults applied when not set on the artifact decorator",
+    )
+
+
+class RepoConfig(BaseModel):
+    """Repo-level config loaded from .makerrepo/config.yaml (or REPO_CONFIG_PATH)."""
+
+    pythonpaths: list[str] = Field(
+        default_factory=list,
+        description=(
+            "A list of paths to prepend to sys.path before importing user code. "
+            "Useful for src/ layouts (e.g. add 'src')."
+        ),
+    )
+    artifacts: ArtifactsConfig | None = Field(
+        default=None, description="Artifacts section"
+    )
@@ -6,3 +6,13 @@ MR_CUSTOMIZABLE_CATEGORY = "mr_customizable"
 MR_CACHE_CATEGORY = "mr_cache"
 # The default path to the repo config file.
 REPO_CONFIG_PATH = ".makerrepo/config.yaml"
+# The default path to the on-disk cache of cached functions.
+DISK_CACHE_PATH = ".makerrepo/cache"
+# The default path to the file recording historical build durations of artifacts.
+BUILD_DURATIONS_PATH = ".makerrepo/build_durations.json"
+# The default path to the discovery index file.
+DISCOVERY_INDEX_PATH = ".makerrepo/discovery_index.json"
+# The default path to the cache of generated customizable outputs.
+RESULT_CACHE_PATH = ".makerrepo/result_cache"
+# The default path to the file recording the request frequency of customizables.
+REQUEST_LOG_PATH = ".makerrepo/request_log.json"
@@ -1,8 +1,12 @@
 import dataclasses
 import typing
 
-from pydantic import BaseModel
-from pydantic import Field
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+
+# The repo config models are defined with pydantic in the config module, they are
+# loaded lazily so that importing the data types doesn't import pydantic
+_CONFIG_TYPES = frozenset(["ArtifactsConfig", "DefaultArtifactConfig", "RepoConfig"])
 
 
 @dataclasses.dataclass(frozen=True)
@@ -18,6 +22,10 @@ class Artifact:
     lineno: int | None = None
     export_step: bool | None = None
     export_3mf: bool | None = None
+    # Execution limits, the repo config defaults apply when not set
+    timeout: float | None = None
+    cpu_time: float | None = None
+    max_memory: int | None = None
 
 
 @dataclasses.dataclass(frozen=True)
@@ -25,8 +33,8 @@ class Customizable:
     module: str
     name: str
     func: typing.Callable
-    parameters_schema: typing.Type[BaseModel]
-    sample_parameters: BaseModel | None = None
+    parameters_schema: typing.Type["BaseModel"]
+    sample_parameters: "BaseModel | None" = None
     desc: str | None = None
     short_desc: str | None = None
     filepath: str | None = None
@@ -52,36 +60,9 @@ class Result:
     versioned: typing.Any = None
 
 
-class DefaultArtifactConfig(BaseModel):
-    """Defaults used when the artifact decorator omits export_step or export_3mf."""
-
-    export_step: bool = Field(
-        default=True,
-        description="The default `export_step` value for artifacts the value is not set on the artifact decorator.",
-    )
-    export_3mf: bool = Field(
-        default=True,
-        description="The default `export_3mf` value for artifacts the value is not set on the artifact decorator.",
-    )
-
-
-class ArtifactsConfig(BaseModel):
-    default_config: DefaultArtifactConfig = Field(
-        default_factory=DefaultArtifactConfig,
-        description="Defaults applied when not set on the artifact decorator",
-    )
-
-
-class RepoConfig(BaseModel):
-    """Repo-level config loaded from .makerrepo/config.yaml (or REPO_CONFIG_PATH)."""
+def __getattr__(name: str) -> typing.Any:
+    if name in _CONFIG_TYPES:
+        from . import config
 
-    pythonpaths: list[str] = Field(
-        default_factory=list,
-        description=(
-            "A list of paths to prepend to sys.path before importing user code. "
-            "Useful for src/ layouts (e.g. add 'src')."
-        ),
-    )
-    artifacts: ArtifactsConfig | None = Field(
-        default=None, description="Artifacts section"
-    )
+        return getattr(config, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,59 @@
 import functools
 import inspect
+import sys
 import typing
 
 import venusian
-from pydantic import BaseModel
 
 from . import constants
+from . import memory_cache
+from . import profiler
 from .data_types import Artifact
 from .data_types import Cached
 from .data_types import Customizable
+from .validation import get_validator
+
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+
+
+def _attach(
+    wrapped: typing.Callable,
+    callback: typing.Callable,
+    category: str,
+    depth: int,
+):
+    """Attach a venusian callback to the wrapped object, like ``venusian.attach``.
+
+    ``venusian.attach`` calls ``inspect.getframeinfo`` to record the source line of
+    the decorator, which reads the source file and walks through ``sys.modules``,
+    costing hundreds of microseconds per decorated function. The source line is not
+    needed by the scanning, so for functions decorated at module level the callback
+    is attached directly, other cases are left to venusian. This relies on the
+    internals of venusian 3 (``Categories`` and the callback tuple layout), the
+    dependency is pinned below version 4 accordingly.
+    """
+    frame = sys._getframe(depth + 1)
+    f_globals = frame.f_globals
+    module_name = f_globals.get("__name__")
+    module = sys.modules.get(module_name) if module_name is not None else None
+    if (
+        module is None
+        or module.__dict__ is not f_globals
+        or frame.f_locals is not f_globals
+    ):
+        venusian.attach(wrapped, callback, category=category, depth=depth + 1)
+        return
+    wrapped_name = getattr(wrapped, "__name__", None)
+    categories = getattr(wrapped, venusian.ATTACH_ATTR, None)
+    if categories is None or not categories.attached_to(
+        module_name, wrapped_name, wrapped
+    ):
+        categories = venusian.Categories(wrapped)
+        setattr(wrapped, venusian.ATTACH_ATTR, categories)
+    categories.setdefault(category, []).append(
+        (callback, module_name, f"{wrapped_name} None", "module")
+    )
 
 
 def artifact(
@@ -20,6 +65,9 @@ def artifact(
     short_desc: str | None = None,
     export_step: bool | None = None,
     export_3mf: bool | None = None,
+    timeout: float | None = None,
+    cpu_time: float | None = None,
+    max_memory: int | None = None,
 ) -> typing.Callable:
     def decorator(wrapped: typing.Callable):
         nonlocal desc
@@ -38,6 +86,9 @@ def artifact(
             lineno=code.co_firstlineno if code else None,
             export_step=export_step,
             export_3mf=export_3mf,
+            timeout=timeout,
+            cpu_time=cpu_time,
+            max_memory=max_memory,
         )
 
         def callback(scanner: venusian.Scanner, name: str, ob: typing.Callable):
@@ -45,7 +96,7 @@ def artifact(
                 raise ValueError("Name is not the same")
             scanner.registry.add_artifact(artifact_obj)
 
-        venusian.attach(
+        _attach(
             wrapped,
             callback,
             category=constants.MR_ARTIFACTS_CATEGORY,
@@ -64,7 +115,7 @@ def customizable(
     *,
     desc: str | None = None,
     short_desc: str | None = None,
-    sample_parameters: BaseModel | None = None,
+    sample_parameters: "BaseModel | None" = None,
 ) -> typing.Callable:
     def decorator(wrapped: typing.Callable):
         nonlocal desc
@@ -72,6 +123,9 @@ def customizable(
         if desc is None:
             desc = inspect.getdoc(wrapped)
 
+        # Imported here so that importing the decorators doesn't import pydantic
+        from pydantic import BaseModel
+
         sig = inspect.signature(wrapped)
         if len(sig.parameters) != 1:
             raise ValueError(
@@ -101,8 +155,11 @@ def customizable(
             if customizable_obj.name != name:
                 raise ValueError("Name is not the same")
             scanner.registry.add_customizable(customizable_obj)
+            # Build the parameters validator when collected instead of on the first
+            # request
+            get_validator(customizable_obj)
 
-        venusian.attach(
+        _attach(
             wrapped,
             callback,
             category=constants.MR_CUSTOMIZABLE_CATEGORY,
@@ -138,16 +195,39 @@ def cached(
             lineno=code.co_firstlineno if code else None,
         )
 
-        @functools.wraps(wrapped)
-        def wrapper(*args, **kwargs):
+        def call(args: tuple, kwargs: dict) -> tuple[typing.Any, bool]:
+            """Return the result of the call and whether it's from a cache."""
+            memory = memory_cache.get_current()
+            memory_key = None
+            if memory is not None:
+                memory_key = memory.make_key(cached_obj, args, kwargs)
+                if memory_key is not None:
+                    res = memory.get(memory_key)
+                    if res is not None:
+                        return res, True
             for lookup_func in cached_obj.lookup_funcs:
                 res = lookup_func(args, kwargs)
                 if res is not None:
-                    return res
+                    if memory_key is not None:
+                        memory.put(memory_key, res)
+                    return res, True
             result = cached_obj.func(*args, **kwargs)
+            if memory_key is not None:
+                memory.put(memory_key, result)
             for store_func in cached_obj.store_funcs:
                 if store_func(args, kwargs, result):
-                    return result
+                    return result, False
+            return result, False
+
+        @functools.wraps(wrapped)
+        def wrapper(*args, **kwargs):
+            active_profiler = profiler.get_current()
+            if active_profiler is None:
+                return call(args, kwargs)[0]
+            with active_profiler.span(
+                "cached", f"{cached_obj.module}:{cached_obj.name}"
+            ) as span:
+                result, span.cache_hit = call(args, kwargs)
             return result
 
         def callback(scanner: venusian.Scanner, name: str, ob: typing.Callable):
@@ -155,7 +235,7 @@ def cached(
                 raise ValueError("Name is not the same")
             scanner.registry.add_cached(cached_obj)
 
-        venusian.attach(
+        _attach(
             wrapper,
             callback,
             category=constants.MR_CACHE_CATEGORY,
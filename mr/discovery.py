@@ -0,0 +1,323 @@
+import ast
+import dataclasses
+import enum
+import logging
+import pathlib
+import typing
+
+from .discovery_index import DiscoveryIndex
+from .registry import Registry
+from .utils import find_python_modules
+from .utils import find_python_packages
+
+logger = logging.getLogger(__name__)
+
+# The modules exporting the decorators
+DECORATOR_MODULES = frozenset(["mr", "mr.decorator"])
+
+
+@enum.unique
+class DecoratorKind(enum.Enum):
+    ARTIFACT = "artifact"
+    CUSTOMIZABLE = "customizable"
+    CACHED = "cached"
+
+
+@dataclasses.dataclass(frozen=True)
+class ArtifactInfo:
+    module: str
+    name: str
+    sample: bool = False
+    cover: bool = False
+    desc: str | None = None
+    short_desc: str | None = None
+    filepath: str | None = None
+    lineno: int | None = None
+    export_step: bool | None = None
+    export_3mf: bool | None = None
+    timeout: float | None = None
+    cpu_time: float | None = None
+    max_memory: int | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class CustomizableInfo:
+    module: str
+    name: str
+    # The source of the parameters argument annotation, e.g. "SizeParams"
+    parameters_schema: str | None = None
+    desc: str | None = None
+    short_desc: str | None = None
+    filepath: str | None = None
+    lineno: int | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedInfo:
+    module: str
+    name: str
+    desc: str | None = None
+    short_desc: str | None = None
+    filepath: str | None = None
+    lineno: int | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class ModuleInfo:
+    module: str
+    filepath: str
+    artifacts: tuple[ArtifactInfo, ...] = ()
+    customizables: tuple[CustomizableInfo, ...] = ()
+    caches: tuple[CachedInfo, ...] = ()
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serializable dict."""
+        return {
+            "module": self.module,
+            "filepath": self.filepath,
+            "artifacts": [dataclasses.asdict(item) for item in self.artifacts],
+            "customizables": [dataclasses.asdict(item) for item in self.customizables],
+            "caches": [dataclasses.asdict(item) for item in self.caches],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ModuleInfo":
+        """Parse from a dict (e.g. from JSON)."""
+        return cls(
+            module=d["module"],
+            filepath=d["filepath"],
+            artifacts=tuple(ArtifactInfo(**item) for item in d.get("artifacts", [])),
+            customizables=tuple(
+                CustomizableInfo(**item) for item in d.get("customizables", [])
+            ),
+            caches=tuple(CachedInfo(**item) for item in d.get("caches", [])),
+        )
+
+
+_KINDS = {kind.value: kind for kind in DecoratorKind}
+
+# Keyword arguments of each decorator recorded when they are literals
+_DECORATOR_KWARGS: dict[DecoratorKind, tuple[str, ...]] = {
+    DecoratorKind.ARTIFACT: (
+        "sample",
+        "cover",
+        "desc",
+        "short_desc",
+        "export_step",
+        "export_3mf",
+        "timeout",
+        "cpu_time",
+        "max_memory",
+    ),
+    DecoratorKind.CUSTOMIZABLE: ("desc", "short_desc"),
+    DecoratorKind.CACHED: ("desc", "short_desc"),
+}
+
+
+def _find_decorator_names(
+    tree: ast.Module,
+) -> tuple[dict[str, DecoratorKind], set[str]]:
+    """Return the local names bound to the decorators and to the mr module."""
+    names: dict[str, DecoratorKind] = {}
+    module_names: set[str] = set()
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module in DECORATOR_MODULES:
+            for alias in node.names:
+                kind = _KINDS.get(alias.name)
+                if kind is not None:
+                    names[alias.asname or alias.name] = kind
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name in DECORATOR_MODULES:
+                    module_names.add(alias.asname or alias.name)
+    return names, module_names
+
+
+def _decorator_kind(
+    node: ast.expr,
+    names: dict[str, DecoratorKind],
+    module_names: set[str],
+) -> DecoratorKind | None:
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Name):
+        return names.get(node.id)
+    if isinstance(node, ast.Attribute):
+        if ast.unparse(node.value) in module_names:
+            return _KINDS.get(node.attr)
+    return None
+
+
+def _literal_kwargs(
+    node: ast.expr, kind: DecoratorKind, module: str, name: str
+) -> dict[str, typing.Any]:
+    if not isinstance(node, ast.Call):
+        return {}
+    kwargs = {}
+    for keyword in node.keywords:
+        if keyword.arg not in _DECORATOR_KWARGS[kind]:
+            continue
+        try:
+            kwargs[keyword.arg] = ast.literal_eval(keyword.value)
+        except ValueError:
+            logger.debug(
+                "Argument %s of %s.%s is not a literal, ignored",
+                keyword.arg,
+                module,
+                name,
+            )
+    return kwargs
+
+
+def scan_source(source: str, module: str, filepath: str | None = None) -> ModuleInfo:
+    """Find decorated functions in the source code of a module without executing it.
+
+    :param source: The source code of the module.
+    :param module: The dotted name of the module.
+    :param filepath: The path of the module file.
+    :return: The decorated functions found at the top level of the module.
+    :raises SyntaxError: If the source cannot be parsed.
+    """
+    tree = ast.parse(source, filename=filepath or "<unknown>")
+    names, module_names = _find_decorator_names(tree)
+    artifacts: list[ArtifactInfo] = []
+    customizables: list[CustomizableInfo] = []
+    caches: list[CachedInfo] = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            kind = _decorator_kind(decorator, names, module_names)
+            if kind is None:
+                continue
+            kwargs = _literal_kwargs(decorator, kind, module, node.name)
+            if kwargs.get("desc") is None:
+                kwargs["desc"] = ast.get_docstring(node)
+            # Like co_firstlineno, the line number of a decorated function is the
+            # line of its first decorator
+            common = dict(
+                module=module,
+                name=node.name,
+                filepath=filepath,
+                lineno=min(
+                    [node.lineno] + [item.lineno for item in node.decorator_list]
+                ),
+            )
+            if kind == DecoratorKind.ARTIFACT:
+                artifacts.append(ArtifactInfo(**common, **kwargs))
+            elif kind == DecoratorKind.CUSTOMIZABLE:
+                params = node.args.posonlyargs + node.args.args
+                annotation = params[0].annotation if len(params) == 1 else None
+                customizables.append(
+                    CustomizableInfo(
+                        **common,
+                        **kwargs,
+                        parameters_schema=(
+                            ast.unparse(annotation) if annotation is not None else None
+                        ),
+                    )
+                )
+            else:
+                caches.append(CachedInfo(**common, **kwargs))
+    return ModuleInfo(
+        module=module,
+        filepath=filepath,
+        artifacts=tuple(artifacts),
+        customizables=tuple(customizables),
+        caches=tuple(caches),
+    )
+
+
+def scan_file(path: pathlib.Path, module: str) -> ModuleInfo:
+    """Find decorated functions in a module file without executing it."""
+    return scan_source(path.read_text(encoding="utf8"), module, filepath=str(path))
+
+
+def _iter_package_files(
+    path: pathlib.Path, package: str
+) -> typing.Iterator[tuple[str, pathlib.Path]]:
+    for item in sorted(path.iterdir()):
+        if item.name.startswith(".") or item.name == "__pycache__":
+            continue
+        if item.is_dir():
+            if (item / "__init__.py").exists():
+                yield from _iter_package_files(item, f"{package}.{item.name}")
+        elif item.suffix == ".py":
+            if item.stem == "__init__":
+                yield package, item
+            else:
+                yield f"{package}.{item.stem}", item
+
+
+def find_module_files(path: pathlib.Path) -> list[tuple[str, pathlib.Path]]:
+    """Find the module files under the path with their dotted module names.
+
+    The top-level packages and modules are found with
+    :func:`mr.utils.find_python_packages` and :func:`mr.utils.find_python_modules`,
+    the packages are then walked recursively like ``venusian`` scanning does.
+    """
+    files: list[tuple[str, pathlib.Path]] = []
+    for package in sorted(find_python_packages(path)):
+        files.extend(_iter_package_files(path / package, package))
+    for module_path in sorted(find_python_modules(path)):
+        files.append((module_path.stem, module_path))
+    return files
+
+
+def discover(
+    path: str | pathlib.Path,
+    registry: Registry | None = None,
+    onerror: typing.Callable[[str], None] | None = None,
+    index: DiscoveryIndex | None = None,
+) -> Registry:
+    """Discover artifacts, customizables and cached functions under the path by
+    parsing the source files with :mod:`ast`, without importing any module. It's
+    much faster than :func:`mr.registry.collect` as it doesn't pay for importing
+    build123d / OCP, nor run any user code.
+
+    The returned registry holds :class:`ArtifactInfo`, :class:`CustomizableInfo` and
+    :class:`CachedInfo` records instead of the objects :func:`mr.registry.collect`
+    produces, as there are no functions to reference without importing the modules.
+
+    :param path: The root folder of the repo.
+    :param registry: The registry to add the records to, a new one is created if not
+        provided.
+    :param onerror: Called with the module name when a module fails to parse, like the
+        ``onerror`` argument of :func:`mr.registry.collect`. Errors are raised if not
+        provided.
+    :param index: The discovery index to reuse records of unchanged modules from.
+        Only the modules whose file fingerprint changed are parsed, and the index is
+        updated and saved afterward.
+    :return: The registry.
+    """
+    if registry is None:
+        registry = Registry()
+    modules: set[str] = set()
+    for module, module_path in find_module_files(pathlib.Path(path)):
+        modules.add(module)
+        module_info = index.get(module, module_path) if index is not None else None
+        if module_info is None:
+            try:
+                module_info = scan_file(module_path, module)
+            except (SyntaxError, UnicodeDecodeError):
+                if onerror is None:
+                    raise
+                onerror(module)
+                continue
+            if index is not None:
+                index.put(module, module_path, module_info)
+        add_module_info(registry, module_info)
+    if index is not None:
+        index.prune(modules)
+        index.save()
+    return registry
+
+
+def add_module_info(registry: Registry, module_info: ModuleInfo):
+    """Add the records of a scanned module to the registry."""
+    for artifact in module_info.artifacts:
+        registry.add_artifact(artifact)
+    for customizable in module_info.customizables:
+        registry.add_customizable(customizable)
+    for cache in module_info.caches:
+        registry.add_cached(cache)
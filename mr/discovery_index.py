@@ -0,0 +1,134 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import typing
+
+from . import constants
+
+if typing.TYPE_CHECKING:
+    from .discovery import ModuleInfo
+
+# Version of the index file format, index files of other versions are discarded
+INDEX_VERSION = 1
+
+
+@dataclasses.dataclass(frozen=True)
+class FileFingerprint:
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    @classmethod
+    def from_path(cls, path: pathlib.Path) -> "FileFingerprint":
+        stat = path.stat()
+        return cls(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=hashlib.sha256(path.read_bytes()).hexdigest(),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class IndexEntry:
+    fingerprint: FileFingerprint
+    module_info: "ModuleInfo"
+
+
+class DiscoveryIndex:
+    """Persistent index of decorated functions found in each module, along with the
+    fingerprint of the module file, so that only changed modules need rescanning.
+
+    A module is considered unchanged if its file size and mtime are the same as
+    recorded. When only the mtime differs (e.g. after a fresh checkout), the content
+    hash is compared instead.
+    """
+
+    def __init__(self, path: str | pathlib.Path = constants.DISCOVERY_INDEX_PATH):
+        self.logger = logging.getLogger(__name__)
+        self.path = pathlib.Path(path)
+        self.entries: dict[str, IndexEntry] = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        from .discovery import ModuleInfo
+
+        self.entries = {}
+        self.dirty = False
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except ValueError:
+            self.logger.warning("Failed to load discovery index %s, ignored", self.path)
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        for module, entry in data.get("modules", {}).items():
+            self.entries[module] = IndexEntry(
+                fingerprint=FileFingerprint(**entry["fingerprint"]),
+                module_info=ModuleInfo.from_dict(entry["module_info"]),
+            )
+
+    def save(self):
+        """Write the index file if there were any changes."""
+        if not self.dirty:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "modules": {
+                module: {
+                    "fingerprint": dataclasses.asdict(entry.fingerprint),
+                    "module_info": entry.module_info.to_dict(),
+                }
+                for module, entry in sorted(self.entries.items())
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def get(self, module: str, path: pathlib.Path) -> "ModuleInfo | None":
+        """Return the recorded module info if the module file is unchanged."""
+        entry = self.entries.get(module)
+        if entry is None or entry.module_info.filepath != str(path):
+            return None
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        fingerprint = entry.fingerprint
+        if stat.st_size != fingerprint.size:
+            return None
+        if stat.st_mtime_ns == fingerprint.mtime_ns:
+            return entry.module_info
+        if hashlib.sha256(path.read_bytes()).hexdigest() != fingerprint.sha256:
+            return None
+        # Same content with a different mtime, record the new mtime to take the fast
+        # path next time
+        self.entries[module] = dataclasses.replace(
+            entry,
+            fingerprint=dataclasses.replace(fingerprint, mtime_ns=stat.st_mtime_ns),
+        )
+        self.dirty = True
+        return entry.module_info
+
+    def put(self, module: str, path: pathlib.Path, module_info: "ModuleInfo"):
+        """Record the module info along with the current fingerprint of the file."""
+        self.entries[module] = IndexEntry(
+            fingerprint=FileFingerprint.from_path(path), module_info=module_info
+        )
+        self.dirty = True
+
+    def prune(self, modules: typing.Iterable[str]):
+        """Remove the entries of modules not in the given modules."""
+        modules = set(modules)
+        for module in list(self.entries):
+            if module not in modules:
+                del self.entries[module]
+                self.dirty = True
@@ -0,0 +1,175 @@
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import typing
+
+from . import constants
+from . import serialization
+from .cache_key import make_cache_key
+from .data_types import Cached
+from .registry import Registry
+
+# Default cap of the on-disk cache size in bytes (2 GiB)
+DEFAULT_MAX_SIZE = 2 * 1024 * 1024 * 1024
+# Suffix of the cache entry files
+ENTRY_SUFFIX = ".bin"
+
+
+class DiskCache:
+    """Content-addressed persistent store for the results of cached functions.
+
+    Entries are keyed by :func:`mr.cache_key.make_cache_key` and written atomically
+    into ``path``. When the total size exceeds ``max_size``, the least recently used
+    entries are evicted, the recency is tracked with the mtime of entry files.
+    """
+
+    def __init__(
+        self,
+        path: str | pathlib.Path = constants.DISK_CACHE_PATH,
+        max_size: int | None = DEFAULT_MAX_SIZE,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        return self.path / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def _iter_entries(self) -> typing.Iterator[os.DirEntry]:
+        if not self.path.exists():
+            return
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and entry.name.endswith(ENTRY_SUFFIX):
+                    yield entry
+
+    def size(self) -> int:
+        """Return the total size of cache entries in bytes."""
+        return sum(entry.stat().st_size for entry in self._iter_entries())
+
+    def get(self, key: str) -> typing.Any | None:
+        """Return the cached value for the key, or None if it's not in the cache."""
+        entry_path = self._entry_path(key)
+        try:
+            data = entry_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            value = serialization.loads(data)
+        except Exception:
+            self.logger.warning(
+                "Failed to load cache entry %s, ignored", entry_path, exc_info=True
+            )
+            return None
+        try:
+            # Bump mtime to mark the entry as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, key: str, value: typing.Any) -> bool:
+        """Store the value for the key, return True if it's stored."""
+        data = serialization.dumps(value)
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # An overwritten entry no longer counts towards the size
+            previous_size = entry_path.stat().st_size
+        except FileNotFoundError:
+            previous_size = 0
+        # Write into a temp file in the same dir and rename it, so that readers never
+        # see a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fo:
+                fo.write(data)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if self.max_size is not None:
+            with self._lock:
+                if self._size is None:
+                    self._size = self.size()
+                else:
+                    self._size += len(data) - previous_size
+                if self._size > self.max_size:
+                    self._size = self.evict(self.max_size)
+        return True
+
+    def delete(self, key: str):
+        """Remove the entry of the key if it exists."""
+        try:
+            self._entry_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self, max_size: int) -> int:
+        """Evict least recently used entries until the total size is within max_size.
+
+        :param max_size: The target total size in bytes.
+        :return: The total size of remaining entries in bytes.
+        """
+        entries = []
+        for entry in self._iter_entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.logger.debug("Evicted cache entry %s", path)
+        return total
+
+    def lookup(self, cached: Cached, args: tuple, kwargs: dict) -> typing.Any | None:
+        try:
+            key = make_cache_key(cached, args, kwargs)
+        except TypeError:
+            self.logger.debug(
+                "Arguments of %s.%s are not cacheable", cached.module, cached.name
+            )
+            return None
+        return self.get(key)
+
+    def store(
+        self, cached: Cached, args: tuple, kwargs: dict, result: typing.Any
+    ) -> bool:
+        if result is None:
+            return False
+        try:
+            key = make_cache_key(cached, args, kwargs)
+        except TypeError:
+            return False
+        return self.put(key, result)
+
+    def attach(self, cached: Cached):
+        """Append lookup and store functions of this cache to the cached object."""
+        cached.lookup_funcs.append(
+            lambda args, kwargs: self.lookup(cached, args, kwargs)
+        )
+        cached.store_funcs.append(
+            lambda args, kwargs, result: self.store(cached, args, kwargs, result)
+        )
+
+    def attach_registry(self, registry: Registry):
+        """Attach this cache to all the cached objects collected in the registry."""
+        for module_caches in registry.caches.values():
+            for cached in module_caches.values():
+                self.attach(cached)
@@ -45,7 +45,9 @@ class GeneratorValidationError(ValueError):
         if self.messages:
             parts.append("; ".join(self.messages))
         if self.fields:
-            field_strs = [f"{'.'.join(f.path)}: {f.message}" for f in self.fields]
+            field_strs = [
+                f"{'.'.join(str(p) for p in f.path)}: {f.message}" for f in self.fields
+            ]
             parts.append("Field errors: " + "; ".join(field_strs))
         return " ".join(parts) if parts else "Generator validation failed"
 
@@ -67,3 +69,23 @@ class GeneratorValidationError(ValueError):
     def from_value_error(cls, err: ValueError) -> "GeneratorValidationError":
         """Build a GeneratorValidationError from a ValueError (message becomes single message)."""
         return cls(str(err))
+
+    @classmethod
+    def from_validation_error(cls, err: Exception) -> "GeneratorValidationError":
+        """Build a GeneratorValidationError from a pydantic ValidationError.
+
+        Each error with a location becomes a FieldError at that location, errors of
+        the whole model (empty location) become general messages.
+        """
+        # Skip rendering the error URLs, inputs and contexts which are not reported
+        errors = err.errors(
+            include_url=False, include_context=False, include_input=False
+        )
+        return cls(
+            *[error["msg"] for error in errors if not error["loc"]],
+            fields=[
+                FieldError(tuple(error["loc"]), error["msg"])
+                for error in errors
+                if error["loc"]
+            ],
+        )
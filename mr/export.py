@@ -0,0 +1,275 @@
+import concurrent.futures
+import dataclasses
+import enum
+import logging
+import multiprocessing
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import traceback
+import typing
+
+from .build_engine import artifact_key
+from .build_engine import BuildResult
+from .config import RepoConfig
+from .data_types import Artifact
+from .data_types import Result
+from .utils import apply_repo_config
+
+
+@enum.unique
+class ExportFormat(enum.Enum):
+    STEP = "step"
+    THREE_MF = "3mf"
+    BREP = "brep"
+
+
+@dataclasses.dataclass(frozen=True)
+class ExportResult:
+    artifact: Artifact
+    format: ExportFormat
+    path: pathlib.Path
+    versioned: bool = False
+    error: str | None = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def export_formats(artifact: Artifact) -> list[ExportFormat]:
+    """Return the formats to export for an artifact with repo config applied."""
+    formats = []
+    if artifact.export_step:
+        formats.append(ExportFormat.STEP)
+    if artifact.export_3mf:
+        formats.append(ExportFormat.THREE_MF)
+    return formats
+
+
+def export_path(
+    output_dir: pathlib.Path,
+    artifact: Artifact,
+    export_format: ExportFormat,
+    versioned: bool = False,
+) -> pathlib.Path:
+    """Return the output file path of an exported artifact model."""
+    suffix = "-versioned" if versioned else ""
+    return (
+        output_dir / artifact.module / f"{artifact.name}{suffix}.{export_format.value}"
+    )
+
+
+def export_model(
+    model: typing.Any,
+    export_format: ExportFormat,
+    path: pathlib.Path,
+    mesh_tolerance: float | None = None,
+) -> float:
+    """Export a model into the file and return the time it took in seconds.
+
+    The exporters write into a temp file next to the target path, which is renamed
+    to the target path once done, so a partial file is never left at the target path.
+
+    Tessellated meshes (:class:`mr.mesh.Mesh` or :class:`mr.mesh.SharedMesh`) can
+    only be exported as 3MF.
+
+    :param mesh_tolerance: Write 3MF files of shapes with the streaming writer of
+        :mod:`mr.mesh` at this tolerance instead of the Build123D Mesher, which is
+        faster for big models but doesn't keep the colors and labels.
+    """
+    start = time.perf_counter()
+    mesh_module = sys.modules.get(f"{__package__}.mesh")
+    is_mesh = mesh_module is not None and isinstance(
+        model, (mesh_module.Mesh, mesh_module.SharedMesh)
+    )
+    if is_mesh and export_format != ExportFormat.THREE_MF:
+        raise ValueError(
+            f"Cannot export a tessellated mesh as {export_format.value}, only as 3mf"
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    try:
+        if export_format == ExportFormat.STEP:
+            from .step import write_step
+
+            write_step(model, tmp_path)
+        elif is_mesh:
+            if isinstance(model, mesh_module.SharedMesh):
+                model = model.load()
+            mesh_module.write_3mf([model], tmp_path)
+        elif export_format == ExportFormat.THREE_MF and mesh_tolerance is not None:
+            from .mesh import shape_meshes
+            from .mesh import write_3mf
+
+            write_3mf(shape_meshes(model, tolerance=mesh_tolerance), tmp_path)
+        elif export_format == ExportFormat.THREE_MF:
+            from build123d import Mesher
+
+            mesher = Mesher()
+            mesher.add_shape(model)
+            mesher.write(tmp_path)
+        elif export_format == ExportFormat.BREP:
+            from build123d import export_brep
+
+            if not export_brep(model, tmp_path):
+                raise RuntimeError(f"Failed to export BREP file {path}")
+        else:
+            raise ValueError(f"Unsupported export format {export_format}")
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return time.perf_counter() - start
+
+
+def export_bytes(model: typing.Any, export_format: ExportFormat) -> bytes:
+    """Export a model and return the content of the exported file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = pathlib.Path(tmp_dir) / f"model.{export_format.value}"
+        export_model(model, export_format, path)
+        return path.read_bytes()
+
+
+def _export_model(
+    model: typing.Any,
+    export_format: ExportFormat,
+    path: pathlib.Path,
+    mesh_tolerance: float | None = None,
+) -> tuple[str | None, float]:
+    start = time.perf_counter()
+    try:
+        return None, export_model(model, export_format, path, mesh_tolerance)
+    except Exception:
+        return traceback.format_exc(), time.perf_counter() - start
+
+
+def _release_meshes(result: Result):
+    mesh_module = sys.modules.get(f"{__package__}.mesh")
+    if mesh_module is None:
+        return
+    for model in (result.model, result.versioned):
+        if isinstance(model, mesh_module.SharedMesh):
+            model.release()
+
+
+class ExportPipeline:
+    """Export built artifact models into STEP and 3MF files concurrently across a
+    pool of worker processes, independent of the processes building the models.
+
+    When ``mesh_tolerance`` is set, the 3MF files of shapes are written with the
+    streaming writer of :mod:`mr.mesh`, see :func:`export_model`.
+    """
+
+    def __init__(
+        self,
+        config: RepoConfig,
+        output_dir: str | pathlib.Path,
+        max_workers: int | None = None,
+        mp_context: multiprocessing.context.BaseContext | None = None,
+        mesh_tolerance: float | None = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.output_dir = pathlib.Path(output_dir)
+        self.mesh_tolerance = mesh_tolerance
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=mp_context
+        )
+
+    def __enter__(self) -> typing.Self:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(
+        self, artifact: Artifact, result: Result
+    ) -> dict[concurrent.futures.Future, tuple[ExportFormat, pathlib.Path, bool]]:
+        """Submit the export jobs of a built artifact and return the futures."""
+        artifact = apply_repo_config(artifact, self.config)
+        futures = {}
+        models = [(result.model, False)]
+        if result.versioned is not None:
+            models.append((result.versioned, True))
+        for export_format in export_formats(artifact):
+            for model, versioned in models:
+                path = export_path(self.output_dir, artifact, export_format, versioned)
+                future = self.executor.submit(
+                    _export_model, model, export_format, path, self.mesh_tolerance
+                )
+                futures[future] = (export_format, path, versioned)
+        return futures
+
+    def export(
+        self, build_results: typing.Iterable[BuildResult]
+    ) -> typing.Iterator[ExportResult]:
+        """Export artifacts as their build results arrive and yield export results as
+        soon as they finish. Failed and reused builds are skipped.
+
+        When ``build_results`` is the stream returned by
+        :meth:`mr.build_engine.BuildEngine.build`, the export of one artifact overlaps
+        with the build of the next ones.
+        """
+        pending: dict[concurrent.futures.Future, tuple] = {}
+        # The numbers of unfinished exports by the id of the result
+        remaining: dict[int, int] = {}
+
+        def collect_done(
+            timeout: float | None,
+        ) -> typing.Iterator[ExportResult]:
+            done, _ = concurrent.futures.wait(
+                pending,
+                timeout=timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                artifact, export_format, path, versioned, result = pending.pop(future)
+                remaining[id(result)] -= 1
+                if not remaining[id(result)]:
+                    del remaining[id(result)]
+                    _release_meshes(result)
+                try:
+                    error, duration = future.result()
+                except Exception:
+                    error, duration = traceback.format_exc(), 0.0
+                if error is not None:
+                    self.logger.error(
+                        "Failed to export artifact %s as %s",
+                        artifact_key(artifact),
+                        export_format.value,
+                    )
+                yield ExportResult(
+                    artifact=artifact,
+                    format=export_format,
+                    path=path,
+                    versioned=versioned,
+                    error=error,
+                    duration=duration,
+                )
+
+        try:
+            for build_result in build_results:
+                if build_result.ok and not build_result.reused:
+                    result = build_result.result
+                    futures = self.submit(build_result.artifact, result)
+                    for future, job in futures.items():
+                        pending[future] = (build_result.artifact, *job, result)
+                    if futures:
+                        remaining[id(result)] = len(futures)
+                    else:
+                        _release_meshes(result)
+                # Hand out the exports already done without blocking the builds
+                if pending:
+                    yield from collect_done(timeout=0)
+            while pending:
+                yield from collect_done(timeout=None)
+        finally:
+            for future in pending:
+                future.cancel()
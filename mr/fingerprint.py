@@ -0,0 +1,195 @@
+import hashlib
+import typing
+
+import numpy as np
+
+from . import serialization
+from .cache_key import canonical_json
+from .data_types import Result
+
+# Default decimals of the coordinates and measures rounded for fingerprints, which
+# absorbs the floating point noise of construction order and serialization
+DEFAULT_DECIMALS = 6
+
+
+def _unique_count(shape: typing.Any, shape_type: typing.Any) -> int:
+    from OCP.TopExp import TopExp_Explorer
+
+    # Sub-shapes shared by their parents are visited once per parent
+    seen = set()
+    explorer = TopExp_Explorer(shape, shape_type)
+    while explorer.More():
+        seen.add(hash(explorer.Current()))
+        explorer.Next()
+    return len(seen)
+
+
+def topology_counts(shape: typing.Any) -> np.ndarray:
+    """Return the numbers of unique solids, shells, faces, wires, edges and vertices
+    of an OCP shape.
+    """
+    from OCP.TopAbs import TopAbs_EDGE
+    from OCP.TopAbs import TopAbs_FACE
+    from OCP.TopAbs import TopAbs_SHELL
+    from OCP.TopAbs import TopAbs_SOLID
+    from OCP.TopAbs import TopAbs_VERTEX
+    from OCP.TopAbs import TopAbs_WIRE
+
+    return np.array(
+        [
+            _unique_count(shape, shape_type)
+            for shape_type in (
+                TopAbs_SOLID,
+                TopAbs_SHELL,
+                TopAbs_FACE,
+                TopAbs_WIRE,
+                TopAbs_EDGE,
+                TopAbs_VERTEX,
+            )
+        ],
+        dtype=np.int64,
+    )
+
+
+def vertex_array(shape: typing.Any) -> np.ndarray:
+    """Return the coordinates of the vertices of an OCP shape as a (n, 3) array, the
+    vertices shared by edges are repeated.
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.TopAbs import TopAbs_VERTEX
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopoDS import TopoDS
+
+    points = []
+    explorer = TopExp_Explorer(shape, TopAbs_VERTEX)
+    while explorer.More():
+        points.append(BRep_Tool.Pnt_s(TopoDS.Vertex(explorer.Current())).Coord())
+        explorer.Next()
+    return np.array(points, dtype=np.float64).reshape(-1, 3)
+
+
+def measures(shape: typing.Any) -> np.ndarray:
+    """Return the volume, the surface area and the bounding box min and max corners
+    of an OCP shape as a flat array.
+    """
+    from OCP.Bnd import Bnd_Box
+    from OCP.BRepBndLib import BRepBndLib
+    from OCP.BRepGProp import BRepGProp
+    from OCP.GProp import GProp_GProps
+
+    volume = GProp_GProps()
+    BRepGProp.VolumeProperties_s(shape, volume)
+    area = GProp_GProps()
+    BRepGProp.SurfaceProperties_s(shape, area)
+    box = Bnd_Box()
+    if not shape.IsNull():
+        BRepBndLib.AddOptimal_s(shape, box, False, False)
+    corners = (
+        (*box.CornerMin().Coord(), *box.CornerMax().Coord())
+        if not box.IsVoid()
+        else (0.0,) * 6
+    )
+    return np.array([volume.Mass(), area.Mass(), *corners], dtype=np.float64)
+
+
+def _round(values: np.ndarray, decimals: int) -> np.ndarray:
+    # Adding zero turns negative zeros into zeros, which differ in bytes
+    return np.round(values, decimals) + 0.0
+
+
+def shape_fingerprint(
+    shape: typing.Any,
+    decimals: int = DEFAULT_DECIMALS,
+    translation_invariant: bool = False,
+) -> tuple[str, np.ndarray]:
+    """Fingerprint the geometry of a shape by hashing its topology counts, its
+    rounded unique vertex coordinates, its volume, area and bounding box.
+
+    The fingerprint doesn't depend on the order the shape was constructed in, as
+    vertices are sorted, nor on the noise of serialization round trips below the
+    rounding precision.
+
+    :param shape: A Build123D shape or an OCP ``TopoDS_Shape``.
+    :param decimals: The decimals to round the coordinates and measures to.
+    :param translation_invariant: Fingerprint the geometry relative to the min corner
+        of its vertices, so that translated copies fingerprint the same.
+    :return: The fingerprint and the offset the geometry was made relative to, which
+        is zero unless ``translation_invariant`` is set.
+    """
+    shape = getattr(shape, "wrapped", shape)
+    vertices = vertex_array(shape)
+    offset = np.zeros(3)
+    if translation_invariant and len(vertices):
+        offset = vertices.min(axis=0)
+    measured = measures(shape)
+    if translation_invariant:
+        # Only the size of the bounding box is invariant
+        measured = np.concatenate([measured[:2], measured[5:] - measured[2:5]])
+    digest = hashlib.sha256()
+    digest.update(topology_counts(shape).tobytes())
+    digest.update(_round(measured, decimals).tobytes())
+    digest.update(np.unique(_round(vertices - offset, decimals), axis=0).tobytes())
+    return digest.hexdigest(), offset
+
+
+def appearance(value: typing.Any, decimals: int = DEFAULT_DECIMALS) -> typing.Any:
+    """Return the labels and colors of the model tree of a built model as a
+    canonicalizable structure, which the STEP and 3MF files record along with the
+    geometry. The child nodes are identified by their rounded bounding box center,
+    so that moving labels or colors between nodes changes the structure too.
+    """
+    if isinstance(value, Result):
+        return [
+            appearance(value.model, decimals),
+            appearance(value.versioned, decimals),
+        ]
+    if isinstance(value, (list, tuple)):
+        return [appearance(item, decimals) for item in value]
+    if not serialization.is_shape(value):
+        return None
+    color = getattr(value, "color", None)
+    children = []
+    for child in getattr(value, "children", ()):
+        center = child.bounding_box().center()
+        children.append(
+            [
+                _round(np.array(tuple(center)), decimals).tolist(),
+                appearance(child, decimals),
+            ]
+        )
+    return [
+        getattr(value, "label", None) or None,
+        _round(np.array(tuple(color)), decimals).tolist()
+        if color is not None
+        else None,
+        children,
+    ]
+
+
+def fingerprint(value: typing.Any, decimals: int = DEFAULT_DECIMALS) -> str:
+    """Return a stable fingerprint of a built model, to tell whether the output has
+    changed or to use as a cache key.
+
+    Build123D shapes are fingerprinted by their geometry with
+    :func:`shape_fingerprint`, lists and tuples by their items, a
+    :class:`mr.data_types.Result` by its model and versioned model, and other values
+    by their canonicalized form.
+
+    :raises TypeError: If the value cannot be canonicalized.
+    """
+    digest = hashlib.sha256()
+    if isinstance(value, Result):
+        digest.update(b"result")
+        digest.update(fingerprint(value.model, decimals).encode())
+        digest.update(fingerprint(value.versioned, decimals).encode())
+    elif serialization.is_shape(value):
+        digest.update(b"shape")
+        digest.update(shape_fingerprint(value, decimals)[0].encode())
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"sequence")
+        for item in value:
+            digest.update(fingerprint(item, decimals).encode())
+    else:
+        digest.update(b"value")
+        digest.update(canonical_json(value).encode())
+    return digest.hexdigest()
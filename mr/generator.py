@@ -0,0 +1,524 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import http.server
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import traceback
+import typing
+import urllib.parse
+
+from .cache_key import customizable_key_prefix
+from .cache_key import make_customizable_key
+from .config import RepoConfig
+from .data_types import Customizable
+from .exceptions import GeneratorValidationError
+from .export import export_bytes
+from .export import ExportFormat
+from .registry import collect
+from .registry import Registry
+from .request_log import RequestLog
+from .result_cache import ResultCache
+from .utils import apply_pythonpaths
+from .utils import load_module
+from .validation import get_validator
+
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+
+# Content types of the generated outputs by export format
+CONTENT_TYPES = {
+    ExportFormat.STEP: "model/step",
+    ExportFormat.THREE_MF: "model/3mf",
+    ExportFormat.BREP: "application/octet-stream",
+}
+
+# The registry of the customizables loaded in the worker process
+_worker_registry: Registry | None = None
+# Python paths applied in the worker process, kept open for the worker's lifetime
+_worker_stack = contextlib.ExitStack()
+
+
+def load_registry(
+    module_specs: list[str],
+    config: RepoConfig,
+    repo_root: str | pathlib.Path | None = None,
+    stack: contextlib.ExitStack | None = None,
+) -> Registry:
+    """Load the modules and collect their customizables. When ``stack`` is
+    provided, the configured python paths stay applied until the stack is closed.
+    """
+    with contextlib.ExitStack() as local_stack:
+        (stack or local_stack).enter_context(
+            apply_pythonpaths(config, repo_root=repo_root)
+        )
+        return collect([load_module(spec) for spec in module_specs])
+
+
+def find_customizable(registry: Registry, module: str, name: str) -> Customizable:
+    customizable = registry.customizables.get(module, {}).get(name)
+    if customizable is None:
+        raise KeyError(f"customizable {name} not found in {module}")
+    return customizable
+
+
+def validate_parameters(
+    customizable: Customizable, parameters: str | bytes
+) -> "BaseModel":
+    """Validate the parameters JSON against the customizable's schema.
+
+    :raises GeneratorValidationError: If the parameters are invalid.
+    """
+    return get_validator(customizable).validate_json(parameters)
+
+
+def generate_model(customizable: Customizable, params: "BaseModel") -> typing.Any:
+    """Generate the model with validated parameters.
+
+    :raises GeneratorValidationError: If the customizable function rejects the
+        parameters with a ValueError.
+    """
+    try:
+        return customizable.func(params)
+    except GeneratorValidationError:
+        raise
+    except ValueError as exp:
+        raise GeneratorValidationError.from_value_error(exp) from exp
+
+
+def generate(
+    customizable: Customizable,
+    parameters: str | bytes,
+    export_format: ExportFormat,
+    result_cache: ResultCache | None = None,
+) -> bytes:
+    """Validate the parameters JSON against the customizable's schema, generate the
+    model and export it. When a result cache is provided, the output is served from
+    the cache if the same parameters were generated before.
+
+    :raises GeneratorValidationError: If the parameters are invalid, or the
+        customizable function rejects them with a ValueError.
+    """
+    params = validate_parameters(customizable, parameters)
+    key = None
+    if result_cache is not None:
+        key = result_cache.make_key(customizable, params, export_format)
+        data = result_cache.get(key)
+        if data is not None:
+            return data
+    data = export_bytes(generate_model(customizable, params), export_format)
+    if key is not None:
+        result_cache.put(key, data)
+    return data
+
+
+@dataclasses.dataclass(frozen=True)
+class ValidatedItem:
+    index: int
+    parameters: dict
+    params: "BaseModel | None" = None
+    error: GeneratorValidationError | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchItemResult:
+    index: int
+    parameters: dict
+    data: bytes | None = None
+    error: "GeneratorValidationError | GeneratorError | None" = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serializable report of the item, without the data."""
+        if self.error is None:
+            error = None
+        elif isinstance(self.error, GeneratorValidationError):
+            error = self.error.to_dict()
+        else:
+            error = GeneratorValidationError(str(self.error)).to_dict()
+        return {"index": self.index, "ok": self.ok, "error": error}
+
+
+def validate_batch(
+    customizable: Customizable, parameter_sets: typing.Iterable[dict]
+) -> list[ValidatedItem]:
+    """Validate all the parameter sets, collecting the errors of each item instead of
+    failing on the first invalid one.
+    """
+    validator = get_validator(customizable)
+    items = []
+    for index, parameters in enumerate(parameter_sets):
+        try:
+            params = validator.validate_python(parameters)
+        except GeneratorValidationError as exp:
+            items.append(ValidatedItem(index=index, parameters=parameters, error=exp))
+            continue
+        items.append(ValidatedItem(index=index, parameters=parameters, params=params))
+    return items
+
+
+def _init_worker(module_specs: list[str], config_data: dict, repo_root: str | None):
+    global _worker_registry
+    _worker_registry = load_registry(
+        module_specs,
+        RepoConfig.model_validate(config_data),
+        repo_root=repo_root,
+        stack=_worker_stack,
+    )
+
+
+def _warm_up() -> bool:
+    return _worker_registry is not None
+
+
+def generate_in_worker(
+    module: str, name: str, parameters: str | bytes, export_format: ExportFormat
+) -> tuple[str, typing.Any]:
+    """Generate a model in a worker process of :class:`GeneratorPool`, with the
+    customizables collected by the worker at start.
+
+    :return: A tuple of the status and its payload, ``("ok", data)`` with the
+        exported bytes, ``("invalid", error_dict)``, ``("not_found", message)`` or
+        ``("error", traceback)``.
+    """
+    try:
+        customizable = find_customizable(_worker_registry, module, name)
+        return "ok", generate(customizable, parameters, export_format)
+    except GeneratorValidationError as exp:
+        return "invalid", exp.to_dict()
+    except KeyError as exp:
+        return "not_found", exp.args[0]
+    except Exception:
+        return "error", traceback.format_exc()
+
+
+class GeneratorError(RuntimeError):
+    """Error of generating a model other than invalid parameters."""
+
+
+class GeneratorPool:
+    """A pool of warm worker processes, each of which loads the repo modules and
+    collects the customizables once at start, to generate models on request without
+    paying for importing build123d and the repo every time.
+    """
+
+    def __init__(
+        self,
+        module_specs: list[str],
+        config: RepoConfig,
+        max_workers: int | None = None,
+        repo_root: str | pathlib.Path | None = None,
+        mp_context: multiprocessing.context.BaseContext | None = None,
+        result_cache: ResultCache | None = None,
+        request_log: RequestLog | None = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.result_cache = result_cache
+        self.request_log = request_log
+        self.registry = load_registry(module_specs, config, repo_root=repo_root)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(
+                list(module_specs),
+                config.model_dump(),
+                str(repo_root) if repo_root is not None else None,
+            ),
+        )
+        # Start the workers and load the modules up front, instead of on the first
+        # requests
+        warm_ups = [self.executor.submit(_warm_up) for _ in range(self.max_workers)]
+        for future in warm_ups:
+            future.result()
+
+    def __enter__(self) -> typing.Self:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.request_log is not None:
+            self.request_log.save()
+
+    def submit(
+        self,
+        module: str,
+        name: str,
+        parameters: str | bytes,
+        export_format: ExportFormat = ExportFormat.STEP,
+    ) -> concurrent.futures.Future:
+        """Submit a generation request and return a future of the exported bytes.
+
+        The future raises :class:`KeyError` if the customizable doesn't exist,
+        :class:`GeneratorValidationError` if the parameters are invalid or
+        :class:`GeneratorError` if the generation fails otherwise.
+        """
+        try:
+            customizable = find_customizable(self.registry, module, name)
+            # Validate in the parent process, so that invalid requests and cache hits
+            # don't need a round trip to the workers
+            params = validate_parameters(customizable, parameters)
+        except (KeyError, GeneratorValidationError) as exp:
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            future.set_exception(exp)
+            return future
+        return self.submit_validated(customizable, params, export_format)
+
+    def submit_validated(
+        self,
+        customizable: Customizable,
+        params: "BaseModel",
+        export_format: ExportFormat = ExportFormat.STEP,
+        key: str | None = None,
+    ) -> concurrent.futures.Future:
+        """Submit a generation request with validated parameters and return a future
+        of the exported bytes, like :meth:`submit`. Cancelling the future cancels the
+        generation if it hasn't started yet.
+
+        :param key: The result cache key of the request, computed when not provided.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        if self.request_log is not None:
+            self.request_log.record(customizable, params)
+        if self.result_cache is not None:
+            if key is None:
+                key = self.result_cache.make_key(customizable, params, export_format)
+            data = self.result_cache.get(key)
+            if data is not None:
+                future.set_result(data)
+                return future
+
+        def settle(set_value: typing.Callable, value: typing.Any):
+            if future.cancelled():
+                return
+            try:
+                set_value(value)
+            except concurrent.futures.InvalidStateError:
+                # Cancelled in the meantime
+                pass
+
+        def on_done(worker_future: concurrent.futures.Future):
+            if worker_future.cancelled():
+                future.cancel()
+                return
+            try:
+                status, payload = worker_future.result()
+            except Exception as exp:
+                settle(future.set_exception, GeneratorError(str(exp)))
+                return
+            if status == "ok":
+                if self.result_cache is not None:
+                    self.result_cache.put(key, payload)
+                settle(future.set_result, payload)
+            elif status == "invalid":
+                settle(
+                    future.set_exception, GeneratorValidationError.from_dict(payload)
+                )
+            elif status == "not_found":
+                settle(future.set_exception, KeyError(payload))
+            else:
+                settle(future.set_exception, GeneratorError(payload))
+
+        # Dumped by alias, as the worker validates the parameters again
+        worker_future = self.executor.submit(
+            generate_in_worker,
+            customizable.module,
+            customizable.name,
+            params.model_dump_json(by_alias=True),
+            export_format,
+        )
+        future.add_done_callback(
+            lambda done: worker_future.cancel() if done.cancelled() else None
+        )
+        worker_future.add_done_callback(on_done)
+        return future
+
+    def generate(
+        self,
+        module: str,
+        name: str,
+        parameters: str | bytes,
+        export_format: ExportFormat = ExportFormat.STEP,
+    ) -> bytes:
+        """Generate a model with the parameters JSON and return the exported bytes."""
+        return self.submit(module, name, parameters, export_format).result()
+
+    def generate_batch(
+        self,
+        module: str,
+        name: str,
+        parameter_sets: typing.Iterable[dict],
+        export_format: ExportFormat = ExportFormat.STEP,
+    ) -> typing.Iterator[BatchItemResult]:
+        """Generate models for many parameter sets of one customizable.
+
+        All the parameter sets are validated up front, and the invalid ones are
+        reported per item instead of failing the whole batch. Identical parameter
+        sets (after validation) are generated only once, the unique ones are
+        dispatched across the worker processes at once. The results are yielded in
+        the order of the parameter sets.
+
+        :raises KeyError: If the customizable doesn't exist.
+        """
+        customizable = find_customizable(self.registry, module, name)
+        items = validate_batch(customizable, parameter_sets)
+        # The customizable's part of the keys, including its code hash, is the same
+        # for all the items
+        prefix = customizable_key_prefix(customizable)
+        futures: dict[str, concurrent.futures.Future] = {}
+        item_futures: list[concurrent.futures.Future | None] = []
+        for item in items:
+            if item.error is not None:
+                item_futures.append(None)
+                continue
+            key = make_customizable_key(
+                customizable, item.params, export_format.value, prefix=prefix
+            )
+            future = futures.get(key)
+            if future is None:
+                future = self.submit_validated(
+                    customizable, item.params, export_format, key=key
+                )
+                futures[key] = future
+            item_futures.append(future)
+        try:
+            for item, future in zip(items, item_futures, strict=True):
+                if future is None:
+                    yield BatchItemResult(
+                        index=item.index, parameters=item.parameters, error=item.error
+                    )
+                    continue
+                try:
+                    data = future.result()
+                except (GeneratorValidationError, GeneratorError) as exp:
+                    yield BatchItemResult(
+                        index=item.index, parameters=item.parameters, error=exp
+                    )
+                    continue
+                yield BatchItemResult(
+                    index=item.index, parameters=item.parameters, data=data
+                )
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+
+class GeneratorRequestHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP handler of the generator server.
+
+    - ``GET /customizables`` lists the customizables with their parameters JSON schema
+    - ``POST /customizables/<module>/<name>?format=step`` generates a model with the
+      parameters JSON in the body, and returns the exported file content. Invalid
+      parameters are reported with status 400 and ``GeneratorValidationError.to_dict()``
+      as the JSON body
+    """
+
+    server: "GeneratorServer"
+
+    def log_message(self, format: str, *args: typing.Any):
+        self.server.logger.debug(format, *args)
+
+    def _send_json(self, status: http.HTTPStatus, payload: typing.Any):
+        body = json.dumps(payload).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: http.HTTPStatus, message: str):
+        self._send_json(status, GeneratorValidationError(message).to_dict())
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.rstrip("/") != "/customizables":
+            self._send_error(http.HTTPStatus.NOT_FOUND, f"Path {url.path} not found")
+            return
+        registry = self.server.pool.registry
+        self._send_json(
+            http.HTTPStatus.OK,
+            [
+                dict(
+                    module=customizable.module,
+                    name=customizable.name,
+                    desc=customizable.desc,
+                    short_desc=customizable.short_desc,
+                    parameters_schema=customizable.parameters_schema.model_json_schema(),
+                )
+                for module_customizables in registry.customizables.values()
+                for customizable in module_customizables.values()
+            ],
+        )
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "customizables":
+            self._send_error(http.HTTPStatus.NOT_FOUND, f"Path {url.path} not found")
+            return
+        _, module, name = parts
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            export_format = ExportFormat(query.get("format", ["step"])[0])
+        except ValueError:
+            self._send_error(http.HTTPStatus.BAD_REQUEST, "Unsupported format")
+            return
+        content_length = self.headers.get("Content-Length")
+        if content_length is None:
+            self._send_error(
+                http.HTTPStatus.LENGTH_REQUIRED, "Content-Length header is required"
+            )
+            return
+        try:
+            length = int(content_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_error(http.HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+            return
+        parameters = self.rfile.read(length) if length else b"{}"
+        try:
+            body = self.server.pool.generate(module, name, parameters, export_format)
+        except KeyError as exp:
+            self._send_error(http.HTTPStatus.NOT_FOUND, exp.args[0])
+            return
+        except GeneratorValidationError as exp:
+            self._send_json(http.HTTPStatus.BAD_REQUEST, exp.to_dict())
+            return
+        except GeneratorError:
+            self.server.logger.exception("Failed to generate %s.%s", module, name)
+            self._send_error(
+                http.HTTPStatus.INTERNAL_SERVER_ERROR, "Failed to generate model"
+            )
+            return
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPES[export_format])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class GeneratorServer(http.server.ThreadingHTTPServer):
+    """Local HTTP server generating customizable models with a warm worker pool."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        pool: GeneratorPool,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.pool = pool
+        super().__init__((host, port), GeneratorRequestHandler)
@@ -0,0 +1,399 @@
+import ast
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import typing
+
+from .build_engine import artifact_key
+from .build_engine import BuildEngine
+from .build_engine import BuildResult
+from .cache_key import canonical_json
+from .data_types import Artifact
+from .data_types import Result
+from .discovery import find_module_files
+from .fingerprint import appearance
+from .fingerprint import fingerprint as model_fingerprint
+from .registry import Registry
+from .remote_cache import ACTION_NAMESPACE
+from .remote_cache import RemoteCache
+from .utils import apply_repo_config
+
+# The file name of the build manifest stored in the output folder
+MANIFEST_FILENAME = "manifest.json"
+
+
+@dataclasses.dataclass(frozen=True)
+class ModuleNode:
+    module: str
+    path: pathlib.Path
+    is_package: bool
+    sha256: str
+    imports: frozenset[str] = frozenset()
+
+
+def _resolve_relative(node: ModuleNode, level: int, name: str | None) -> str | None:
+    parts = node.module.split(".")
+    if not node.is_package:
+        parts = parts[:-1]
+    if level > 1:
+        if level - 1 > len(parts):
+            return None
+        parts = parts[: len(parts) - (level - 1)]
+    if name:
+        parts.append(name)
+    return ".".join(parts) if parts else None
+
+
+def _with_parents(module: str) -> list[str]:
+    parts = module.split(".")
+    return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+
+def _find_imports(node: ModuleNode, tree: ast.Module) -> set[str]:
+    """Return all the modules imported anywhere in the module, including the parent
+    packages that get imported along with them.
+    """
+    imports: set[str] = set()
+    for item in ast.walk(tree):
+        if isinstance(item, ast.Import):
+            for alias in item.names:
+                imports.update(_with_parents(alias.name))
+        elif isinstance(item, ast.ImportFrom):
+            if item.level:
+                base = _resolve_relative(node, item.level, item.module)
+            else:
+                base = item.module
+            if base is None:
+                continue
+            imports.update(_with_parents(base))
+            for alias in item.names:
+                # The imported name may be a submodule of the package
+                imports.add(f"{base}.{alias.name}")
+    return imports
+
+
+class ModuleGraph:
+    """Import graph of the repo-local modules, built by parsing module files."""
+
+    def __init__(self, nodes: dict[str, ModuleNode]):
+        self.nodes = nodes
+        self._paths = {str(node.path.resolve()): node.module for node in nodes.values()}
+        self._closures: dict[str, frozenset[str]] = {}
+
+    @classmethod
+    def from_path(cls, path: str | pathlib.Path) -> "ModuleGraph":
+        """Build the graph of the modules found under the repo root folder."""
+        nodes: dict[str, ModuleNode] = {}
+        trees: dict[str, ast.Module] = {}
+        for module, module_path in find_module_files(pathlib.Path(path)):
+            data = module_path.read_bytes()
+            nodes[module] = ModuleNode(
+                module=module,
+                path=module_path,
+                is_package=module_path.stem == "__init__",
+                sha256=hashlib.sha256(data).hexdigest(),
+            )
+            try:
+                trees[module] = ast.parse(data, filename=str(module_path))
+            except SyntaxError:
+                trees[module] = ast.Module(body=[], type_ignores=[])
+        for module, tree in trees.items():
+            node = nodes[module]
+            # Parent packages are always imported before the module itself
+            imports = (_find_imports(node, tree) | set(_with_parents(module))) & (
+                nodes.keys()
+            )
+            imports.discard(module)
+            nodes[module] = dataclasses.replace(node, imports=frozenset(imports))
+        return cls(nodes)
+
+    def module_for_artifact(self, artifact: Artifact) -> str | None:
+        """Return the graph module defining the artifact, matched by module name or
+        by file path when the module was loaded from a file.
+        """
+        if artifact.module in self.nodes:
+            return artifact.module
+        if artifact.filepath is not None:
+            return self._paths.get(str(pathlib.Path(artifact.filepath).resolve()))
+        return None
+
+    def closure(self, module: str) -> frozenset[str]:
+        """Return the module itself and all repo-local modules it transitively imports."""
+        closure = self._closures.get(module)
+        if closure is not None:
+            return closure
+        visited: set[str] = set()
+        stack = [module]
+        while stack:
+            current = stack.pop()
+            if current in visited or current not in self.nodes:
+                continue
+            visited.add(current)
+            stack.extend(self.nodes[current].imports)
+        closure = frozenset(visited)
+        self._closures[module] = closure
+        return closure
+
+    def fingerprint(self, module: str) -> str | None:
+        """Return a hash of the content of all the files in the module's import
+        closure, or None if the module is not part of the graph.
+        """
+        if module not in self.nodes:
+            return None
+        digest = hashlib.sha256()
+        for name in sorted(self.closure(module)):
+            digest.update(f"{name}:{self.nodes[name].sha256}\n".encode("utf8"))
+        return digest.hexdigest()
+
+    def artifact_fingerprint(self, artifact: Artifact) -> str | None:
+        """Return the fingerprint of the artifact's dependency closure, including the
+        export settings of the artifact, or None if it's unknown.
+        """
+        module = self.module_for_artifact(artifact)
+        if module is None:
+            return None
+        digest = hashlib.sha256()
+        digest.update(self.fingerprint(module).encode("utf8"))
+        digest.update(
+            f"{artifact_key(artifact)}:{artifact.export_step}:{artifact.export_3mf}".encode(
+                "utf8"
+            )
+        )
+        return digest.hexdigest()
+
+
+@dataclasses.dataclass(frozen=True)
+class ManifestEntry:
+    fingerprint: str
+    # Output file paths relative to the output folder
+    outputs: tuple[str, ...] = ()
+    # Fingerprint of the built geometry and the export settings
+    geometry: str | None = None
+
+
+class BuildManifest:
+    """Fingerprints of the artifacts' dependency closures and their output files from
+    the previous build, stored in the output folder next to the outputs.
+    """
+
+    def __init__(self, output_dir: str | pathlib.Path):
+        self.logger = logging.getLogger(__name__)
+        self.output_dir = pathlib.Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILENAME
+        self.entries: dict[str, ManifestEntry] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+            except ValueError:
+                self.logger.warning(
+                    "Failed to load build manifest %s, ignored", self.path
+                )
+                data = {}
+            for key, entry in data.get("artifacts", {}).items():
+                self.entries[key] = ManifestEntry(
+                    fingerprint=entry["fingerprint"],
+                    outputs=tuple(entry["outputs"]),
+                    geometry=entry.get("geometry"),
+                )
+
+    def get(self, artifact: Artifact) -> ManifestEntry | None:
+        return self.entries.get(artifact_key(artifact))
+
+    def record(
+        self,
+        artifact: Artifact,
+        fingerprint: str | None,
+        outputs: typing.Iterable[str | pathlib.Path],
+        geometry: str | None = None,
+    ):
+        """Record the fingerprint and output files of a built artifact. An artifact
+        without fingerprint is forgotten, so that it will always be rebuilt.
+
+        :param geometry: The fingerprint of the built geometry, as set on
+            :attr:`BuildResult.geometry` by :func:`reuse_unchanged`.
+        """
+        key = artifact_key(artifact)
+        if fingerprint is None:
+            self.entries.pop(key, None)
+            return
+        self.entries[key] = ManifestEntry(
+            fingerprint=fingerprint,
+            outputs=tuple(
+                sorted(
+                    pathlib.Path(os.path.relpath(output, self.output_dir)).as_posix()
+                    for output in outputs
+                )
+            ),
+            geometry=geometry,
+        )
+
+    def save(self):
+        data = {
+            "artifacts": {
+                key: {
+                    "fingerprint": entry.fingerprint,
+                    "outputs": list(entry.outputs),
+                    **({"geometry": entry.geometry} if entry.geometry else {}),
+                }
+                for key, entry in sorted(self.entries.items())
+            }
+        }
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        os.replace(tmp_path, self.path)
+
+    def is_reusable(self, artifact: Artifact, fingerprint: str | None) -> bool:
+        """Return True if the previous outputs of the artifact can be reused."""
+        entry = self.get(artifact)
+        if entry is None or fingerprint is None or entry.fingerprint != fingerprint:
+            return False
+        return self._outputs_exist(entry)
+
+    def is_unchanged(self, artifact: Artifact, geometry: str | None) -> bool:
+        """Return True if the artifact built the same geometry as in the previous
+        build, so that its previous outputs can be reused instead of exported again.
+        """
+        entry = self.get(artifact)
+        if entry is None or geometry is None or entry.geometry != geometry:
+            return False
+        return self._outputs_exist(entry)
+
+    def _outputs_exist(self, entry: ManifestEntry) -> bool:
+        return all((self.output_dir / output).exists() for output in entry.outputs)
+
+
+def geometry_fingerprint(artifact: Artifact, result: Result) -> str | None:
+    """Return a fingerprint of the geometry built for an artifact, with the labels
+    and colors of its model tree and its export settings, or None if the built
+    models cannot be fingerprinted.
+    """
+    try:
+        geometry = model_fingerprint(result)
+    except TypeError:
+        return None
+    digest = hashlib.sha256()
+    digest.update(geometry.encode("utf8"))
+    digest.update(canonical_json(appearance(result)).encode("utf8"))
+    digest.update(
+        f"{artifact_key(artifact)}:{artifact.export_step}:{artifact.export_3mf}".encode(
+            "utf8"
+        )
+    )
+    return digest.hexdigest()
+
+
+def reuse_unchanged(
+    build_results: typing.Iterable[BuildResult], manifest: BuildManifest
+) -> typing.Iterator[BuildResult]:
+    """Fingerprint the geometry of the built artifacts, and mark the ones with the
+    same geometry as in the build recorded in the manifest as reused, so that they
+    are not exported again.
+
+    The artifacts rebuilt because their code changed often build the same geometry,
+    like after a refactoring. Their results are yielded with ``reused`` set and the
+    manifest's outputs are still valid, record them with the new
+    :meth:`ModuleGraph.artifact_fingerprint`.
+    """
+    for build_result in build_results:
+        if not build_result.ok or build_result.reused or build_result.result is None:
+            yield build_result
+            continue
+        geometry = geometry_fingerprint(build_result.artifact, build_result.result)
+        yield dataclasses.replace(
+            build_result,
+            geometry=geometry,
+            reused=manifest.is_unchanged(build_result.artifact, geometry),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class BuildPlan:
+    # Artifacts need to be built
+    changed: tuple[Artifact, ...]
+    # Artifacts whose previous outputs are reused
+    reused: tuple[Artifact, ...]
+    # Fingerprint of each artifact's dependency closure by artifact key
+    fingerprints: dict[str, str | None]
+
+
+def plan_build(
+    artifacts: typing.Iterable[Artifact],
+    graph: ModuleGraph,
+    manifest: BuildManifest,
+    remote_cache: RemoteCache | None = None,
+) -> BuildPlan:
+    """Split artifacts into the ones need to be built and the ones whose dependency
+    closure is unchanged since the build recorded in the manifest.
+
+    The artifacts are expected to have repo config applied, so that changes of the
+    export settings also trigger rebuilds.
+
+    :param remote_cache: The remote cache to download the outputs of the changed
+        artifacts from, as uploaded by another machine with
+        :meth:`RemoteCache.upload_outputs` keyed by the same fingerprint. The
+        downloaded artifacts are reused and recorded in the manifest.
+    """
+    changed: list[Artifact] = []
+    reused: list[Artifact] = []
+    fingerprints: dict[str, str | None] = {}
+    for artifact in artifacts:
+        fingerprint = graph.artifact_fingerprint(artifact)
+        fingerprints[artifact_key(artifact)] = fingerprint
+        if manifest.is_reusable(artifact, fingerprint):
+            reused.append(artifact)
+        else:
+            changed.append(artifact)
+    if remote_cache is not None and changed:
+        # Check the existence in one batch before downloading them one by one
+        keys = {fingerprints[artifact_key(artifact)] for artifact in changed} - {None}
+        available = keys - remote_cache.find_missing(ACTION_NAMESPACE, keys)
+        for artifact in list(changed):
+            fingerprint = fingerprints[artifact_key(artifact)]
+            if fingerprint not in available:
+                continue
+            outputs = remote_cache.download_outputs(fingerprint, manifest.output_dir)
+            if outputs is None:
+                continue
+            manifest.record(artifact, fingerprint, outputs)
+            changed.remove(artifact)
+            reused.append(artifact)
+    return BuildPlan(
+        changed=tuple(changed), reused=tuple(reused), fingerprints=fingerprints
+    )
+
+
+def build_incremental(
+    engine: BuildEngine,
+    registry: Registry,
+    graph: ModuleGraph,
+    manifest: BuildManifest,
+    remote_cache: RemoteCache | None = None,
+) -> typing.Iterator[BuildResult]:
+    """Build only the artifacts whose dependency closure changed since the build
+    recorded in the manifest. The reused artifacts are yielded first as results with
+    ``reused`` set, followed by the results of the built ones as they finish. The
+    built ones whose geometry didn't change are also marked as reused, see
+    :func:`reuse_unchanged`.
+
+    The manifest is not updated here, as the outputs are only known after export.
+    Call :meth:`BuildManifest.record` with :meth:`ModuleGraph.artifact_fingerprint`
+    once the outputs are written, and :meth:`RemoteCache.upload_outputs` with the
+    same fingerprint to share them with other machines.
+
+    :param remote_cache: The remote cache to download the outputs of the changed
+        artifacts from, see :func:`plan_build`.
+    """
+    artifacts = [
+        apply_repo_config(artifact, engine.config)
+        for module_artifacts in registry.artifacts.values()
+        for artifact in module_artifacts.values()
+    ]
+    plan = plan_build(artifacts, graph, manifest, remote_cache=remote_cache)
+    for artifact in plan.reused:
+        yield BuildResult(artifact=artifact, reused=True)
+    if plan.changed:
+        yield from reuse_unchanged(engine.build(registry, list(plan.changed)), manifest)
@@ -0,0 +1,236 @@
+import copy
+import threading
+import typing
+
+import numpy as np
+
+from . import serialization
+from .cache_key import make_call_key
+from .data_types import Cached
+from .fingerprint import shape_fingerprint
+from .registry import Registry
+
+
+def shape_key(shape: typing.Any) -> int:
+    """Return a key identifying the underlying geometry (``TopoDS_TShape``) of an OCP
+    shape, which is the same for the copies of a shape placed at different locations
+    like ``copy.copy(part)`` or ``Pos(...) * part``.
+    """
+    from OCP.TopLoc import TopLoc_Location
+
+    return hash(shape.Located(TopLoc_Location()))
+
+
+def iter_solids(model: typing.Any) -> typing.Iterator[typing.Any]:
+    """Iterate the ``TopoDS_Solid`` objects of a Build123D model with their locations
+    applied.
+    """
+    from OCP.TopAbs import TopAbs_SOLID
+    from OCP.TopExp import TopExp_Explorer
+
+    explorer = TopExp_Explorer(model.wrapped, TopAbs_SOLID)
+    while explorer.More():
+        yield explorer.Current()
+        explorer.Next()
+
+
+def location_matrix(shape: typing.Any) -> np.ndarray:
+    """Return the 3x4 affine transformation matrix of an OCP shape's location."""
+    trsf = shape.Location().Transformation()
+    return np.array(
+        [[trsf.Value(row, col) for col in range(1, 5)] for row in range(1, 4)]
+    )
+
+
+class InstanceRegistry:
+    """Registry of prototype shapes handing out placed instances of them, which
+    share the prototype's geometry and only own a location.
+
+    The STEP and 3MF exports and the tessellation write the geometry shared by
+    instances once, so memory and output sizes scale with the unique parts instead
+    of all the placements.
+    """
+
+    def __init__(self):
+        self._prototypes: dict[str, typing.Any] = {}
+        # Solids with their offsets by the fingerprint of their geometry
+        self._solids: dict[str, tuple[typing.Any, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._prototypes)
+
+    def get(self, key: str) -> typing.Any | None:
+        """Return a new instance of the prototype with the key, or None if missing."""
+        with self._lock:
+            prototype = self._prototypes.get(key)
+        if prototype is None:
+            return None
+        return copy.copy(prototype)
+
+    def put(self, key: str, shape: typing.Any):
+        """Register a shape as the prototype with the key if there's none yet."""
+        with self._lock:
+            self._prototypes.setdefault(key, copy.copy(shape))
+
+    def instance(self, key: str, build: typing.Callable[[], typing.Any]) -> typing.Any:
+        """Return a new instance of the prototype with the key, building and
+        registering the prototype first if missing.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        self.put(key, build())
+        return self.get(key)
+
+    def lookup(self, cached: Cached, args: tuple, kwargs: dict) -> typing.Any | None:
+        try:
+            key = make_call_key(cached, args, kwargs)
+        except TypeError:
+            return None
+        return self.get(key)
+
+    def store(self, cached: Cached, args: tuple, kwargs: dict, result: typing.Any):
+        if not serialization.is_shape(result):
+            return
+        try:
+            key = make_call_key(cached, args, kwargs)
+        except TypeError:
+            return
+        self.put(key, result)
+
+    def attach(self, cached: Cached):
+        """Make the calls of a cached function with the same arguments return
+        instances of the same prototype shape. The registry is consulted before the
+        other lookups of the function.
+        """
+        cached.lookup_funcs.insert(
+            0, lambda args, kwargs: self.lookup(cached, args, kwargs)
+        )
+        cached.store_funcs.insert(
+            0, lambda args, kwargs, result: self.store(cached, args, kwargs, result)
+        )
+
+    def attach_registry(self, registry: Registry):
+        for module_caches in registry.caches.values():
+            for cached in module_caches.values():
+                self.attach(cached)
+
+    def _dedupe_shape(self, shape: typing.Any) -> typing.Any | None:
+        """Return the OCP shape with its solids replaced by located instances of the
+        registered solids with identical geometry up to translation, or None if
+        nothing is replaced.
+        """
+        from OCP.BRep import BRep_Builder
+        from OCP.gp import gp_Trsf
+        from OCP.gp import gp_Vec
+        from OCP.TopAbs import TopAbs_COMPOUND
+        from OCP.TopAbs import TopAbs_SOLID
+        from OCP.TopLoc import TopLoc_Location
+        from OCP.TopoDS import TopoDS_Compound
+        from OCP.TopoDS import TopoDS_Iterator
+
+        if shape.ShapeType() == TopAbs_SOLID:
+            fingerprint, offset = shape_fingerprint(shape, translation_invariant=True)
+            with self._lock:
+                prototype, prototype_offset = self._solids.setdefault(
+                    fingerprint, (shape, offset)
+                )
+            if shape_key(prototype) == shape_key(shape):
+                return None
+            trsf = gp_Trsf()
+            trsf.SetTranslation(gp_Vec(*(offset - prototype_offset)))
+            return prototype.Moved(TopLoc_Location(trsf))
+        if shape.ShapeType() != TopAbs_COMPOUND:
+            return None
+        # The sub-shapes come with the location of the compound applied
+        sub_shapes = []
+        iterator = TopoDS_Iterator(shape)
+        while iterator.More():
+            sub_shapes.append(iterator.Value())
+            iterator.Next()
+        replaced = [self._dedupe_shape(sub_shape) for sub_shape in sub_shapes]
+        if all(sub_shape is None for sub_shape in replaced):
+            return None
+        compound = TopoDS_Compound()
+        builder = BRep_Builder()
+        builder.MakeCompound(compound)
+        for sub_shape, replacement in zip(sub_shapes, replaced, strict=True):
+            builder.Add(compound, sub_shape if replacement is None else replacement)
+        return compound
+
+    def _dedupe_node(self, node: typing.Any) -> typing.Any | None:
+        from build123d import Compound
+
+        if not node.children:
+            wrapped = self._dedupe_shape(node.wrapped)
+            if wrapped is None:
+                return None
+            return _detached(node, wrapped)
+        children = list(node.children)
+        replaced = [self._dedupe_node(child) for child in children]
+        if all(child is None for child in replaced):
+            return None
+        # The children of the original tree are left in place, copies of their
+        # subtrees sharing the geometry are put into the new tree instead
+        new_children = [
+            _detached_tree(child) if replacement is None else replacement
+            for child, replacement in zip(children, replaced, strict=True)
+        ]
+        compound = Compound(children=new_children, label=node.label, color=node.color)
+        compound.location = node.location
+        return compound
+
+    def dedupe(self, model: typing.Any) -> typing.Any:
+        """Replace the solids of a model with identical geometry up to translation by
+        instances of the first such solid seen by the registry, placed at the same
+        positions.
+
+        The model is returned as is if nothing is replaced. Otherwise a new model is
+        returned with the same tree, labels and colors, where only the shapes holding
+        replaced solids are new, and the others share their geometry with the
+        original model.
+        """
+        deduped = self._dedupe_node(model)
+        return model if deduped is None else deduped
+
+
+def _detached(node: typing.Any, wrapped: typing.Any) -> typing.Any:
+    """Return a new Build123D shape of the OCP shape, of the topology class of the
+    node and with its label and color, outside of any tree.
+    """
+    from build123d import Compound
+    from build123d import Curve
+    from build123d import Edge
+    from build123d import Face
+    from build123d import Part
+    from build123d import Shell
+    from build123d import Sketch
+    from build123d import Solid
+    from build123d import Vertex
+    from build123d import Wire
+
+    # Classes like Box only build their shape from dimensions
+    for cls in (Part, Sketch, Curve, Compound, Solid, Shell, Face, Wire, Edge, Vertex):
+        if isinstance(node, cls):
+            shape = cls(wrapped)
+            break
+    else:
+        raise TypeError(f"Unsupported shape {type(node)}")
+    shape.label = node.label
+    shape.color = node.color
+    return shape
+
+
+def _detached_tree(node: typing.Any) -> typing.Any:
+    from build123d import Compound
+
+    if not node.children:
+        return _detached(node, node.wrapped)
+    compound = Compound(
+        children=[_detached_tree(child) for child in node.children],
+        label=node.label,
+        color=node.color,
+    )
+    compound.location = node.location
+    return compound
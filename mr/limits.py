@@ -0,0 +1,158 @@
+import dataclasses
+import enum
+import math
+import multiprocessing.connection
+import pathlib
+import signal
+import time
+import traceback
+import typing
+
+# Interval in seconds between checks of the child process against the limits
+POLL_INTERVAL = 0.05
+MIB = 1024 * 1024
+
+
+class LimitKind(enum.Enum):
+    TIMEOUT = "timeout"
+    CPU_TIME = "cpu_time"
+    MAX_MEMORY = "max_memory"
+
+
+@dataclasses.dataclass(frozen=True)
+class ExecutionLimits:
+    # Wall-clock timeout in seconds
+    timeout: float | None = None
+    # CPU time limit in seconds
+    cpu_time: float | None = None
+    # Cap of the resident memory in MiB
+    max_memory: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            value is not None
+            for value in (self.timeout, self.cpu_time, self.max_memory)
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class LimitedRun:
+    value: typing.Any = None
+    # The limit the child process was killed for exceeding
+    exceeded: LimitKind | None = None
+    # The error of the child process when it died without exceeding a limit
+    error: str | None = None
+    # True if the child process was killed as the run was cancelled
+    cancelled: bool = False
+    duration: float = 0.0
+
+
+def _rss(pid: int) -> int | None:
+    """Return the resident memory in bytes of a process, or None if unknown."""
+    try:
+        status = pathlib.Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def _child(
+    conn: multiprocessing.connection.Connection,
+    func: typing.Callable,
+    args: tuple,
+    cpu_time: float | None,
+):
+    if cpu_time is not None:
+        import resource
+
+        seconds = max(1, math.ceil(cpu_time))
+        # The kernel sends SIGXCPU at the soft limit, which terminates the process
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    try:
+        conn.send(("ok", func(*args)))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def run_with_limits(
+    func: typing.Callable,
+    args: tuple,
+    limits: ExecutionLimits,
+    mp_context: multiprocessing.context.BaseContext | None = None,
+    cancel: typing.Any | None = None,
+) -> LimitedRun:
+    """Run the function in a child process and kill it once it exceeds the limits.
+
+    The CPU time is capped with ``RLIMIT_CPU`` in the child. The wall-clock time and
+    the resident memory are checked by polling from this process, as Linux doesn't
+    enforce ``RLIMIT_RSS``; the memory is only checked where ``/proc`` is available.
+
+    :param func: The function to run, it and its return value must be picklable.
+    :param cancel: An event, like a :class:`threading.Event` or an event of a
+        multiprocessing manager, the child process is killed once it's set.
+    """
+    if mp_context is None:
+        methods = multiprocessing.get_all_start_methods()
+        mp_context = multiprocessing.get_context(
+            "fork" if "fork" in methods else methods[0]
+        )
+    receiver, sender = mp_context.Pipe(duplex=False)
+    process = mp_context.Process(
+        target=_child, args=(sender, func, args, limits.cpu_time), daemon=True
+    )
+    start = time.perf_counter()
+    process.start()
+    sender.close()
+    exceeded: LimitKind | None = None
+    cancelled = False
+    message: tuple[str, typing.Any] | None = None
+    try:
+        while True:
+            if receiver.poll(POLL_INTERVAL):
+                try:
+                    message = receiver.recv()
+                except EOFError:
+                    pass
+                break
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            if (
+                limits.timeout is not None
+                and time.perf_counter() - start > limits.timeout
+            ):
+                exceeded = LimitKind.TIMEOUT
+                break
+            if limits.max_memory is not None:
+                rss = _rss(process.pid)
+                if rss is not None and rss > limits.max_memory * MIB:
+                    exceeded = LimitKind.MAX_MEMORY
+                    break
+    finally:
+        if exceeded is not None or message is None:
+            process.kill()
+        process.join()
+        receiver.close()
+    duration = time.perf_counter() - start
+    if cancelled:
+        return LimitedRun(cancelled=True, duration=duration)
+    if exceeded is None and message is None:
+        if process.exitcode == -signal.SIGXCPU:
+            exceeded = LimitKind.CPU_TIME
+        else:
+            return LimitedRun(
+                error=f"Process exited with code {process.exitcode}",
+                duration=duration,
+            )
+    if exceeded is not None:
+        return LimitedRun(exceeded=exceeded, duration=duration)
+    status, payload = message
+    if status == "error":
+        return LimitedRun(error=payload, duration=duration)
+    return LimitedRun(value=payload, duration=duration)
@@ -0,0 +1,189 @@
+import collections
+import contextlib
+import copy
+import dataclasses
+import sys
+import threading
+import typing
+
+from . import serialization
+from .cache_key import make_call_key
+from .data_types import Cached
+
+# Default cap of the number of entries in the memory cache
+DEFAULT_MAX_ENTRIES = 1024
+# Default cap of the estimated size of the memory cache in bytes (512 MiB)
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+# Rough estimated in-memory bytes per topological sub-shape of an OCP shape
+SHAPE_SUBSHAPE_SIZE = 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size: int = 0
+
+
+def estimate_size(value: typing.Any) -> int:
+    """Estimate the in-memory size of a value in bytes."""
+    if serialization.is_shape(value):
+        from OCP.TopAbs import TopAbs_EDGE
+        from OCP.TopAbs import TopAbs_FACE
+        from OCP.TopAbs import TopAbs_VERTEX
+        from OCP.TopExp import TopExp_Explorer
+
+        count = 0
+        for shape_type in (TopAbs_FACE, TopAbs_EDGE, TopAbs_VERTEX):
+            explorer = TopExp_Explorer(value.wrapped, shape_type)
+            while explorer.More():
+                count += 1
+                explorer.Next()
+        return sys.getsizeof(value) + count * SHAPE_SUBSHAPE_SIZE
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+def copy_value(value: typing.Any) -> typing.Any:
+    """Copy a value so that the caller can modify it without changing the cached one.
+
+    Build123D shapes are copied with ``copy.copy``, which shares the underlying
+    ``TopoDS_TShape`` but gives the copy its own location, so moving or locating the
+    copy won't affect the cached shape.
+    """
+    if serialization.is_shape(value):
+        return copy.copy(value)
+    if type(value) in (list, tuple):
+        return type(value)(copy_value(item) for item in value)
+    if type(value) is dict:
+        return {k: copy_value(v) for k, v in value.items()}
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        # Named tuples take their items as separate arguments
+        return type(value)(*(copy_value(item) for item in value))
+    # Other subclasses may take other constructor arguments, like the default
+    # factory of a defaultdict, so they are copied and their items replaced
+    if isinstance(value, list):
+        copied = copy.copy(value)
+        copied[:] = [copy_value(item) for item in value]
+        return copied
+    if isinstance(value, dict):
+        copied = copy.copy(value)
+        for k, v in value.items():
+            copied[k] = copy_value(v)
+        return copied
+    return copy.deepcopy(value)
+
+
+class MemoryCache:
+    """In-process LRU cache for results of cached functions.
+
+    It's bounded by the number of entries and by the estimated size of the values.
+    Values are copied when they are stored and when they are returned, so callers
+    never hold a reference to the cached object.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = DEFAULT_MAX_ENTRIES,
+        max_size: int | None = DEFAULT_MAX_SIZE,
+        sizeof: typing.Callable[[typing.Any], int] = estimate_size,
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict[str, tuple[typing.Any, int]] = (
+            collections.OrderedDict()
+        )
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size=self._size,
+            )
+
+    def make_key(self, cached: Cached, args: tuple, kwargs: dict) -> str | None:
+        """Make the key for a call, or return None if the arguments are not cacheable."""
+        try:
+            return make_call_key(cached, args, kwargs)
+        except TypeError:
+            return None
+
+    def get(self, key: str) -> typing.Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return copy_value(entry[0])
+
+    def put(self, key: str, value: typing.Any):
+        if value is None:
+            return
+        value = copy_value(value)
+        size = self.sizeof(value)
+        if self.max_size is not None and size > self.max_size:
+            return
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._size -= old_entry[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_size is not None and self._size > self.max_size)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @contextlib.contextmanager
+    def activate(self) -> typing.Iterator[typing.Self]:
+        """Use this cache as the memory tier of all cached functions within the context."""
+        previous = set_current(self)
+        try:
+            yield self
+        finally:
+            set_current(previous)
+
+
+_current: MemoryCache | None = None
+
+
+def get_current() -> MemoryCache | None:
+    """Return the memory cache used as the memory tier of cached functions, if any."""
+    return _current
+
+
+def set_current(cache: MemoryCache | None) -> MemoryCache | None:
+    """Set the memory cache used as the memory tier of cached functions and return the
+    previous one. Pass None to disable the memory tier.
+    """
+    global _current
+    previous = _current
+    _current = cache
+    return previous
@@ -0,0 +1,297 @@
+import dataclasses
+import os
+import pathlib
+import tempfile
+import typing
+import zipfile
+
+import numpy as np
+
+from .instancing import iter_solids
+from .instancing import location_matrix
+from .instancing import shape_key
+
+# Default linear deflection tolerance of the tessellation in model units
+DEFAULT_TOLERANCE = 0.01
+# Default angular deflection tolerance of the tessellation in radians
+DEFAULT_ANGULAR_TOLERANCE = 0.1
+
+# Rows of the mesh arrays formatted into the 3MF XML at a time
+_CHUNK_ROWS = 65536
+# float32 needs up to 9 significant digits to round trip
+_VERTEX_XML = '<vertex x="%.9g" y="%.9g" z="%.9g"/>\n'
+_TRIANGLE_XML = '<triangle v1="%d" v2="%d" v3="%d"/>\n'
+
+VERTEX_DTYPE = np.float32
+TRIANGLE_DTYPE = np.uint32
+
+_CONTENT_TYPES_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+_RELS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+_MODEL_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">
+<resources>
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Mesh:
+    """A triangle mesh, with the vertex coordinates as a (n, 3) float32 array and the
+    vertex indices of the triangles as a (m, 3) uint32 array.
+    """
+
+    vertices: np.ndarray
+    triangles: np.ndarray
+
+
+@dataclasses.dataclass(frozen=True)
+class InstancedMesh:
+    """A mesh placed at many locations, with the transforms as a (k, 3, 4) array of
+    affine matrices.
+    """
+
+    mesh: Mesh
+    transforms: np.ndarray
+
+
+# Triangle records of a binary STL file after its 84 bytes header
+_STL_DTYPE = np.dtype(
+    [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")]
+)
+_STL_HEADER_SIZE = 84
+
+
+def _triangle_soup(shape: typing.Any) -> np.ndarray:
+    """Return the vertices of the triangles of a meshed OCP shape as a (3m, 3) array,
+    three per triangle in order.
+
+    OCP has no bulk access to the triangulations, so they are written as a binary
+    STL by OCCT, which applies the face locations and orientations in C++, and read
+    back as a single array instead of pulling the nodes and triangles one by one.
+    """
+    from OCP.StlAPI import StlAPI_Writer
+
+    writer = StlAPI_Writer()
+    writer.ASCIIMode = False
+    fd, path = tempfile.mkstemp(suffix=".stl", dir=_default_directory())
+    os.close(fd)
+    try:
+        if not writer.Write(shape, path):
+            return np.empty((0, 3), dtype=VERTEX_DTYPE)
+        records = np.fromfile(path, dtype=_STL_DTYPE, offset=_STL_HEADER_SIZE)
+    finally:
+        os.unlink(path)
+    return records["vertices"].reshape(-1, 3)
+
+
+def deduplicate(mesh: Mesh) -> Mesh:
+    """Merge the vertices with identical coordinates, which the faces sharing an
+    edge duplicate, and drop the triangles degenerated by the merge.
+    """
+    vertices = np.ascontiguousarray(mesh.vertices, dtype=VERTEX_DTYPE)
+    if not len(vertices):
+        return mesh
+    # Hash each vertex as its raw 12 bytes, so that np.unique sorts them in bulk
+    rows = vertices.view(np.dtype((np.void, vertices.dtype.itemsize * 3))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    triangles = inverse.reshape(-1)[mesh.triangles].astype(TRIANGLE_DTYPE)
+    degenerate = (
+        (triangles[:, 0] == triangles[:, 1])
+        | (triangles[:, 1] == triangles[:, 2])
+        | (triangles[:, 0] == triangles[:, 2])
+    )
+    return Mesh(vertices=vertices[first], triangles=triangles[~degenerate])
+
+
+def tessellate(
+    shape: typing.Any,
+    tolerance: float = DEFAULT_TOLERANCE,
+    angular_tolerance: float = DEFAULT_ANGULAR_TOLERANCE,
+) -> Mesh:
+    """Tessellate a Build123D shape into a triangle mesh.
+
+    The triangles of all the faces are pulled from OCP into an array at once, and
+    their vertices are merged and deduplicated in bulk with NumPy.
+    """
+    shape.mesh(tolerance, angular_tolerance)
+    vertices = _triangle_soup(shape.wrapped).astype(VERTEX_DTYPE, copy=False)
+    return deduplicate(
+        Mesh(
+            vertices=vertices,
+            triangles=np.arange(len(vertices), dtype=TRIANGLE_DTYPE).reshape(-1, 3),
+        )
+    )
+
+
+def _default_directory() -> pathlib.Path:
+    # Memory-backed on Linux, so that the mapped files never hit the disk
+    shm = pathlib.Path("/dev/shm")
+    if shm.is_dir():
+        return shm
+    return pathlib.Path(tempfile.gettempdir())
+
+
+def make_directory() -> pathlib.Path:
+    """Create a folder for shared mesh files, which the owner removes when done."""
+    return pathlib.Path(tempfile.mkdtemp(prefix="mr-meshes-", dir=_default_directory()))
+
+
+@dataclasses.dataclass(frozen=True)
+class SharedMesh:
+    """Handle of a mesh stored in a memory-mapped file, which is cheap to send to
+    other processes. The file holds the vertex array followed by the triangle array.
+
+    The file outlives the process creating it, until :meth:`release` is called.
+    """
+
+    path: str
+    vertex_count: int
+    triangle_count: int
+
+    @classmethod
+    def create(
+        cls, mesh: Mesh, directory: str | pathlib.Path | None = None
+    ) -> "SharedMesh":
+        vertices = np.ascontiguousarray(mesh.vertices, dtype=VERTEX_DTYPE)
+        triangles = np.ascontiguousarray(mesh.triangles, dtype=TRIANGLE_DTYPE)
+        fd, path = tempfile.mkstemp(
+            prefix="mr-mesh-", suffix=".bin", dir=directory or _default_directory()
+        )
+        with os.fdopen(fd, "wb") as fo:
+            fo.write(memoryview(vertices).cast("B"))
+            fo.write(memoryview(triangles).cast("B"))
+        return cls(path=path, vertex_count=len(vertices), triangle_count=len(triangles))
+
+    def load(self) -> Mesh:
+        """Map the file and return the mesh with read-only arrays viewing into it
+        without copying. The mapping is released once the arrays are gone.
+        """
+        vertices_nbytes = self.vertex_count * 3 * np.dtype(VERTEX_DTYPE).itemsize
+        if self.vertex_count == 0 or self.triangle_count == 0:
+            # Empty files cannot be mapped
+            return Mesh(
+                vertices=np.empty((self.vertex_count, 3), dtype=VERTEX_DTYPE),
+                triangles=np.empty((self.triangle_count, 3), dtype=TRIANGLE_DTYPE),
+            )
+        return Mesh(
+            vertices=np.memmap(
+                self.path,
+                dtype=VERTEX_DTYPE,
+                mode="r",
+                shape=(self.vertex_count, 3),
+            ),
+            triangles=np.memmap(
+                self.path,
+                dtype=TRIANGLE_DTYPE,
+                mode="r",
+                offset=vertices_nbytes,
+                shape=(self.triangle_count, 3),
+            ),
+        )
+
+    def release(self):
+        """Delete the file, the existing mappings stay valid until they are gone."""
+        pathlib.Path(self.path).unlink(missing_ok=True)
+
+
+def share(
+    value: typing.Any,
+    tolerance: float = DEFAULT_TOLERANCE,
+    directory: str | pathlib.Path | None = None,
+) -> typing.Any:
+    """Tessellate the value into a :class:`SharedMesh` if it is a shape, otherwise
+    return it as is.
+    """
+    from .serialization import is_shape
+
+    if not is_shape(value):
+        return value
+    return SharedMesh.create(tessellate(value, tolerance=tolerance), directory)
+
+
+def _write_rows(stream: typing.BinaryIO, template: str, array: np.ndarray):
+    # Format a chunk of rows with a single string formatting operation instead of
+    # one per row, chunked so that the formatted XML in memory stays bounded
+    for start in range(0, len(array), _CHUNK_ROWS):
+        chunk = array[start : start + _CHUNK_ROWS]
+        stream.write(((template * len(chunk)) % tuple(chunk.ravel().tolist())).encode())
+
+
+def _transform_xml(matrix: np.ndarray) -> str:
+    # 3MF transforms row vectors, so the rotation part is transposed and the
+    # translation goes in the last row
+    values = np.vstack([matrix[:, :3].T, matrix[:, 3]]).ravel()
+    return " ".join(f"{value:.9g}" for value in values)
+
+
+def write_3mf(meshes: typing.Iterable[Mesh | InstancedMesh], path: str | pathlib.Path):
+    """Write meshes as the objects of a 3MF file, streaming the model XML into the
+    zip file in chunks. The mesh of an :class:`InstancedMesh` is written once, with
+    a build item placing it for each of its transforms.
+    """
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+        archive.writestr("_rels/.rels", _RELS_XML)
+        with archive.open("3D/3dmodel.model", "w", force_zip64=True) as model:
+            model.write(_MODEL_HEADER.encode())
+            items = []
+            for object_id, mesh in enumerate(meshes, start=1):
+                if isinstance(mesh, InstancedMesh):
+                    items.extend(
+                        f'<item objectid="{object_id}" '
+                        f'transform="{_transform_xml(transform)}"/>\n'
+                        for transform in mesh.transforms
+                    )
+                    mesh = mesh.mesh
+                else:
+                    items.append(f'<item objectid="{object_id}"/>\n')
+                model.write(
+                    f'<object id="{object_id}" type="model">\n<mesh>\n<vertices>\n'.encode()
+                )
+                _write_rows(model, _VERTEX_XML, mesh.vertices)
+                model.write(b"</vertices>\n<triangles>\n")
+                _write_rows(model, _TRIANGLE_XML, mesh.triangles)
+                model.write(b"</triangles>\n</mesh>\n</object>\n")
+            model.write(b"</resources>\n<build>\n")
+            model.write("".join(items).encode())
+            model.write(b"</build>\n</model>\n")
+
+
+def shape_meshes(
+    model: typing.Any, tolerance: float = DEFAULT_TOLERANCE
+) -> typing.Iterator[Mesh | InstancedMesh]:
+    """Tessellate a model into a mesh per solid, like the 3MF objects written by
+    the Build123D Mesher. Solids sharing their geometry at different locations are
+    tessellated once into an :class:`InstancedMesh`.
+    """
+    from build123d import Solid
+    from OCP.TopLoc import TopLoc_Location
+
+    if isinstance(model, (list, tuple)):
+        for item in model:
+            yield from shape_meshes(item, tolerance=tolerance)
+        return
+    solids = list(iter_solids(model))
+    if len(solids) <= 1:
+        yield tessellate(model, tolerance=tolerance)
+        return
+    groups: dict[int, list[typing.Any]] = {}
+    for solid in solids:
+        groups.setdefault(shape_key(solid), []).append(solid)
+    for group in groups.values():
+        if len(group) == 1:
+            yield tessellate(Solid(group[0]), tolerance=tolerance)
+            continue
+        prototype = Solid(group[0].Located(TopLoc_Location()))
+        yield InstancedMesh(
+            mesh=tessellate(prototype, tolerance=tolerance),
+            transforms=np.stack([location_matrix(solid) for solid in group]),
+        )
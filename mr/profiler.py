@@ -0,0 +1,302 @@
+import contextlib
+import contextvars
+import dataclasses
+import functools
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+
+from .data_types import Artifact
+from .data_types import Cached
+from .data_types import Customizable
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows
+    resource = None
+
+
+@dataclasses.dataclass
+class Span:
+    kind: str
+    name: str
+    # Start time in nanoseconds relative to the start of the profiler
+    start_ns: int
+    pid: int
+    tid: int
+    wall_ns: int = 0
+    cpu_ns: int = 0
+    # Growth of the peak RSS of the process during the span, in bytes
+    rss_delta: int | None = None
+    # Peak of memory allocated by python during the span above the memory allocated
+    # at the start of the span, in bytes. Only available when tracemalloc is tracing
+    memory_peak: int | None = None
+    # True if the result of a cached function was returned from a cache
+    cache_hit: bool | None = None
+    # Number of OCCT boolean operations (fuse, cut, intersect, split) run by
+    # Build123D during the span, including the ones of its children
+    boolean_ops: int = 0
+    error: str | None = None
+    children: list["Span"] = dataclasses.field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serializable dict."""
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "wall_ns": self.wall_ns,
+            "cpu_ns": self.cpu_ns,
+            "rss_delta": self.rss_delta,
+            "memory_peak": self.memory_peak,
+            "cache_hit": self.cache_hit,
+            "boolean_ops": self.boolean_ops,
+            "error": self.error,
+            "pid": self.pid,
+            "tid": self.tid,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def iter_spans(self) -> typing.Iterator["Span"]:
+        """Iterate over the span itself and all of its descendants."""
+        yield self
+        for child in self.children:
+            yield from child.iter_spans()
+
+
+@dataclasses.dataclass
+class _SpanState:
+    span: Span
+    start_wall_ns: int
+    start_cpu_ns: int
+    start_rss: int | None
+    start_memory: int | None
+    # The highest absolute traced memory peak seen so far within the span
+    max_peak: int = 0
+
+
+def _max_rss() -> int | None:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS but in kilobytes on Linux
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _func_name(obj: Artifact | Customizable | Cached) -> str:
+    return f"{obj.module}:{obj.name}"
+
+
+class Profiler:
+    """Record the time and memory spent in artifacts, customizables and cached
+    functions as a tree of spans. Calls of cached functions made while another span
+    is open are recorded as children of that span.
+
+    The spans can be dumped as JSON or as a Chrome trace file, which can be opened
+    with ``chrome://tracing`` or https://ui.perfetto.dev.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._stack: contextvars.ContextVar[tuple[_SpanState, ...]] = (
+            contextvars.ContextVar(f"mr_profiler_stack_{id(self)}", default=())
+        )
+        self._origin_ns = time.perf_counter_ns()
+
+    @contextlib.contextmanager
+    def span(self, kind: str, name: str) -> typing.Iterator[Span]:
+        """Record a span around the code block, nested in the currently open span."""
+        stack = self._stack.get()
+        tracing = tracemalloc.is_tracing()
+        start_memory = None
+        if tracing:
+            start_memory, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # The peak is reset below, keep the parent's peak seen so far
+                stack[-1].max_peak = max(stack[-1].max_peak, peak)
+            tracemalloc.reset_peak()
+        now_ns = time.perf_counter_ns()
+        state = _SpanState(
+            span=Span(
+                kind=kind,
+                name=name,
+                start_ns=now_ns - self._origin_ns,
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+            ),
+            start_wall_ns=now_ns,
+            start_cpu_ns=time.thread_time_ns(),
+            start_rss=_max_rss(),
+            start_memory=start_memory,
+        )
+        token = self._stack.set(stack + (state,))
+        try:
+            yield state.span
+        except BaseException as exp:
+            state.span.error = repr(exp)
+            raise
+        finally:
+            self._stack.reset(token)
+            self._finish(state, stack[-1] if stack else None)
+
+    def _finish(self, state: _SpanState, parent: _SpanState | None):
+        span = state.span
+        span.wall_ns = time.perf_counter_ns() - state.start_wall_ns
+        span.cpu_ns = time.thread_time_ns() - state.start_cpu_ns
+        end_rss = _max_rss()
+        if state.start_rss is not None and end_rss is not None:
+            span.rss_delta = end_rss - state.start_rss
+        if state.start_memory is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            state.max_peak = max(state.max_peak, peak)
+            span.memory_peak = max(state.max_peak - state.start_memory, 0)
+            if parent is not None:
+                parent.max_peak = max(parent.max_peak, state.max_peak)
+        if parent is not None:
+            parent.span.children.append(span)
+        else:
+            with self._lock:
+                self.spans.append(span)
+
+    def count_boolean_op(self):
+        """Count an OCCT boolean operation in the open spans."""
+        for state in self._stack.get():
+            state.span.boolean_ops += 1
+
+    def call(
+        self,
+        obj: Artifact | Customizable | Cached,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> typing.Any:
+        """Call the function of an artifact, customizable or cached object within a
+        span. Cached objects are called without going through the caches.
+        """
+        if isinstance(obj, Artifact):
+            kind = "artifact"
+        elif isinstance(obj, Customizable):
+            kind = "customizable"
+        else:
+            kind = "cached"
+        with self.span(kind, _func_name(obj)):
+            return obj.func(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def activate(self) -> typing.Iterator[typing.Self]:
+        """Profile all the cached function calls, and count the boolean operations,
+        within the context.
+        """
+        _instrument_boolean_ops()
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        previous = set_current(self)
+        try:
+            yield self
+        finally:
+            set_current(previous)
+            if started_tracing:
+                tracemalloc.stop()
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serializable dict of all the recorded spans."""
+        with self._lock:
+            spans = list(self.spans)
+        return {"spans": [span.to_dict() for span in spans]}
+
+    def to_chrome_trace(self) -> dict:
+        """Return the recorded spans in the Chrome trace event format."""
+        with self._lock:
+            spans = list(self.spans)
+        events = []
+        for root in spans:
+            for span in root.iter_spans():
+                args = {
+                    "cpu_ms": span.cpu_ns / 1e6,
+                    "rss_delta": span.rss_delta,
+                    "memory_peak": span.memory_peak,
+                    "boolean_ops": span.boolean_ops,
+                }
+                if span.cache_hit is not None:
+                    args["cache_hit"] = span.cache_hit
+                if span.error is not None:
+                    args["error"] = span.error
+                events.append(
+                    {
+                        "name": span.name,
+                        "cat": span.kind,
+                        "ph": "X",
+                        "ts": span.start_ns / 1e3,
+                        "dur": span.wall_ns / 1e3,
+                        "pid": span.pid,
+                        "tid": span.tid,
+                        "args": args,
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str | pathlib.Path, chrome_trace: bool = False):
+        """Write the recorded spans into a JSON file, or a Chrome trace file when
+        ``chrome_trace`` is True.
+        """
+        data = self.to_chrome_trace() if chrome_trace else self.to_dict()
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2))
+
+
+_current: Profiler | None = None
+_instrumented = False
+_instrument_lock = threading.Lock()
+
+
+def _instrument_boolean_ops():
+    """Wrap the method running all the boolean operations of Build123D shapes, so
+    that they are counted by the current profiler. The wrapper stays in place, it
+    does nothing but a global lookup while no profiler is active.
+    """
+    global _instrumented
+    with _instrument_lock:
+        if _instrumented:
+            return
+        _instrumented = True
+        try:
+            from build123d.topology import Shape
+        except ImportError:
+            return
+        bool_op = getattr(Shape, "_bool_op", None)
+        if bool_op is None:
+            return
+
+        @functools.wraps(bool_op)
+        def counted_bool_op(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            profiler = _current
+            if profiler is not None:
+                profiler.count_boolean_op()
+            return bool_op(*args, **kwargs)
+
+        Shape._bool_op = counted_bool_op
+
+
+def get_current() -> Profiler | None:
+    """Return the profiler recording cached function calls, if any."""
+    return _current
+
+
+def set_current(profiler: Profiler | None) -> Profiler | None:
+    """Set the profiler recording cached function calls and return the previous one.
+    Pass None to disable profiling.
+    """
+    global _current
+    previous = _current
+    _current = profiler
+    return previous
@@ -0,0 +1,296 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import typing
+import urllib.error
+import urllib.request
+import zlib
+
+from . import serialization
+from .cache_key import make_cache_key
+from .data_types import Cached
+from .registry import Registry
+
+# Namespace of the entries keyed by a cache key or an artifact fingerprint
+ACTION_NAMESPACE = "ac"
+# Namespace of the blobs keyed by the SHA-256 of their content
+CONTENT_NAMESPACE = "cas"
+NAMESPACES = (ACTION_NAMESPACE, CONTENT_NAMESPACE)
+# Default timeout of the requests to the server in seconds
+DEFAULT_TIMEOUT = 30.0
+# Max number of keys checked by a single existence request
+BATCH_SIZE = 1000
+# zlib compression level of the payloads
+COMPRESS_LEVEL = 6
+# Size of the HMAC-SHA256 signature prefixed to the signed action entries
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class RemoteCache:
+    """Client of a remote cache shared by build machines, like the ephemeral CI
+    runners, for the results of cached functions and the output files of artifacts.
+
+    The server speaks a simple HTTP protocol over two namespaces of entries, the
+    action namespace ``ac`` keyed by :func:`mr.cache_key.make_cache_key` or an
+    artifact fingerprint, and the content namespace ``cas`` keyed by the SHA-256 of
+    the content:
+
+    - ``GET /<namespace>/<key>`` returns the entry, or 404 if it's missing.
+    - ``PUT /<namespace>/<key>`` stores the request body as the entry.
+    - ``POST /find_missing`` with a JSON body ``{"namespace": ..., "keys": [...]}``
+      returns ``{"missing": [...]}``, the keys without entries.
+
+    The payloads are compressed with zlib by the client, the server stores them as
+    is. Failing requests are logged and treated as misses, so that an unavailable
+    server never fails a build. :class:`mr.cache_server.CacheServer` is a file system
+    backed server of the protocol.
+
+    Values are never pickled, as anyone able to write to the server could make the
+    clients run arbitrary code: shapes are stored as BREP, other values as the JSON
+    of their canonicalized form, and the values which cannot be loaded back as they
+    were from it are not stored. With a ``secret``
+    shared by the clients, the action entries are signed with HMAC-SHA256 and the
+    entries without a valid signature are ignored.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: dict[str, str] | None = None,
+        secret: str | bytes | None = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        # Extra headers sent with every request, like an authorization token
+        self.headers = headers or {}
+        if isinstance(secret, str):
+            secret = secret.encode("utf8")
+        self.secret = secret
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        data: bytes | None = None,
+        content_type: str = "application/octet-stream",
+    ) -> bytes | None:
+        request = urllib.request.Request(
+            f"{self.url}/{path}",
+            data=data,
+            method=method,
+            headers={"Content-Type": content_type, **self.headers},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as exc:
+            if exc.code != 404:
+                self.logger.warning(
+                    "Remote cache request %s %s failed with status %s",
+                    method,
+                    path,
+                    exc.code,
+                )
+            return None
+        except OSError:
+            self.logger.warning(
+                "Remote cache request %s %s failed", method, path, exc_info=True
+            )
+            return None
+
+    def get_blob(self, namespace: str, key: str) -> bytes | None:
+        """Return the decompressed entry of the key, or None if it's missing."""
+        data = self._request("GET", f"{namespace}/{key}")
+        if data is None:
+            return None
+        try:
+            return zlib.decompress(data)
+        except zlib.error:
+            self.logger.warning("Failed to decompress remote cache entry %s", key)
+            return None
+
+    def put_blob(self, namespace: str, key: str, data: bytes) -> bool:
+        """Compress and store the entry of the key, return True if it's stored."""
+        return (
+            self._request(
+                "PUT", f"{namespace}/{key}", zlib.compress(data, COMPRESS_LEVEL)
+            )
+            is not None
+        )
+
+    def find_missing(self, namespace: str, keys: typing.Iterable[str]) -> set[str]:
+        """Return the keys without entries, checked in batches of ``BATCH_SIZE``.
+        The keys of failed checks are returned as missing.
+        """
+        keys = sorted(set(keys))
+        missing: set[str] = set()
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start : start + BATCH_SIZE]
+            data = self._request(
+                "POST",
+                "find_missing",
+                json.dumps({"namespace": namespace, "keys": batch}).encode("utf8"),
+                content_type="application/json",
+            )
+            if data is None:
+                missing.update(batch)
+                continue
+            try:
+                batch_missing = json.loads(data)["missing"]
+                if not isinstance(batch_missing, list):
+                    raise TypeError("missing keys are not a list")
+                # Only the requested keys can be missing
+                missing.update(set(batch).intersection(batch_missing))
+            except (ValueError, KeyError, TypeError):
+                self.logger.warning(
+                    "Invalid remote cache find_missing response, treated as missing"
+                )
+                missing.update(batch)
+        return missing
+
+    def _signature(self, key: str, payload: bytes) -> bytes:
+        # Signing the key too keeps the entries from being swapped between keys
+        return hmac.new(
+            self.secret, key.encode("utf8") + b"\n" + payload, hashlib.sha256
+        ).digest()
+
+    def get(self, key: str) -> typing.Any | None:
+        """Return the cached value for the key, or None if it's not in the cache or
+        its signature is invalid.
+        """
+        data = self.get_blob(ACTION_NAMESPACE, key)
+        if data is None:
+            return None
+        if self.secret is not None:
+            signature, data = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+            if not hmac.compare_digest(signature, self._signature(key, data)):
+                self.logger.warning(
+                    "Invalid signature of remote cache entry %s, ignored", key
+                )
+                return None
+        try:
+            return serialization.loads(data, allow_pickle=False)
+        except Exception:
+            self.logger.warning(
+                "Failed to load remote cache entry %s, ignored", key, exc_info=True
+            )
+            return None
+
+    def put(self, key: str, value: typing.Any) -> bool:
+        """Store the value for the key, return True if it's stored. Values which
+        are not shapes and cannot be loaded back as they were from JSON are not
+        stored.
+        """
+        try:
+            data = serialization.dumps(value, allow_pickle=False)
+        except TypeError:
+            self.logger.debug("Remote cache value of %s is not serializable", key)
+            return False
+        if self.secret is not None:
+            data = self._signature(key, data) + data
+        return self.put_blob(ACTION_NAMESPACE, key, data)
+
+    def lookup(self, cached: Cached, args: tuple, kwargs: dict) -> typing.Any | None:
+        try:
+            key = make_cache_key(cached, args, kwargs)
+        except TypeError:
+            return None
+        return self.get(key)
+
+    def store(
+        self, cached: Cached, args: tuple, kwargs: dict, result: typing.Any
+    ) -> bool:
+        if result is None:
+            return False
+        try:
+            key = make_cache_key(cached, args, kwargs)
+        except TypeError:
+            return False
+        return self.put(key, result)
+
+    def attach(self, cached: Cached):
+        """Append lookup and store functions of this cache to the cached object.
+        Attach it after the local caches, so that they are consulted first.
+        """
+        cached.lookup_funcs.append(
+            lambda args, kwargs: self.lookup(cached, args, kwargs)
+        )
+        cached.store_funcs.append(
+            lambda args, kwargs, result: self.store(cached, args, kwargs, result)
+        )
+
+    def attach_registry(self, registry: Registry):
+        """Attach this cache to all the cached objects collected in the registry."""
+        for module_caches in registry.caches.values():
+            for cached in module_caches.values():
+                self.attach(cached)
+
+    def upload_outputs(
+        self,
+        key: str,
+        output_dir: str | pathlib.Path,
+        outputs: typing.Iterable[str | pathlib.Path],
+    ) -> bool:
+        """Upload the output files of an artifact, keyed by its fingerprint from
+        :meth:`mr.incremental.ModuleGraph.artifact_fingerprint`.
+
+        The files are stored as content blobs, only the ones missing on the server
+        are uploaded, and the key maps to their paths relative to ``output_dir``.
+        """
+        output_dir = pathlib.Path(output_dir)
+        digests = {}
+        for output in outputs:
+            output = pathlib.Path(output)
+            if not output.is_absolute():
+                output = output_dir / output
+            relative = pathlib.Path(os.path.relpath(output, output_dir)).as_posix()
+            digests[relative] = content_digest(output.read_bytes())
+        missing = self.find_missing(CONTENT_NAMESPACE, digests.values())
+        for relative, digest in digests.items():
+            if digest not in missing:
+                continue
+            if not self.put_blob(
+                CONTENT_NAMESPACE, digest, (output_dir / relative).read_bytes()
+            ):
+                return False
+            missing.discard(digest)
+        return self.put(key, {"outputs": digests})
+
+    def download_outputs(
+        self, key: str, output_dir: str | pathlib.Path
+    ) -> list[pathlib.Path] | None:
+        """Download the output files uploaded for the key into ``output_dir``, return
+        their paths or None if they are not all available.
+        """
+        output_dir = pathlib.Path(output_dir)
+        entry = self.get(key)
+        if not isinstance(entry, dict) or "outputs" not in entry:
+            return None
+        root = output_dir.resolve()
+        contents = {}
+        for relative, digest in entry["outputs"].items():
+            path = output_dir / relative
+            if not path.resolve().is_relative_to(root):
+                self.logger.warning("Remote cache output %s is out of place", relative)
+                return None
+            data = self.get_blob(CONTENT_NAMESPACE, digest)
+            if data is None or content_digest(data) != digest:
+                return None
+            contents[path] = data
+        for path, data in contents.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fo:
+                fo.write(data)
+            os.replace(tmp_path, path)
+        return list(contents)
@@ -0,0 +1,61 @@
+import json
+import logging
+import pathlib
+import threading
+import typing
+
+from . import constants
+from .data_types import Customizable
+
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+
+
+def customizable_key(customizable: Customizable) -> str:
+    return f"{customizable.module}:{customizable.name}"
+
+
+class RequestLog:
+    """Request counts of customizables and their validated parameter sets stored as
+    a JSON file, used for prioritizing which variants to pre-generate.
+    """
+
+    def __init__(self, path: str | pathlib.Path = constants.REQUEST_LOG_PATH):
+        self.logger = logging.getLogger(__name__)
+        self.path = pathlib.Path(path)
+        self.counts: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            try:
+                self.counts = json.loads(self.path.read_text())
+            except ValueError:
+                self.logger.warning(
+                    "Failed to load request log from %s, ignored", self.path
+                )
+
+    def record(self, customizable: Customizable, params: "BaseModel"):
+        parameters = json.dumps(params.model_dump(mode="json", by_alias=True), sort_keys=True)
+        with self._lock:
+            counts = self.counts.setdefault(customizable_key(customizable), {})
+            counts[parameters] = counts.get(parameters, 0) + 1
+
+    def total(self, customizable: Customizable) -> int:
+        with self._lock:
+            return sum(self.counts.get(customizable_key(customizable), {}).values())
+
+    def most_requested(self, customizable: Customizable) -> list[tuple[dict, int]]:
+        """Return the requested parameter sets of the customizable with their counts,
+        most requested first.
+        """
+        with self._lock:
+            counts = list(self.counts.get(customizable_key(customizable), {}).items())
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return [(json.loads(parameters), count) for parameters, count in counts]
+
+    def save(self):
+        with self._lock:
+            content = json.dumps(self.counts, indent=2, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(content)
+        tmp_path.replace(self.path)
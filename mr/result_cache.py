@@ -0,0 +1,57 @@
+import logging
+import pathlib
+import time
+
+from . import constants
+from .cache_key import make_customizable_key
+from .data_types import Customizable
+from .disk_cache import DiskCache
+from .export import ExportFormat
+
+# Default cap of the result cache size in bytes (1 GiB)
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+
+class ResultCache:
+    """Cache of the exported outputs of customizables, keyed by the customizable's
+    identity and code hash plus the canonicalized validated parameters.
+
+    Entries are stored on disk with :class:`mr.disk_cache.DiskCache`, which evicts
+    the least recently used entries once ``max_size`` is exceeded. Entries older than
+    ``ttl`` seconds are treated as missing and removed.
+    """
+
+    def __init__(
+        self,
+        path: str | pathlib.Path = constants.RESULT_CACHE_PATH,
+        max_size: int | None = DEFAULT_MAX_SIZE,
+        ttl: float | None = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.disk_cache = DiskCache(path, max_size=max_size)
+        self.ttl = ttl
+
+    def make_key(
+        self,
+        customizable: Customizable,
+        parameters: object,
+        export_format: ExportFormat,
+        prefix: dict | None = None,
+    ) -> str:
+        return make_customizable_key(
+            customizable, parameters, export_format.value, prefix=prefix
+        )
+
+    def get(self, key: str) -> bytes | None:
+        entry = self.disk_cache.get(key)
+        if entry is None:
+            return None
+        created_at, data = entry
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            self.logger.debug("Result cache entry %s expired", key)
+            self.disk_cache.delete(key)
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        self.disk_cache.put(key, (time.time(), data))
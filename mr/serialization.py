@@ -0,0 +1,81 @@
+import io
+import json
+import pickle
+import typing
+
+from .cache_key import canonicalize
+from .cache_key import decanonicalize
+
+# Header prefix of payloads holding an OCP shape serialized as BREP
+BREP_HEADER = b"MRBREP\n"
+# Header prefix of payloads holding a pickled python value
+PICKLE_HEADER = b"MRPICKLE\n"
+# Header prefix of payloads holding a JSON value
+JSON_HEADER = b"MRJSON\n"
+
+
+def is_shape(value: typing.Any) -> bool:
+    """Return True if the value is a Build123D shape backed by an OCP TopoDS_Shape."""
+    wrapped = getattr(value, "wrapped", None)
+    if wrapped is None:
+        return False
+    return type(wrapped).__module__.startswith("OCP")
+
+
+def dumps(value: typing.Any, allow_pickle: bool = True) -> bytes:
+    """Serialize a value into bytes. Build123D shapes are serialized as BREP, all
+    other values are pickled.
+
+    :param allow_pickle: Pickle the other values, otherwise serialize them as the
+        JSON of :func:`mr.cache_key.canonicalize` for payloads which must not be
+        unpickled.
+    :raises TypeError: If pickle is not allowed and the value cannot be loaded back
+        as it was from JSON.
+    """
+    if is_shape(value):
+        from build123d import export_brep
+
+        buf = io.BytesIO()
+        buf.write(BREP_HEADER)
+        export_brep(value, buf)
+        return buf.getvalue()
+    if not allow_pickle:
+        # Tagged like the cache keys, so that tuples, sets, non-string dict keys and
+        # the like load back as they were
+        canonical = canonicalize(value)
+        try:
+            restored = decanonicalize(canonical)
+        except ValueError as exc:
+            raise TypeError(f"Cannot serialize {type(value)} as JSON") from exc
+        if restored != value:
+            raise TypeError(f"Cannot serialize {type(value)} as JSON losslessly")
+        return JSON_HEADER + json.dumps(canonical).encode("utf8")
+    return PICKLE_HEADER + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data: bytes, allow_pickle: bool = True) -> typing.Any:
+    """Deserialize bytes produced by :func:`dumps`.
+
+    Shapes are loaded back as generic Build123D shapes (e.g. ``Compound``), as BREP
+    does not record the python class of the original object.
+
+    :param allow_pickle: Load pickled payloads, which can run arbitrary code, so it
+        must be off for payloads from untrusted sources.
+    :raises ValueError: If the payload is invalid, or pickled while not allowed.
+    """
+    if data.startswith(BREP_HEADER):
+        from build123d import Compound
+        from OCP.BRep import BRep_Builder
+        from OCP.BRepTools import BRepTools
+        from OCP.TopoDS import TopoDS_Shape
+
+        shape = TopoDS_Shape()
+        BRepTools.Read_s(shape, io.BytesIO(data[len(BREP_HEADER) :]), BRep_Builder())
+        if shape.IsNull():
+            raise ValueError("Failed to read BREP payload")
+        return Compound.cast(shape)
+    if data.startswith(JSON_HEADER):
+        return decanonicalize(json.loads(data[len(JSON_HEADER) :]))
+    if data.startswith(PICKLE_HEADER) and allow_pickle:
+        return pickle.loads(data[len(PICKLE_HEADER) :])
+    raise ValueError("Unknown payload format")
@@ -0,0 +1,163 @@
+import collections
+import pathlib
+import typing
+
+from .instancing import iter_solids
+from .instancing import shape_key
+
+
+def count_instances(model: typing.Any) -> collections.Counter[int]:
+    """Count the solids of a Build123D model by their underlying geometry, shared
+    solids placed at different locations (like ``copy.copy(part)`` or
+    ``Pos(...) * part``) count as instances of the same solid.
+    """
+    return collections.Counter(shape_key(solid) for solid in iter_solids(model))
+
+
+def has_instances(model: typing.Any) -> bool:
+    return any(count > 1 for count in count_instances(model).values())
+
+
+def _set_name_and_color(
+    color_tool: typing.Any, label: typing.Any, node: typing.Any
+) -> None:
+    from OCP.TCollection import TCollection_ExtendedString
+    from OCP.TDataStd import TDataStd_Name
+    from OCP.XCAFDoc import XCAFDoc_ColorType
+
+    if getattr(node, "label", None):
+        TDataStd_Name.Set_s(label, TCollection_ExtendedString(node.label))
+    color = getattr(node, "color", None)
+    if color is not None:
+        color_tool.SetColor(label, color.wrapped, XCAFDoc_ColorType.XCAFDoc_ColorGen)
+
+
+def _xcaf_document(model: typing.Any) -> typing.Any:
+    """Create an XCAF document of a Build123D model, with the shapes sharing their
+    geometry across placements added once and referenced by a component for each
+    placement. The labels and colors of the model tree are kept.
+    """
+    from OCP.BRepBuilderAPI import BRepBuilderAPI_Copy
+    from OCP.TCollection import TCollection_ExtendedString
+    from OCP.TDataStd import TDataStd_Name
+    from OCP.TDF import TDF_Label
+    from OCP.TDocStd import TDocStd_Document
+    from OCP.TopAbs import TopAbs_COMPOUND
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS_Iterator
+    from OCP.XCAFApp import XCAFApp_Application
+    from OCP.XCAFDoc import XCAFDoc_DocumentTool
+
+    doc = TDocStd_Document(TCollection_ExtendedString("XmlOcaf"))
+    application = XCAFApp_Application.GetApplication_s()
+    application.NewDocument(TCollection_ExtendedString("MDTV-XCAF"), doc)
+    application.InitDocument(doc)
+    # Build123D models are in millimeters
+    XCAFDoc_DocumentTool.SetLengthUnit_s(doc, 0.001)
+    shape_tool = XCAFDoc_DocumentTool.ShapeTool_s(doc.Main())
+    color_tool = XCAFDoc_DocumentTool.ColorTool_s(doc.Main())
+    shape_tool.SetAutoNaming_s(False)
+    # Labels of the shapes by their geometry regardless of the location and by
+    # their color, as STEP readers take the color of a placement from its shape
+    definitions: dict[tuple, typing.Any] = {}
+
+    def add_leaf(node: typing.Any, parent: typing.Any, location: typing.Any):
+        shape = node.wrapped
+        # Compounds wrapping a single shape, like Build123D parts, are unwrapped so
+        # that the placements of the shape share it even in different wrappers
+        while shape.ShapeType() == TopAbs_COMPOUND and shape.NbChildren() == 1:
+            shape = TopoDS_Iterator(shape).Value()
+        location = location.Multiplied(shape.Location())
+        color = node.color
+        key = (shape_key(shape), tuple(color) if color is not None else None)
+        label = definitions.get(key)
+        if label is None:
+            shape = shape.Located(TopLoc_Location())
+            if shape_tool.FindShape(shape, TDF_Label(), False):
+                # STEP styles the geometry, which placements of the same shape
+                # share, so the shape is copied for each other color
+                shape = BRepBuilderAPI_Copy(shape).Shape()
+            # Compounds of many shapes are made assemblies, whose sub-shapes sharing
+            # their geometry are added once by the shape tool too
+            label = shape_tool.AddShape(shape, shape.NbChildren() > 1, True)
+            _set_name_and_color(color_tool, label, node)
+            definitions[key] = label
+        component = shape_tool.AddComponent(parent, label, location)
+        if node.label:
+            TDataStd_Name.Set_s(component, TCollection_ExtendedString(node.label))
+
+    def add_children(node: typing.Any, parent: typing.Any, location: typing.Any):
+        for child in node.children:
+            if not child.children:
+                add_leaf(child, parent, location)
+                continue
+            child_location = location.Multiplied(child.wrapped.Location())
+            label = shape_tool.NewShape()
+            _set_name_and_color(color_tool, label, child)
+            add_children(child, label, TopLoc_Location())
+            shape_tool.AddComponent(parent, label, child_location)
+
+    if getattr(model, "children", None):
+        root = shape_tool.NewShape()
+        _set_name_and_color(color_tool, root, model)
+        add_children(model, root, model.wrapped.Location())
+    else:
+        root = shape_tool.AddShape(model.wrapped, True, True)
+        _set_name_and_color(color_tool, root, model)
+    shape_tool.UpdateAssemblies()
+    return doc
+
+
+def write_step_instanced(model: typing.Any, path: str | pathlib.Path):
+    """Write a model into a STEP file with the solids shared across placements
+    written once as a product definition, and each placement as an assembly
+    occurrence of it, instead of duplicating the geometry of every placement. The
+    labels and colors are kept like the Build123D exporter does.
+    """
+    from OCP.IFSelect import IFSelect_ReturnStatus
+    from OCP.Interface import Interface_Static
+    from OCP.Message import Message
+    from OCP.Message import Message_Gravity
+    from OCP.STEPCAFControl import STEPCAFControl_Controller
+    from OCP.STEPCAFControl import STEPCAFControl_Writer
+    from OCP.STEPControl import STEPControl_AsIs
+    from OCP.XSControl import XSControl_WorkSession
+
+    for printer in Message.DefaultMessenger_s().Printers():
+        printer.SetTraceLevel(Message_Gravity.Message_Fail)
+    STEPCAFControl_Controller.Init_s()
+    doc = _xcaf_document(model)
+    writer = STEPCAFControl_Writer(XSControl_WorkSession(), False)
+    writer.SetColorMode(True)
+    writer.SetNameMode(True)
+    writer.SetLayerMode(True)
+    # The writer options are global, restore them once done
+    options = {"write.surfacecurve.mode": 1}
+    previous = {name: Interface_Static.IVal_s(name) for name in options}
+    try:
+        for name, value in options.items():
+            Interface_Static.SetIVal_s(name, value)
+        writer.Transfer(doc, STEPControl_AsIs)
+        status = writer.Write(str(path))
+    finally:
+        for name, value in previous.items():
+            Interface_Static.SetIVal_s(name, value)
+    if status != IFSelect_ReturnStatus.IFSelect_RetDone:
+        raise RuntimeError(f"Failed to write STEP file {path}")
+
+
+def write_step(model: typing.Any, path: str | pathlib.Path):
+    """Write a model into a STEP file.
+
+    Models with solids placed more than once are written with
+    :func:`write_step_instanced`, so that the size of the file and the memory it
+    takes to write scale with the unique solids instead of all the placements.
+    Other models are written by Build123D. Both keep the labels and colors.
+    """
+    if has_instances(model):
+        write_step_instanced(model, path)
+        return
+    from build123d import export_step
+
+    if not export_step(model, path):
+        raise RuntimeError(f"Failed to export STEP file {path}")
@@ -0,0 +1,319 @@
+import concurrent.futures
+import dataclasses
+import itertools
+import logging
+import math
+import time
+import typing
+
+from .data_types import Customizable
+from .exceptions import GeneratorValidationError
+from .export import ExportFormat
+from .generator import generate_in_worker
+from .generator import GeneratorPool
+from .request_log import RequestLog
+from .validation import get_validator
+
+# Default number of sampled values of a bounded numeric field
+DEFAULT_SAMPLES = 5
+
+
+def _resolve(schema: dict, defs: dict) -> dict:
+    ref = schema.get("$ref")
+    if ref is None:
+        return schema
+    return _resolve(defs[ref.rsplit("/", 1)[-1]], defs)
+
+
+def _linspace(low: float, high: float, count: int) -> list[float]:
+    if count == 1:
+        return [low]
+    step = (high - low) / (count - 1)
+    return [low + step * index for index in range(count)]
+
+
+def _numeric_values(schema: dict, samples: int) -> list | None:
+    low = schema.get("minimum")
+    high = schema.get("maximum")
+    exclusive_low = schema.get("exclusiveMinimum")
+    exclusive_high = schema.get("exclusiveMaximum")
+    multiple = schema.get("multipleOf")
+    if multiple is None and schema["type"] == "integer":
+        multiple = 1
+    if multiple is not None:
+        # Sample the multiples within the bounds, which may be floats even for
+        # integer fields
+        if exclusive_low is not None:
+            low = exclusive_low
+        if exclusive_high is not None:
+            high = exclusive_high
+        if low is None or high is None:
+            return None
+        first = math.ceil(low / multiple)
+        if exclusive_low is not None and first * multiple <= exclusive_low:
+            first += 1
+        last = math.floor(high / multiple)
+        if exclusive_high is not None and last * multiple >= exclusive_high:
+            last -= 1
+        if first > last:
+            return None
+        if last - first + 1 <= samples:
+            indexes = list(range(first, last + 1))
+        else:
+            indexes = sorted(
+                {round(value) for value in _linspace(first, last, samples)}
+            )
+        return [index * multiple for index in indexes]
+    # Sample one more point at each exclusive end and drop it
+    count = samples
+    if exclusive_low is not None:
+        low = exclusive_low
+        count += 1
+    if exclusive_high is not None:
+        high = exclusive_high
+        count += 1
+    if low is None or high is None or low > high:
+        return None
+    values = _linspace(low, high, count)
+    if exclusive_low is not None:
+        values = values[1:]
+    if exclusive_high is not None:
+        values = values[:-1]
+    return values
+
+
+def field_values(
+    schema: dict, defs: dict | None = None, samples: int = DEFAULT_SAMPLES
+) -> list | None:
+    """Enumerate or sample the values of a field from its JSON Schema.
+
+    Enums, literals and booleans are enumerated, bounded numbers are sampled evenly
+    between the bounds with ``samples`` points, among the integers or the multiples of
+    ``multipleOf`` if any. The default value goes first. Return None if the values
+    cannot be derived from the schema.
+    """
+    defs = defs or {}
+    schema = _resolve(schema, defs)
+    values: list | None = None
+    if "const" in schema:
+        values = [schema["const"]]
+    elif "enum" in schema:
+        values = list(schema["enum"])
+    elif "anyOf" in schema:
+        values = []
+        for option in schema["anyOf"]:
+            option_values = field_values(option, defs, samples)
+            if option_values is None:
+                values = None
+                break
+            values.extend(option_values)
+    elif schema.get("type") == "null":
+        values = [None]
+    elif schema.get("type") == "boolean":
+        values = [False, True]
+    elif schema.get("type") in ("integer", "number"):
+        values = _numeric_values(schema, samples)
+    if "default" in schema:
+        default = schema["default"]
+        return [default] + [value for value in values or [] if value != default]
+    return values
+
+
+def enumerate_parameters(
+    customizable: Customizable, samples: int = DEFAULT_SAMPLES
+) -> typing.Iterator[dict]:
+    """Enumerate the grid of the parameter space of a customizable from the JSON
+    Schema of its ``parameters_schema``, starting with the defaults.
+
+    :raises ValueError: If a required field has no enumerable values.
+    """
+    schema = customizable.parameters_schema.model_json_schema()
+    defs = schema.get("$defs", {})
+    required = set(schema.get("required", []))
+    names = []
+    axes = []
+    for name, field_schema in schema.get("properties", {}).items():
+        values = field_values(field_schema, defs, samples)
+        if values is None:
+            if name in required:
+                raise ValueError(
+                    f"Cannot enumerate the values of required field {name!r} of "
+                    f"{customizable.module}:{customizable.name}"
+                )
+            continue
+        names.append(name)
+        axes.append(values)
+    for combination in itertools.product(*axes):
+        yield dict(zip(names, combination, strict=True))
+
+
+@dataclasses.dataclass(frozen=True)
+class SweepBudget:
+    # The max number of variants to generate
+    max_variants: int | None = None
+    # The max CPU hours spent on generating across all the workers
+    max_cpu_hours: float | None = None
+
+
+@dataclasses.dataclass
+class SweepReport:
+    # The number of generated variants
+    generated: int = 0
+    # The number of variants which were already in the result cache
+    cached: int = 0
+    # The number of variants failed to validate or generate
+    failed: int = 0
+    # The CPU seconds spent on generating
+    cpu_seconds: float = 0.0
+    # Whether the sweep stopped because of the budget
+    exhausted: bool = False
+
+
+def _sweep_generate(
+    module: str, name: str, parameters: str, export_format: ExportFormat
+) -> tuple[str, typing.Any, float]:
+    start = time.process_time()
+    status, payload = generate_in_worker(module, name, parameters, export_format)
+    return status, payload, time.process_time() - start
+
+
+class Sweeper:
+    """Pre-generate variants of customizables into the result cache of a
+    :class:`mr.generator.GeneratorPool`, so that the customizer requests mostly hit
+    precomputed outputs.
+
+    The most requested parameter sets recorded in the request log go first, then the
+    parameter space grids of the customizables, the most requested customizable
+    first. The sweep stops once the budget is spent.
+    """
+
+    def __init__(
+        self,
+        pool: GeneratorPool,
+        request_log: RequestLog | None = None,
+        budget: SweepBudget | None = None,
+        samples: int = DEFAULT_SAMPLES,
+        export_formats: typing.Sequence[ExportFormat] = (ExportFormat.STEP,),
+    ):
+        if pool.result_cache is None:
+            raise ValueError("The generator pool has no result cache to sweep into")
+        self.logger = logging.getLogger(__name__)
+        self.pool = pool
+        self.request_log = request_log
+        self.budget = budget if budget is not None else SweepBudget()
+        self.samples = samples
+        self.export_formats = export_formats
+
+    def _customizables(self) -> list[Customizable]:
+        customizables = [
+            customizable
+            for module_customizables in self.pool.registry.customizables.values()
+            for customizable in module_customizables.values()
+        ]
+        if self.request_log is not None:
+            customizables.sort(key=self.request_log.total, reverse=True)
+        return customizables
+
+    def plan(self) -> typing.Iterator[tuple[Customizable, dict]]:
+        """Yield the customizables and parameter sets to generate in priority
+        order, possibly with duplicates.
+        """
+        customizables = self._customizables()
+        if self.request_log is not None:
+            requested = [
+                (count, index, customizable, parameters)
+                for index, customizable in enumerate(customizables)
+                for parameters, count in self.request_log.most_requested(customizable)
+            ]
+            requested.sort(key=lambda item: (-item[0], item[1]))
+            for _, _, customizable, parameters in requested:
+                yield customizable, parameters
+        for customizable in customizables:
+            try:
+                grid = enumerate_parameters(customizable, self.samples)
+                for parameters in grid:
+                    yield customizable, parameters
+            except ValueError as exp:
+                self.logger.warning("Skipped sweeping: %s", exp)
+
+    def _within_budget(self, report: SweepReport, in_flight: int) -> bool:
+        max_variants = self.budget.max_variants
+        if max_variants is not None and report.generated + in_flight >= max_variants:
+            return False
+        max_cpu_hours = self.budget.max_cpu_hours
+        if max_cpu_hours is not None and report.cpu_seconds >= max_cpu_hours * 3600:
+            return False
+        return True
+
+    def _collect(
+        self, report: SweepReport, future: concurrent.futures.Future, key: str
+    ):
+        status, payload, cpu_seconds = future.result()
+        report.cpu_seconds += cpu_seconds
+        if status != "ok":
+            self.logger.warning("Failed to generate variant %s: %s", key, payload)
+            report.failed += 1
+            return
+        self.pool.result_cache.put(key, payload)
+        report.generated += 1
+
+    def run(self) -> SweepReport:
+        result_cache = self.pool.result_cache
+        report = SweepReport()
+        seen: set[str] = set()
+        in_flight: dict[concurrent.futures.Future, str] = {}
+        plan = (
+            (customizable, parameters, export_format)
+            for customizable, parameters in self.plan()
+            for export_format in self.export_formats
+        )
+        for customizable, parameters, export_format in plan:
+            if not self._within_budget(report, len(in_flight)):
+                # Wait for the in-flight variants before judging the budget for sure
+                if not in_flight:
+                    report.exhausted = True
+                    break
+                for future in concurrent.futures.as_completed(list(in_flight)):
+                    self._collect(report, future, in_flight.pop(future))
+                if not self._within_budget(report, 0):
+                    report.exhausted = True
+                    break
+            try:
+                params = get_validator(customizable).validate_python(parameters)
+            except GeneratorValidationError:
+                report.failed += 1
+                continue
+            key = result_cache.make_key(customizable, params, export_format)
+            if key in seen:
+                continue
+            seen.add(key)
+            if result_cache.get(key) is not None:
+                report.cached += 1
+                continue
+            # Dumped by alias, as the worker validates the parameters again
+            future = self.pool.executor.submit(
+                _sweep_generate,
+                customizable.module,
+                customizable.name,
+                params.model_dump_json(by_alias=True),
+                export_format,
+            )
+            in_flight[future] = key
+            # Keep as many variants in flight as workers, so that the budget is not
+            # overshot by a long queue
+            if len(in_flight) >= self.pool.max_workers:
+                done, _ = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    self._collect(report, future, in_flight.pop(future))
+        for future in concurrent.futures.as_completed(list(in_flight)):
+            self._collect(report, future, in_flight.pop(future))
+        self.logger.info(
+            "Swept %s variants (%s cached, %s failed) in %.1f CPU seconds",
+            report.generated,
+            report.cached,
+            report.failed,
+            report.cpu_seconds,
+        )
+        return report
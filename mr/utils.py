@@ -9,10 +9,10 @@ from types import ModuleType
 
 import yaml
 
+from .config import DefaultArtifactConfig
+from .config import RepoConfig
 from .constants import REPO_CONFIG_PATH
 from .data_types import Artifact
-from .data_types import DefaultArtifactConfig
-from .data_types import RepoConfig
 
 
 @contextlib.contextmanager
@@ -128,7 +128,8 @@ def load_repo_config(path: str | pathlib.Path | None = None) -> RepoConfig:
 def apply_repo_config(artifact: Artifact, config: RepoConfig) -> Artifact:
     """
     Apply repo config defaults to an artifact. Like, if the artifact has None for
-    export_step or export_3mf, fill in values from config.artifacts.default_config.
+    export_step, export_3mf or an execution limit, fill in values from
+    config.artifacts.default_config.
     """
     defaults = (
         config.artifacts.default_config
@@ -140,6 +141,10 @@ def apply_repo_config(artifact: Artifact, config: RepoConfig) -> Artifact:
         kwargs["export_step"] = defaults.export_step
     if artifact.export_3mf is None:
         kwargs["export_3mf"] = defaults.export_3mf
+    for limit in ("timeout", "cpu_time", "max_memory"):
+        value = getattr(defaults, limit)
+        if getattr(artifact, limit) is None and value is not None:
+            kwargs[limit] = value
     if not kwargs:
         return artifact
     return dataclasses.replace(artifact, **kwargs)
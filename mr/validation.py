@@ -0,0 +1,64 @@
+import threading
+import typing
+import weakref
+
+from .data_types import Customizable
+from .exceptions import GeneratorValidationError
+
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+
+# Validators by the parameters schema, so that they go away with the schema class
+_validators: "weakref.WeakKeyDictionary[type, ParameterValidator]" = (
+    weakref.WeakKeyDictionary()
+)
+_validators_lock = threading.Lock()
+
+
+class ParameterValidator:
+    """Validator of the parameters of a customizable, built once from the compiled
+    ``pydantic.TypeAdapter`` of its parameters schema.
+    """
+
+    def __init__(self, schema: typing.Type["BaseModel"]):
+        from pydantic import TypeAdapter
+        from pydantic import ValidationError
+
+        self.schema = schema
+        self.adapter: TypeAdapter = TypeAdapter(schema)
+        self._validation_error = ValidationError
+
+    def validate_json(self, data: str | bytes) -> "BaseModel":
+        """Validate the raw JSON parameters without parsing into a dict first.
+
+        :raises GeneratorValidationError: If the parameters are invalid.
+        """
+        try:
+            return self.adapter.validate_json(data)
+        except self._validation_error as exp:
+            raise GeneratorValidationError.from_validation_error(exp) from exp
+
+    def validate_python(self, data: typing.Any) -> "BaseModel":
+        """Validate the parameters from Python objects, such as a dict.
+
+        :raises GeneratorValidationError: If the parameters are invalid.
+        """
+        try:
+            return self.adapter.validate_python(data)
+        except self._validation_error as exp:
+            raise GeneratorValidationError.from_validation_error(exp) from exp
+
+
+def get_validator(customizable: Customizable) -> ParameterValidator:
+    """Return the cached validator of the customizable's parameters schema, building
+    it on first use.
+    """
+    schema = customizable.parameters_schema
+    validator = _validators.get(schema)
+    if validator is None:
+        with _validators_lock:
+            validator = _validators.get(schema)
+            if validator is None:
+                validator = ParameterValidator(schema)
+                _validators[schema] = validator
+    return validator
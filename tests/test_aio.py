@@ -0,0 +1,182 @@
+import asyncio
+import concurrent.futures
+import sys
+import threading
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from mr import artifact
+from mr import customizable
+from mr import GeneratorValidationError
+from mr.aio import build_all
+from mr.aio import build_artifact
+from mr.aio import generate
+from mr.export import ExportFormat
+from mr.limits import LimitKind
+from mr.registry import collect
+from mr.registry import Registry
+
+running = 0
+max_running = 0
+running_lock = threading.Lock()
+
+
+@artifact
+def aio_box():
+    from build123d import Box
+
+    return Box(1, 2, 3)
+
+
+@artifact
+def aio_failure():
+    raise ValueError("boom")
+
+
+@artifact
+def aio_slow():
+    global running, max_running
+    with running_lock:
+        running += 1
+        max_running = max(max_running, running)
+    time.sleep(0.2)
+    with running_lock:
+        running -= 1
+    return "slow"
+
+
+@artifact
+def aio_stuck():
+    time.sleep(60)
+
+
+class CubeParams(BaseModel):
+    size: float = 1
+
+
+@customizable
+def aio_cube(params: CubeParams):
+    from build123d import Box
+
+    return Box(params.size, params.size, params.size)
+
+
+@pytest.fixture
+def registry() -> Registry:
+    return collect([sys.modules[__name__]])
+
+
+def test_build_artifact(registry: Registry):
+    box = registry.artifacts[__name__]["aio_box"]
+    result = asyncio.run(build_artifact(box))
+    assert result.ok
+    assert result.result.model.volume == pytest.approx(6)
+
+    failure = registry.artifacts[__name__]["aio_failure"]
+    result = asyncio.run(build_artifact(failure))
+    assert not result.ok
+    assert "ValueError: boom" in result.error
+
+
+def test_build_artifact_timeout(registry: Registry):
+    slow = registry.artifacts[__name__]["aio_slow"]
+    result = asyncio.run(build_artifact(slow, timeout=0.01))
+    assert not result.ok
+    assert "Timed out" in result.error
+
+
+def test_build_artifact_process_pool(registry: Registry):
+    box = registry.artifacts[__name__]["aio_box"]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        result = asyncio.run(build_artifact(box, executor=executor))
+    assert result.ok
+    assert result.result.model.volume == pytest.approx(6)
+
+
+def test_build_artifact_process_pool_timeout(registry: Registry):
+    stuck = registry.artifacts[__name__]["aio_stuck"]
+    box = registry.artifacts[__name__]["aio_box"]
+
+    async def run():
+        result = await build_artifact(stuck, executor=executor, timeout=0.5)
+        assert not result.ok
+        assert result.limit_exceeded == LimitKind.TIMEOUT
+        # The stuck build is killed, the single worker is free for the next one
+        return await build_artifact(box, executor=executor, timeout=30)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        result = asyncio.run(run())
+    assert result.ok
+    assert result.result.model.volume == pytest.approx(6)
+
+
+def test_build_artifact_process_pool_cancel(registry: Registry):
+    stuck = registry.artifacts[__name__]["aio_stuck"]
+    box = registry.artifacts[__name__]["aio_box"]
+
+    async def run():
+        task = asyncio.create_task(build_artifact(stuck, executor=executor))
+        await asyncio.sleep(1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await build_artifact(box, executor=executor, timeout=30)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        result = asyncio.run(run())
+    assert result.ok
+
+
+def test_build_all(registry: Registry):
+    global max_running
+    max_running = 0
+    slow = registry.artifacts[__name__]["aio_slow"]
+
+    async def run():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            return [
+                result
+                async for result in build_all(
+                    registry,
+                    artifacts=[slow] * 4 + [registry.artifacts[__name__]["aio_box"]],
+                    executor=executor,
+                    max_concurrency=2,
+                )
+            ]
+
+    results = asyncio.run(run())
+    assert len(results) == 5
+    assert all(result.ok for result in results)
+    assert max_running == 2
+
+
+def test_build_all_cancel(registry: Registry):
+    slow = registry.artifacts[__name__]["aio_slow"]
+
+    async def run():
+        results = []
+
+        async def consume():
+            async for result in build_all(
+                registry, artifacts=[slow] * 10, max_concurrency=2
+            ):
+                results.append(result)
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return results
+
+    assert len(asyncio.run(run())) < 10
+
+
+def test_generate(registry: Registry):
+    cube = registry.customizables[__name__]["aio_cube"]
+    data = asyncio.run(generate(cube, b'{"size": 2}', ExportFormat.BREP))
+    assert data
+    with pytest.raises(GeneratorValidationError):
+        asyncio.run(generate(cube, b'{"size": "x"}'))
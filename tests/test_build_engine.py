@@ -0,0 +1,87 @@
+import pathlib
+import sys
+
+import pytest
+
+from mr import Artifact
+from mr import artifact
+from mr import Result
+from mr.build_engine import BuildEngine
+from mr.build_engine import DurationHistory
+from mr.build_engine import schedule
+from mr.data_types import RepoConfig
+from mr.registry import collect
+
+
+@artifact
+def engine_box():
+    from build123d import Box
+
+    return Box(1, 2, 3)
+
+
+@artifact(export_step=False)
+def engine_value():
+    return "engine_value"
+
+
+@artifact
+def engine_versioned():
+    return Result(model="model", versioned="versioned")
+
+
+@artifact
+def engine_failure():
+    raise RuntimeError("boom")
+
+
+def _make_artifact(name: str) -> Artifact:
+    return Artifact(module="test", name=name, func=lambda: None, sample=False)
+
+
+def test_schedule_longest_first(tmp_path: pathlib.Path):
+    history = DurationHistory(tmp_path / "durations.json")
+    artifacts = [_make_artifact(name) for name in ["a", "b", "c", "d"]]
+    history.record(artifacts[0], 1.0)
+    history.record(artifacts[1], 5.0)
+    history.record(artifacts[3], 3.0)
+    assert [a.name for a in schedule(artifacts, history)] == ["c", "b", "d", "a"]
+
+
+def test_duration_history_roundtrip(tmp_path: pathlib.Path):
+    path = tmp_path / "sub" / "durations.json"
+    history = DurationHistory(path)
+    history.record(_make_artifact("a"), 1.5)
+    history.save()
+    assert DurationHistory(path).get(_make_artifact("a")) == 1.5
+    assert DurationHistory(path).get(_make_artifact("b")) is None
+
+
+def test_build_engine(tmp_path: pathlib.Path):
+    module = sys.modules[__name__]
+    registry = collect([module])
+    history = DurationHistory(tmp_path / "durations.json")
+    with BuildEngine(RepoConfig(), max_workers=2, history=history) as engine:
+        results = {result.artifact.name: result for result in engine.build(registry)}
+    assert set(results) == {
+        "engine_box",
+        "engine_value",
+        "engine_versioned",
+        "engine_failure",
+    }
+    assert results["engine_box"].ok
+    assert results["engine_box"].result.model.volume == pytest.approx(6)
+    assert results["engine_value"].result == Result(model="engine_value")
+    # Repo config defaults are applied to the artifacts
+    assert results["engine_value"].artifact.export_step is False
+    assert results["engine_value"].artifact.export_3mf is True
+    assert results["engine_versioned"].result == Result(
+        model="model", versioned="versioned"
+    )
+    assert not results["engine_failure"].ok
+    assert results["engine_failure"].result is None
+    assert "RuntimeError: boom" in results["engine_failure"].error
+    # Durations of successful builds are recorded for scheduling the next build
+    durations = DurationHistory(tmp_path / "durations.json")
+    assert durations.get(results["engine_box"].artifact) is not None
+    assert durations.get(results["engine_failure"].artifact) is None
@@ -0,0 +1,219 @@
+import importlib
+import itertools
+import os
+import pathlib
+import sys
+import textwrap
+
+import pytest
+
+from mr.cache_key import code_hash
+
+_counter = itertools.count()
+
+HELPERS = """\
+WIDTH = 10
+
+
+def helper(value):
+    return value * WIDTH
+
+
+def unrelated():
+    return 1
+"""
+
+MAIN = """\
+from . import helpers
+from .helpers import helper
+
+
+def main(value):
+    return helper(value) + helpers.unrelated()
+
+
+def uses_constant():
+    return helpers.WIDTH
+
+
+def recursive(value):
+    return recursive(value - 1) if value else os.sep
+
+
+import os
+"""
+
+
+def _load(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, **files: str):
+    """Write a package with the files into a new folder and import it as a
+    repo-local package, replacing the previously loaded one like a new commit.
+    """
+    name = "code_hash_pkg"
+    root = tmp_path / str(next(_counter)) / name
+    root.mkdir(parents=True)
+    (root / "__init__.py").write_text("")
+    for module, source in files.items():
+        (root / f"{module}.py").write_text(textwrap.dedent(source))
+    for module in [module for module in sys.modules if module.startswith(name)]:
+        monkeypatch.delitem(sys.modules, module)
+    monkeypatch.syspath_prepend(str(root.parent))
+    return importlib.import_module(f"{name}.main")
+
+
+def test_code_hash_stable(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    first = _load(tmp_path, monkeypatch, helpers=HELPERS, main=MAIN)
+    second = _load(tmp_path, monkeypatch, helpers=HELPERS, main=MAIN)
+    assert code_hash(first.main) == code_hash(second.main)
+    assert code_hash(first.recursive) == code_hash(second.recursive)
+    assert code_hash(first.main) != code_hash(first.uses_constant)
+
+
+@pytest.mark.parametrize(
+    "helpers, main, changed",
+    [
+        # Logic of a helper called by the function
+        (HELPERS.replace("value * WIDTH", "value + WIDTH"), MAIN, True),
+        # A constant used by a helper
+        (HELPERS.replace("WIDTH = 10", "WIDTH = 11"), MAIN, True),
+        # A function referenced by module attribute
+        (HELPERS.replace("return 1", "return 2"), MAIN, True),
+        # Moving code around
+        ("\n\n# comment\n" + HELPERS, "\n" + MAIN, False),
+        # Unrelated code in the same module
+        (HELPERS + "\n\ndef other():\n    return 3\n", MAIN, False),
+        (HELPERS + "\nHEIGHT = 5\n", MAIN, False),
+    ],
+)
+def test_code_hash_dependencies(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    helpers: str,
+    main: str,
+    changed: bool,
+):
+    base = _load(tmp_path, monkeypatch, helpers=HELPERS, main=MAIN)
+    other = _load(tmp_path, monkeypatch, helpers=helpers, main=main)
+    assert (code_hash(base.main) != code_hash(other.main)) is changed
+
+
+SHAPES = """\
+import threading
+
+LOCK = threading.Lock()
+
+
+def uses_lock():
+    return LOCK
+
+
+def make_closure(value):
+    def closure():
+        return value
+
+    return closure
+
+
+closure = make_closure(10)
+lock_closure = make_closure(LOCK)
+"""
+
+
+@pytest.mark.parametrize(
+    "source, changed",
+    [
+        # Values without a stable representation fall back to their module source
+        (SHAPES + "\n# comment\n", True),
+        (SHAPES, False),
+    ],
+)
+def test_code_hash_unstable_constants(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, source: str, changed: bool
+):
+    base = _load(tmp_path, monkeypatch, main=SHAPES)
+    other = _load(tmp_path, monkeypatch, main=source)
+    assert (code_hash(base.uses_lock) != code_hash(other.uses_lock)) is changed
+    assert (code_hash(base.lock_closure) != code_hash(other.lock_closure)) is changed
+    # Canonicalizable values are hashed on their own
+    assert code_hash(base.closure) == code_hash(other.closure)
+
+
+def test_code_hash_closure(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    module = _load(tmp_path, monkeypatch, main=SHAPES)
+    assert code_hash(module.closure) == code_hash(module.make_closure(10))
+    assert code_hash(module.closure) != code_hash(module.make_closure(11))
+
+
+DEFAULTS = """\
+import math
+
+
+def helper(value):
+    return value * 2
+
+
+class Options:
+    pass
+
+
+def uses_defaults(value, op=helper, options=Options(), *, root=math.sqrt):
+    return op(value)
+
+
+class Base:
+    WIDTH = 10
+
+
+class Dim(Base):
+    HEIGHT = 2
+
+    def area(self):
+        return self.WIDTH * self.HEIGHT
+
+
+def uses_class():
+    return Dim().area()
+"""
+
+
+def test_code_hash_defaults_stable(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+):
+    first = _load(tmp_path, monkeypatch, main=DEFAULTS)
+    second = _load(tmp_path, monkeypatch, main=DEFAULTS)
+    assert code_hash(first.uses_defaults) == code_hash(second.uses_defaults)
+    assert code_hash(first.uses_class) == code_hash(second.uses_class)
+
+
+@pytest.mark.parametrize(
+    "source, func, changed",
+    [
+        # A repo function used as a default argument
+        (DEFAULTS.replace("value * 2", "value * 3"), "uses_defaults", True),
+        (DEFAULTS.replace("root=math.sqrt", "root=math.exp"), "uses_defaults", True),
+        # Class attributes, of the class or its bases
+        (DEFAULTS.replace("HEIGHT = 2", "HEIGHT = 3"), "uses_class", True),
+        (DEFAULTS.replace("WIDTH = 10", "WIDTH = 20"), "uses_class", True),
+        (DEFAULTS + "\n\ndef other():\n    return 3\n", "uses_class", False),
+    ],
+)
+def test_code_hash_defaults_and_classes(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    source: str,
+    func: str,
+    changed: bool,
+):
+    base = _load(tmp_path, monkeypatch, main=DEFAULTS)
+    other = _load(tmp_path, monkeypatch, main=source)
+    assert (
+        code_hash(getattr(base, func)) != code_hash(getattr(other, func))
+    ) is changed
+
+
+def test_code_hash_library_functions():
+    def func():
+        return os.path.join("a", "b")
+
+    assert code_hash(func) == code_hash(func)
+    with pytest.raises(TypeError):
+        code_hash(len)
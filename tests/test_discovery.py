@@ -0,0 +1,193 @@
+import dataclasses
+import pathlib
+import sys
+import textwrap
+
+import pytest
+
+from mr.discovery import ArtifactInfo
+from mr.discovery import CachedInfo
+from mr.discovery import CustomizableInfo
+from mr.discovery import discover
+from mr.discovery import find_module_files
+from mr.discovery import scan_file
+from mr.discovery import scan_source
+from mr.registry import collect
+from tests import test_artifacts
+from tests import test_cached
+from tests import test_customizables
+
+
+@pytest.mark.parametrize(
+    "subdir, expected_modules",
+    [
+        ("examples", ["main"]),
+        (
+            "pkg_example",
+            ["mypkg", "mypkg.main", "mypkg.nested", "mypkg.nested.other"],
+        ),
+    ],
+)
+def test_find_module_files(
+    fixtures_folder: pathlib.Path, subdir: str, expected_modules: list[str]
+):
+    files = find_module_files(fixtures_folder / subdir)
+    assert [module for module, _ in files] == expected_modules
+
+
+def test_discover(fixtures_folder: pathlib.Path):
+    root = fixtures_folder / "pkg_example"
+    filepath = str(root / "mypkg" / "main.py")
+    registry = discover(root)
+    assert registry.artifacts == {
+        "mypkg.main": {
+            "main": ArtifactInfo(
+                module="mypkg.main", name="main", filepath=filepath, lineno=25
+            )
+        }
+    }
+    assert registry.caches == {
+        "mypkg.main": {
+            "cached_box": CachedInfo(
+                module="mypkg.main",
+                name="cached_box",
+                desc="Return a cached ExampleBox instance.",
+                short_desc="example_cached_box",
+                filepath=filepath,
+                lineno=31,
+            )
+        }
+    }
+    assert registry.customizables == {}
+
+
+@pytest.mark.parametrize("module", [test_artifacts, test_cached, test_customizables])
+def test_scan_file_matches_collect(module):
+    """Static discovery yields the same metadata as importing and scanning."""
+    module_info = scan_file(pathlib.Path(module.__file__), module.__name__)
+    registry = collect([module])
+    for info in module_info.artifacts:
+        expected = registry.artifacts[module.__name__][info.name]
+        for field in dataclasses.fields(info):
+            assert getattr(info, field.name) == getattr(expected, field.name)
+    for info in module_info.customizables:
+        expected = registry.customizables[module.__name__][info.name]
+        assert info.parameters_schema == expected.parameters_schema.__name__
+        for name in ("desc", "short_desc", "filepath", "lineno"):
+            assert getattr(info, name) == getattr(expected, name)
+    for info in module_info.caches:
+        expected = registry.caches[module.__name__][info.name]
+        for field in dataclasses.fields(info):
+            assert getattr(info, field.name) == getattr(expected, field.name)
+    assert {info.name for info in module_info.artifacts} == set(
+        registry.artifacts.get(module.__name__, {})
+    )
+    assert {info.name for info in module_info.customizables} == set(
+        registry.customizables.get(module.__name__, {})
+    )
+    assert {info.name for info in module_info.caches} == set(
+        registry.caches.get(module.__name__, {})
+    )
+
+
+def test_scan_source_decorator_forms():
+    source = textwrap.dedent(
+        """
+        import mr
+        import mr as mr_alias
+        from mr import artifact as make_artifact
+        from mr.decorator import cached
+        from other import customizable
+
+        SAMPLE = True
+
+        @mr.artifact(sample=SAMPLE, short_desc="attr")
+        def by_attribute():
+            pass
+
+        @mr_alias.cached
+        def by_module_alias():
+            pass
+
+        @make_artifact(export_step=False)
+        def by_alias():
+            pass
+
+        @cached()
+        def by_decorator_module():
+            pass
+
+        @customizable
+        def not_from_mr(params):
+            pass
+
+        def nested():
+            @make_artifact
+            def inner():
+                pass
+        """
+    )
+    module_info = scan_source(source, "mod")
+    assert [
+        (a.name, a.sample, a.short_desc, a.export_step) for a in module_info.artifacts
+    ] == [
+        ("by_attribute", False, "attr", None),
+        ("by_alias", False, None, False),
+    ]
+    assert [c.name for c in module_info.caches] == [
+        "by_module_alias",
+        "by_decorator_module",
+    ]
+    assert module_info.customizables == ()
+
+
+def test_discover_onerror(tmp_path: pathlib.Path):
+    (tmp_path / "broken.py").write_text("def oops(:\n")
+    (tmp_path / "good.py").write_text(
+        "from mr import artifact\n\n@artifact\ndef ok():\n    pass\n"
+    )
+    with pytest.raises(SyntaxError):
+        discover(tmp_path)
+    errors = []
+    registry = discover(tmp_path, onerror=errors.append)
+    assert errors == ["broken"]
+    assert list(registry.artifacts["good"]) == ["ok"]
+
+
+def test_discover_customizable(tmp_path: pathlib.Path):
+    (tmp_path / "panel.py").write_text(
+        textwrap.dedent(
+            """\
+            from pydantic import BaseModel
+
+            from mr import customizable
+
+
+            class PanelParams(BaseModel):
+                width: float = 10
+
+
+            @customizable
+            def panel(params: PanelParams):
+                pass
+            """
+        )
+    )
+    registry = discover(tmp_path)
+    assert registry.customizables == {
+        "panel": {
+            "panel": CustomizableInfo(
+                module="panel",
+                name="panel",
+                parameters_schema="PanelParams",
+                filepath=str(tmp_path / "panel.py"),
+                lineno=10,
+            )
+        }
+    }
+    assert "panel" not in sys.modules
+
+
+def test_discover_does_not_import(fixtures_folder: pathlib.Path):
+    discover(fixtures_folder / "pkg_example")
+    assert "mypkg.main" not in sys.modules
@@ -0,0 +1,115 @@
+import os
+import pathlib
+import textwrap
+
+import pytest
+
+from mr import discovery
+from mr.discovery import discover
+from mr.discovery_index import DiscoveryIndex
+
+
+@pytest.fixture
+def repo(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "__init__.py").touch()
+    (root / "pkg" / "parts.py").write_text(
+        textwrap.dedent(
+            """
+            from mr import artifact
+
+            @artifact
+            def part():
+                pass
+            """
+        )
+    )
+    (root / "single.py").write_text(
+        textwrap.dedent(
+            """
+            from mr import cached
+
+            @cached
+            def helper():
+                pass
+            """
+        )
+    )
+    return root
+
+
+@pytest.fixture
+def scanned(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    scanned_modules: list[str] = []
+    scan_file = discovery.scan_file
+
+    def _scan_file(path: pathlib.Path, module: str):
+        scanned_modules.append(module)
+        return scan_file(path, module)
+
+    monkeypatch.setattr(discovery, "scan_file", _scan_file)
+    return scanned_modules
+
+
+def test_discover_with_index(
+    tmp_path: pathlib.Path, repo: pathlib.Path, scanned: list[str]
+):
+    index_path = tmp_path / "index.json"
+    registry = discover(repo, index=DiscoveryIndex(index_path))
+    assert sorted(scanned) == ["pkg", "pkg.parts", "single"]
+    assert index_path.exists()
+
+    scanned.clear()
+    cached_registry = discover(repo, index=DiscoveryIndex(index_path))
+    assert scanned == []
+    assert cached_registry.artifacts == registry.artifacts
+    assert cached_registry.caches == registry.caches
+
+
+def test_discover_with_index_rescans_changed(
+    tmp_path: pathlib.Path, repo: pathlib.Path, scanned: list[str]
+):
+    index_path = tmp_path / "index.json"
+    discover(repo, index=DiscoveryIndex(index_path))
+    scanned.clear()
+
+    parts = repo / "pkg" / "parts.py"
+    parts.write_text(parts.read_text().replace("def part", "def renamed_part"))
+    registry = discover(repo, index=DiscoveryIndex(index_path))
+    assert scanned == ["pkg.parts"]
+    assert list(registry.artifacts["pkg.parts"]) == ["renamed_part"]
+
+
+def test_discover_with_index_touched_file(
+    tmp_path: pathlib.Path, repo: pathlib.Path, scanned: list[str]
+):
+    index_path = tmp_path / "index.json"
+    discover(repo, index=DiscoveryIndex(index_path))
+    scanned.clear()
+
+    single = repo / "single.py"
+    stat = single.stat()
+    os.utime(single, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    index = DiscoveryIndex(index_path)
+    discover(repo, index=index)
+    # Same content, so the hash matches and the module is not parsed again
+    assert scanned == []
+    assert index.entries["single"].fingerprint.mtime_ns == single.stat().st_mtime_ns
+
+
+def test_discover_with_index_removed_module(tmp_path: pathlib.Path, repo: pathlib.Path):
+    index_path = tmp_path / "index.json"
+    discover(repo, index=DiscoveryIndex(index_path))
+    (repo / "single.py").unlink()
+    registry = discover(repo, index=DiscoveryIndex(index_path))
+    assert "single" not in registry.caches
+    assert "single" not in DiscoveryIndex(index_path).entries
+
+
+def test_discovery_index_invalid_file(tmp_path: pathlib.Path):
+    index_path = tmp_path / "index.json"
+    index_path.write_text("not json")
+    assert DiscoveryIndex(index_path).entries == {}
+    index_path.write_text('{"version": -1, "modules": {"a": {}}}')
+    assert DiscoveryIndex(index_path).entries == {}
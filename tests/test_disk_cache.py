@@ -0,0 +1,159 @@
+import enum
+import os
+import pathlib
+import sys
+import typing
+
+import pytest
+from pydantic import BaseModel
+
+from mr import cached
+from mr.cache_key import canonical_json
+from mr.cache_key import canonicalize
+from mr.cache_key import make_cache_key
+from mr.disk_cache import DiskCache
+from mr.registry import collect
+
+calls: list[typing.Any] = []
+
+
+@cached
+def disk_cached_func(value: int, scale: float = 1.0):
+    calls.append((value, scale))
+    return {"value": value * scale}
+
+
+@cached
+def disk_cached_box(size: float):
+    from build123d import Box
+
+    calls.append(size)
+    return Box(size, size, size)
+
+
+class Params(BaseModel):
+    width: int
+
+
+class Size(enum.IntEnum):
+    SMALL = 1
+
+
+@pytest.fixture
+def cache(tmp_path: pathlib.Path) -> typing.Iterator[DiskCache]:
+    module = sys.modules[__name__]
+    registry = collect([module])
+    for cached_obj in registry.caches[__name__].values():
+        cached_obj.lookup_funcs.clear()
+        cached_obj.store_funcs.clear()
+    disk_cache = DiskCache(tmp_path / "cache")
+    disk_cache.attach_registry(registry)
+    calls.clear()
+    yield disk_cache
+    for cached_obj in registry.caches[__name__].values():
+        cached_obj.lookup_funcs.clear()
+        cached_obj.store_funcs.clear()
+
+
+@pytest.mark.parametrize(
+    "lhs, rhs, equal",
+    [
+        ((1, 2.0), (1, 2.0), True),
+        ({"a": 1, "b": 2}, {"b": 2, "a": 1}, True),
+        ({1, 2, 3}, {3, 2, 1}, True),
+        (Params(width=1), Params(width=1), True),
+        ((1,), [1], False),
+        (1, 1.0, False),
+        (Params(width=1), Params(width=2), False),
+        (Size.SMALL, 1, False),
+        (Size.SMALL, Size.SMALL, True),
+    ],
+)
+def test_canonicalize(lhs: typing.Any, rhs: typing.Any, equal: bool):
+    assert (canonicalize(lhs) == canonicalize(rhs)) is equal
+
+
+def test_canonicalize_unsupported_value():
+    with pytest.raises(TypeError):
+        canonicalize(object())
+
+
+def test_canonical_json():
+    assert canonical_json({"b": 1, "a": {2, 1}}) == canonical_json(
+        {"a": {1, 2}, "b": 1}
+    )
+    assert canonical_json(1) != canonical_json(1.0)
+    with pytest.raises(TypeError):
+        canonical_json(object())
+
+
+def test_make_cache_key():
+    module = sys.modules[__name__]
+    registry = collect([module])
+    cached_obj = registry.caches[__name__]["disk_cached_func"]
+    key = make_cache_key(cached_obj, (1,), {"scale": 2.0})
+    assert key == make_cache_key(cached_obj, (1,), {"scale": 2.0})
+    assert key != make_cache_key(cached_obj, (1,), {"scale": 3.0})
+    assert key != make_cache_key(
+        registry.caches[__name__]["disk_cached_box"], (1,), {"scale": 2.0}
+    )
+
+
+def test_disk_cache_hit(cache: DiskCache):
+    assert disk_cached_func(2, scale=3.0) == {"value": 6.0}
+    assert disk_cached_func(2, scale=3.0) == {"value": 6.0}
+    assert disk_cached_func(3) == {"value": 3.0}
+    assert calls == [(2, 3.0), (3, 1.0)]
+
+
+def test_disk_cache_persists(cache: DiskCache):
+    assert disk_cached_func(5) == {"value": 5.0}
+    # A new cache instance pointing to the same folder sees the previous entry
+    other = DiskCache(cache.path)
+    module = sys.modules[__name__]
+    cached_obj = collect([module]).caches[__name__]["disk_cached_func"]
+    assert other.lookup(cached_obj, (5,), {}) == {"value": 5.0}
+
+
+def test_disk_cache_uncacheable_args(cache: DiskCache):
+    class Opaque:
+        def __mul__(self, other):
+            return 42
+
+    value = Opaque()
+    assert disk_cached_func(value) == {"value": 42}
+    assert disk_cached_func(value) == {"value": 42}
+    assert len(calls) == 2
+    assert cache.size() == 0
+
+
+def test_disk_cache_shape(cache: DiskCache):
+    first = disk_cached_box(2.0)
+    second = disk_cached_box(2.0)
+    assert calls == [2.0]
+    assert second.volume == pytest.approx(first.volume)
+
+
+def test_disk_cache_evict(tmp_path: pathlib.Path):
+    disk_cache = DiskCache(tmp_path, max_size=None)
+    for i in range(5):
+        disk_cache.put(f"{i:064x}", b"x" * 80)
+        entry = disk_cache._entry_path(f"{i:064x}")
+        os.utime(entry, ns=(i * 1_000_000_000, i * 1_000_000_000))
+    # Touch the oldest entry so that it becomes the most recently used one
+    assert disk_cache.get(f"{0:064x}") == b"x" * 80
+    assert disk_cache.evict(250) <= 250
+    assert disk_cache.get(f"{0:064x}") is not None
+    assert disk_cache.get(f"{1:064x}") is None
+    assert disk_cache.get(f"{4:064x}") is not None
+
+
+def test_disk_cache_overwrite_size(tmp_path: pathlib.Path):
+    disk_cache = DiskCache(tmp_path, max_size=250)
+    disk_cache.put(f"{0:064x}", b"x" * 80)
+    disk_cache.put(f"{1:064x}", b"x" * 80)
+    # Overwriting the same entry doesn't grow the tracked size into an eviction
+    for _ in range(5):
+        disk_cache.put(f"{1:064x}", b"x" * 80)
+    assert disk_cache.get(f"{0:064x}") == b"x" * 80
+    assert disk_cache._size == disk_cache.size()
@@ -215,3 +215,33 @@ def test_generator_validation_error_from_value_error_empty_message():
     err = GeneratorValidationError.from_value_error(ve)
     assert err.messages == ("",)
     assert err.fields == []
+
+
+def test_generator_validation_error_from_validation_error():
+    """Pydantic validation errors become field errors at their locations."""
+    from pydantic import BaseModel
+    from pydantic import model_validator
+    from pydantic import ValidationError
+
+    class Size(BaseModel):
+        width: int
+        heights: list[int]
+
+        @model_validator(mode="after")
+        def check(self):
+            if self.width < 0:
+                raise ValueError("Width must be positive")
+            return self
+
+    with pytest.raises(ValidationError) as exc_info:
+        Size.model_validate({"width": "abc", "heights": [1, "x"]})
+    err = GeneratorValidationError.from_validation_error(exc_info.value)
+    assert err.messages == ()
+    assert [f.path for f in err.fields] == [("width",), ("heights", 1)]
+    assert "heights.1" in str(err)
+
+    with pytest.raises(ValidationError) as exc_info:
+        Size.model_validate({"width": -1, "heights": []})
+    err = GeneratorValidationError.from_validation_error(exc_info.value)
+    assert err.messages == ("Value error, Width must be positive",)
+    assert err.fields == []
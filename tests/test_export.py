@@ -0,0 +1,86 @@
+import pathlib
+
+import pytest
+from build123d import Box
+
+from mr import Artifact
+from mr import Result
+from mr.build_engine import BuildResult
+from mr.data_types import RepoConfig
+from mr.export import export_formats
+from mr.export import export_model
+from mr.export import export_path
+from mr.export import ExportFormat
+from mr.export import ExportPipeline
+
+
+def _make_artifact(name: str, **kwargs) -> Artifact:
+    return Artifact(module="mod", name=name, func=lambda: None, sample=False, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        (
+            dict(export_step=True, export_3mf=True),
+            [ExportFormat.STEP, ExportFormat.THREE_MF],
+        ),
+        (dict(export_step=True, export_3mf=False), [ExportFormat.STEP]),
+        (dict(export_step=False, export_3mf=True), [ExportFormat.THREE_MF]),
+        (dict(export_step=False, export_3mf=False), []),
+    ],
+)
+def test_export_formats(kwargs: dict, expected: list[ExportFormat]):
+    assert export_formats(_make_artifact("a", **kwargs)) == expected
+
+
+def test_export_path(tmp_path: pathlib.Path):
+    artifact = _make_artifact("main")
+    assert export_path(tmp_path, artifact, ExportFormat.STEP) == (
+        tmp_path / "mod" / "main.step"
+    )
+    assert export_path(tmp_path, artifact, ExportFormat.THREE_MF, versioned=True) == (
+        tmp_path / "mod" / "main-versioned.3mf"
+    )
+
+
+@pytest.mark.parametrize("export_format", list(ExportFormat))
+def test_export_model(tmp_path: pathlib.Path, export_format: ExportFormat):
+    path = tmp_path / f"box.{export_format.value}"
+    duration = export_model(Box(1, 2, 3), export_format, path)
+    assert duration > 0
+    assert path.stat().st_size > 0
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_export_pipeline(tmp_path: pathlib.Path):
+    build_results = [
+        BuildResult(
+            artifact=_make_artifact("both"),
+            result=Result(model=Box(1, 1, 1), versioned=Box(2, 2, 2)),
+        ),
+        BuildResult(
+            artifact=_make_artifact("step_only", export_3mf=False),
+            result=Result(model=Box(1, 1, 1)),
+        ),
+        BuildResult(
+            artifact=_make_artifact("invalid", export_3mf=False),
+            result=Result(model="not a shape"),
+        ),
+        BuildResult(artifact=_make_artifact("failed"), error="boom"),
+    ]
+    with ExportPipeline(RepoConfig(), tmp_path, max_workers=2) as pipeline:
+        results = list(pipeline.export(iter(build_results)))
+    summary = {(r.artifact.name, r.format, r.versioned): r.ok for r in results}
+    assert summary == {
+        ("both", ExportFormat.STEP, False): True,
+        ("both", ExportFormat.STEP, True): True,
+        ("both", ExportFormat.THREE_MF, False): True,
+        ("both", ExportFormat.THREE_MF, True): True,
+        ("step_only", ExportFormat.STEP, False): True,
+        ("invalid", ExportFormat.STEP, False): False,
+    }
+    for result in results:
+        if result.ok:
+            assert result.path.exists()
+            assert result.duration > 0
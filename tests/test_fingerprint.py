@@ -0,0 +1,87 @@
+import time
+
+import pytest
+from build123d import Box
+from build123d import BuildPart
+from build123d import Cylinder
+from build123d import Locations
+from build123d import Mode
+from build123d import Pos
+
+from mr import serialization
+from mr.data_types import Result
+from mr.fingerprint import fingerprint
+from mr.fingerprint import shape_fingerprint
+from mr.fingerprint import topology_counts
+
+
+def _bracket(order: list[str]):
+    with BuildPart() as part:
+        Box(20, 10, 5)
+        for name in order:
+            if name == "boss":
+                with Locations((5, 0, 2.5)):
+                    Cylinder(2, 4)
+            elif name == "hole":
+                with Locations((-5, 0, 0)):
+                    Cylinder(1.5, 5, mode=Mode.SUBTRACT)
+    return part.part
+
+
+def test_fingerprint_construction_order():
+    assert fingerprint(_bracket(["boss", "hole"])) == fingerprint(
+        _bracket(["hole", "boss"])
+    )
+
+
+def test_fingerprint_changes():
+    box = Box(10, 10, 10)
+    assert fingerprint(box) == fingerprint(Box(10, 10, 10))
+    assert fingerprint(box) != fingerprint(Box(10, 10, 11))
+    assert fingerprint(box) != fingerprint(Pos(1, 0, 0) * box)
+
+
+def test_fingerprint_serialization_roundtrip():
+    part = _bracket(["boss", "hole"])
+    assert fingerprint(serialization.loads(serialization.dumps(part))) == fingerprint(
+        part
+    )
+
+
+def test_fingerprint_noise():
+    box = Box(10, 10, 10)
+    assert fingerprint(box) == fingerprint(Pos(1e-9, -1e-9, 0) * box)
+
+
+def test_shape_fingerprint_translation_invariant():
+    box = Box(10, 10, 10)
+    moved = Pos(3, 4, 5) * box
+    key, offset = shape_fingerprint(box, translation_invariant=True)
+    moved_key, moved_offset = shape_fingerprint(moved, translation_invariant=True)
+    assert key == moved_key
+    assert tuple(moved_offset - offset) == pytest.approx((3, 4, 5))
+
+
+def test_topology_counts():
+    # Solids, shells, faces, wires, edges and vertices
+    assert topology_counts(Box(1, 1, 1).wrapped).tolist() == [1, 1, 6, 6, 12, 8]
+
+
+def test_fingerprint_values():
+    box = Box(1, 2, 3)
+    assert fingerprint([box, 1]) == fingerprint([Box(1, 2, 3), 1])
+    assert fingerprint([box, 1]) != fingerprint([box, 2])
+    assert fingerprint(Result(model=box)) == fingerprint(Result(model=Box(1, 2, 3)))
+    assert fingerprint(Result(model=box)) != fingerprint(box)
+    assert fingerprint({"a": 1}) == fingerprint({"a": 1})
+    with pytest.raises(TypeError):
+        fingerprint(object())
+
+
+def test_fingerprint_speed():
+    part = _bracket(["boss", "hole"])
+    fingerprint(part)
+    start = time.perf_counter()
+    for _ in range(10):
+        fingerprint(part)
+    assert (time.perf_counter() - start) / 10 < 0.05
@@ -0,0 +1,285 @@
+import concurrent.futures
+import http.client
+import json
+import pathlib
+import threading
+import typing
+
+import pytest
+from pydantic import BaseModel
+from pydantic import Field
+
+from mr import customizable
+from mr import GeneratorValidationError
+from mr.config import RepoConfig
+from mr.export import ExportFormat
+from mr.generator import GeneratorError
+from mr.generator import GeneratorPool
+from mr.generator import GeneratorServer
+
+
+class BoxParams(BaseModel):
+    width: float = Field(default=10, gt=0)
+    height: float = Field(default=10, gt=0)
+
+
+@customizable
+def generated_box(params: BoxParams):
+    from build123d import Box
+
+    if params.height > 100:
+        raise ValueError("Too tall")
+    return Box(params.width, params.width, params.height)
+
+
+class AliasedParams(BaseModel):
+    box_width: float = Field(alias="boxWidth", default=10, gt=0)
+
+
+@customizable
+def generated_aliased(params: AliasedParams):
+    from build123d import Box
+
+    return Box(params.box_width, 1, 1)
+
+
+@customizable
+def generated_failure(params: BoxParams):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture(scope="module")
+def pool() -> typing.Iterator[GeneratorPool]:
+    with GeneratorPool([__name__], RepoConfig(), max_workers=2) as generator_pool:
+        yield generator_pool
+
+
+@pytest.fixture(scope="module")
+def server(pool: GeneratorPool) -> typing.Iterator[GeneratorServer]:
+    generator_server = GeneratorServer(pool, port=0)
+    thread = threading.Thread(target=generator_server.serve_forever, daemon=True)
+    thread.start()
+    yield generator_server
+    generator_server.shutdown()
+    generator_server.server_close()
+
+
+def _request(
+    server: GeneratorServer, method: str, path: str, body: bytes | None = None
+) -> tuple[int, str, bytes]:
+    host, port = server.server_address
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request(method, path, body=body)
+        response = conn.getresponse()
+        return response.status, response.getheader("Content-Type"), response.read()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("export_format", list(ExportFormat))
+def test_pool_generate(pool: GeneratorPool, export_format: ExportFormat):
+    data = pool.generate(__name__, "generated_box", '{"width": 5}', export_format)
+    assert len(data) > 0
+
+
+def test_pool_generate_aliased(pool: GeneratorPool, tmp_path: pathlib.Path):
+    from build123d import import_brep
+
+    path = tmp_path / "aliased.brep"
+    path.write_bytes(
+        pool.generate(
+            __name__, "generated_aliased", '{"boxWidth": 5}', ExportFormat.BREP
+        )
+    )
+    shape = import_brep(path)
+    assert shape.bounding_box().size.X == pytest.approx(5)
+
+
+def test_pool_generate_errors(pool: GeneratorPool):
+    with pytest.raises(GeneratorValidationError) as exc_info:
+        pool.generate(__name__, "generated_box", '{"width": -1, "height": "x"}')
+    assert [field.path for field in exc_info.value.fields] == [("width",), ("height",)]
+    with pytest.raises(GeneratorValidationError) as exc_info:
+        pool.generate(__name__, "generated_box", '{"height": 200}')
+    assert exc_info.value.messages == ("Too tall",)
+    with pytest.raises(KeyError):
+        pool.generate(__name__, "not_exist", "{}")
+    with pytest.raises(GeneratorError, match="boom"):
+        pool.generate(__name__, "generated_failure", "{}")
+
+
+def test_server_list(server: GeneratorServer):
+    status, content_type, body = _request(server, "GET", "/customizables")
+    assert status == 200
+    assert content_type == "application/json"
+    items = {item["name"]: item for item in json.loads(body)}
+    assert set(items) == {"generated_box", "generated_aliased", "generated_failure"}
+    assert items["generated_box"]["parameters_schema"] == BoxParams.model_json_schema()
+
+
+def test_server_generate(server: GeneratorServer):
+    status, content_type, body = _request(
+        server,
+        "POST",
+        f"/customizables/{__name__}/generated_box?format=3mf",
+        b'{"width": 3}',
+    )
+    assert status == 200
+    assert content_type == "model/3mf"
+    assert body[:2] == b"PK"
+
+
+@pytest.mark.parametrize(
+    "path, body, expected_status, expected_payload",
+    [
+        (
+            f"/customizables/{__name__}/generated_box",
+            b'{"width": 0}',
+            400,
+            {
+                "messages": [],
+                "fields": [
+                    {"path": ["width"], "message": "Input should be greater than 0"}
+                ],
+            },
+        ),
+        (
+            f"/customizables/{__name__}/generated_box",
+            b"not json",
+            400,
+            None,
+        ),
+        (
+            f"/customizables/{__name__}/generated_box?format=obj",
+            b"{}",
+            400,
+            {"messages": ["Unsupported format"], "fields": []},
+        ),
+        (
+            f"/customizables/{__name__}/not_exist",
+            b"{}",
+            404,
+            None,
+        ),
+        (
+            f"/customizables/{__name__}/generated_failure",
+            b"{}",
+            500,
+            {"messages": ["Failed to generate model"], "fields": []},
+        ),
+    ],
+)
+def test_server_generate_errors(
+    server: GeneratorServer,
+    path: str,
+    body: bytes,
+    expected_status: int,
+    expected_payload: dict | None,
+):
+    status, content_type, response_body = _request(server, "POST", path, body)
+    assert status == expected_status
+    assert content_type == "application/json"
+    payload = json.loads(response_body)
+    GeneratorValidationError.from_dict(payload)
+    if expected_payload is not None:
+        assert payload == expected_payload
+
+
+@pytest.mark.parametrize(
+    "content_length, expected_status",
+    [(None, 411), ("abc", 400), ("-1", 400)],
+)
+def test_server_generate_content_length(
+    server: GeneratorServer, content_length: str | None, expected_status: int
+):
+    host, port = server.server_address
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.putrequest("POST", f"/customizables/{__name__}/generated_box")
+        if content_length is not None:
+            conn.putheader("Content-Length", content_length)
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == expected_status
+        GeneratorValidationError.from_dict(json.loads(response.read()))
+    finally:
+        conn.close()
+
+
+def test_pool_generate_batch(pool: GeneratorPool, monkeypatch: pytest.MonkeyPatch):
+    submitted: list[BoxParams] = []
+    submit_validated = pool.submit_validated
+
+    def _submit_validated(customizable, params, export_format, **kwargs):
+        submitted.append(params)
+        return submit_validated(customizable, params, export_format, **kwargs)
+
+    monkeypatch.setattr(pool, "submit_validated", _submit_validated)
+    parameter_sets = [
+        {"width": 1},
+        {"width": -1, "height": "x"},
+        {"width": 2},
+        {"width": 1.0, "height": 10},
+        {"height": 200},
+    ]
+    results = list(pool.generate_batch(__name__, "generated_box", parameter_sets))
+    assert [result.index for result in results] == [0, 1, 2, 3, 4]
+    assert [result.ok for result in results] == [True, False, True, True, False]
+    assert [result.parameters for result in results] == parameter_sets
+    # Identical parameter sets after validation are generated once
+    assert submitted == [
+        BoxParams(width=1),
+        BoxParams(width=2),
+        BoxParams(height=200),
+    ]
+    assert results[0].data == results[3].data
+    assert results[0].data != results[2].data
+    assert results[1].to_dict() == {
+        "index": 1,
+        "ok": False,
+        "error": {
+            "messages": [],
+            "fields": [
+                {"path": ["width"], "message": "Input should be greater than 0"},
+                {
+                    "path": ["height"],
+                    "message": "Input should be a valid number, unable to parse string as a number",
+                },
+            ],
+        },
+    }
+    assert results[4].to_dict()["error"] == {"messages": ["Too tall"], "fields": []}
+    assert results[0].to_dict() == {"index": 0, "ok": True, "error": None}
+
+
+def test_pool_generate_batch_close(
+    pool: GeneratorPool,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+):
+    worker_futures: list[concurrent.futures.Future] = []
+    executor_submit = pool.executor.submit
+
+    def _submit(*args, **kwargs):
+        future = executor_submit(*args, **kwargs)
+        worker_futures.append(future)
+        return future
+
+    monkeypatch.setattr(pool.executor, "submit", _submit)
+    parameter_sets = [{"width": 1 + index / 10} for index in range(20)]
+    results = pool.generate_batch(__name__, "generated_box", parameter_sets)
+    assert next(results).ok
+    results.close()
+    concurrent.futures.wait(worker_futures)
+    # The queued generations are cancelled, and the running ones finishing after
+    # the close don't fail to resolve their cancelled futures
+    assert any(future.cancelled() for future in worker_futures)
+    assert not [
+        record for record in caplog.records if record.name == "concurrent.futures"
+    ]
+
+
+def test_pool_generate_batch_unknown(pool: GeneratorPool):
+    with pytest.raises(KeyError):
+        list(pool.generate_batch(__name__, "not_exist", [{}]))
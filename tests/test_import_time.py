@@ -0,0 +1,94 @@
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+# Modules that must not be imported by importing mr and applying the decorators
+HEAVY_MODULES = ["pydantic", "yaml", "build123d", "OCP"]
+# The import cost is checked by the modules imported, and the decoration cost is
+# compared against a baseline measured in the same process instead of an absolute
+# bound, so that the test doesn't get flaky on slow or busy CI machines
+BENCHMARK_SCRIPT = textwrap.dedent(
+    """
+    import json
+    import sys
+    import time
+    import types
+
+    from mr import artifact
+    from mr import cached
+
+    count = 500
+    source = "\\n".join(
+        f"@artifact(sample=True)\\ndef a{i}(): pass\\n@cached\\ndef c{i}(): pass"
+        for i in range(count)
+    )
+
+    def decorate(name, artifact, cached):
+        code = compile(source, f"{name}.py", "exec")
+        module = types.ModuleType(name)
+        module.artifact = artifact
+        module.cached = cached
+        sys.modules[module.__name__] = module
+        start = time.perf_counter()
+        exec(code, module.__dict__)
+        return (time.perf_counter() - start) / (count * 2)
+
+    decoration_seconds = decorate("bench_module", artifact, cached)
+
+    # Baseline of decorators attaching their callbacks with venusian.attach
+    import venusian
+
+    def attach(**kwargs):
+        def decorator(func):
+            venusian.attach(func, lambda *args: None, category="baseline")
+            return func
+
+        return decorator(kwargs["func"]) if "func" in kwargs else decorator
+
+    baseline_decoration_seconds = decorate(
+        "baseline_module", attach, lambda func: attach(func=func)
+    )
+    modules = sorted(sys.modules)
+
+    print(
+        json.dumps(
+            dict(
+                decoration_seconds=decoration_seconds,
+                baseline_decoration_seconds=baseline_decoration_seconds,
+                modules=modules,
+            )
+        )
+    )
+    """
+)
+
+
+def _run_benchmark() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", BENCHMARK_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_import_and_decorate_benchmark():
+    result = _run_benchmark()
+    imported = {module.split(".")[0] for module in result["modules"]}
+    assert imported.isdisjoint(HEAVY_MODULES), imported & set(HEAVY_MODULES)
+    # Attaching the callbacks directly skips venusian's frame inspection
+    assert result["decoration_seconds"] < result["baseline_decoration_seconds"] / 2
+
+
+def test_lazy_attributes():
+    import mr
+
+    assert set(mr.__all__) <= set(dir(mr))
+    for name in mr.__all__:
+        assert getattr(mr, name) is not None
+    with pytest.raises(AttributeError, match="not_exist"):
+        _ = mr.not_exist
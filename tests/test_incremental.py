@@ -0,0 +1,220 @@
+import dataclasses
+import pathlib
+import textwrap
+
+import pytest
+
+from mr import Artifact
+from mr import Result
+from mr.build_engine import BuildResult
+from mr.data_types import RepoConfig
+from mr.incremental import build_incremental
+from mr.incremental import BuildManifest
+from mr.incremental import geometry_fingerprint
+from mr.incremental import ModuleGraph
+from mr.incremental import plan_build
+from mr.incremental import reuse_unchanged
+from mr.registry import Registry
+
+
+@pytest.fixture
+def repo(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / "repo"
+    files = {
+        "pkg/__init__.py": "",
+        "pkg/common.py": "WIDTH = 10\n",
+        "pkg/parts.py": "from .common import WIDTH\n",
+        "pkg/sub/__init__.py": "",
+        "pkg/sub/deep.py": "from ..parts import WIDTH\nimport build123d\n",
+        "pkg/other.py": "import os\n",
+        "single.py": "import pkg.other\n",
+        "lazy.py": "def main():\n    from pkg import common\n",
+    }
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(textwrap.dedent(content))
+    return root
+
+
+def _make_artifact(module: str, name: str = "main", **kwargs) -> Artifact:
+    return Artifact(
+        module=module,
+        name=name,
+        func=lambda: None,
+        sample=False,
+        export_step=True,
+        export_3mf=True,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize(
+    "module, expected",
+    [
+        ("pkg.common", {"pkg", "pkg.common"}),
+        ("pkg.parts", {"pkg", "pkg.parts", "pkg.common"}),
+        (
+            "pkg.sub.deep",
+            {"pkg", "pkg.sub", "pkg.sub.deep", "pkg.parts", "pkg.common"},
+        ),
+        ("single", {"single", "pkg", "pkg.other"}),
+        ("lazy", {"lazy", "pkg", "pkg.common"}),
+        ("missing", set()),
+    ],
+)
+def test_closure(repo: pathlib.Path, module: str, expected: set[str]):
+    graph = ModuleGraph.from_path(repo)
+    assert graph.closure(module) == expected
+
+
+def test_fingerprint_tracks_closure(repo: pathlib.Path):
+    before = ModuleGraph.from_path(repo)
+    (repo / "pkg" / "common.py").write_text("WIDTH = 20\n")
+    after = ModuleGraph.from_path(repo)
+    assert before.fingerprint("pkg.parts") != after.fingerprint("pkg.parts")
+    assert before.fingerprint("pkg.sub.deep") != after.fingerprint("pkg.sub.deep")
+    assert before.fingerprint("single") == after.fingerprint("single")
+    assert after.fingerprint("missing") is None
+
+
+def test_module_for_artifact_by_filepath(repo: pathlib.Path):
+    graph = ModuleGraph.from_path(repo)
+    artifact = _make_artifact("renamed", filepath=str(repo / "single.py"))
+    assert graph.module_for_artifact(artifact) == "single"
+    assert graph.module_for_artifact(_make_artifact("unknown")) is None
+
+
+def test_plan_build(tmp_path: pathlib.Path, repo: pathlib.Path):
+    output_dir = tmp_path / "out"
+    parts = _make_artifact("pkg.parts")
+    single = _make_artifact("single")
+    unknown = _make_artifact("unknown")
+    artifacts = [parts, single, unknown]
+
+    graph = ModuleGraph.from_path(repo)
+    plan = plan_build(artifacts, graph, BuildManifest(output_dir))
+    assert plan.changed == tuple(artifacts)
+    assert plan.reused == ()
+
+    manifest = BuildManifest(output_dir)
+    for artifact in artifacts:
+        output = output_dir / artifact.module / f"{artifact.name}.step"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text("step")
+        manifest.record(artifact, graph.artifact_fingerprint(artifact), [output])
+    manifest.save()
+
+    plan = plan_build(artifacts, ModuleGraph.from_path(repo), BuildManifest(output_dir))
+    assert plan.changed == (unknown,)
+    assert plan.reused == (parts, single)
+
+    (repo / "pkg" / "common.py").write_text("WIDTH = 20\n")
+    (output_dir / "single" / "main.step").unlink()
+    plan = plan_build(artifacts, ModuleGraph.from_path(repo), BuildManifest(output_dir))
+    assert plan.changed == (parts, single, unknown)
+
+    # Export settings are part of the fingerprint
+    graph = ModuleGraph.from_path(repo)
+    assert graph.artifact_fingerprint(parts) != graph.artifact_fingerprint(
+        dataclasses.replace(parts, export_3mf=False)
+    )
+
+
+def test_build_incremental(tmp_path: pathlib.Path, repo: pathlib.Path):
+    class FakeEngine:
+        config = RepoConfig()
+
+        def __init__(self):
+            self.built: list[Artifact] = []
+
+        def build(self, registry: Registry, artifacts: list[Artifact]):
+            self.built.extend(artifacts)
+            for artifact in artifacts:
+                yield BuildResult(artifact=artifact, result=Result(model="model"))
+
+    registry = Registry()
+    parts = _make_artifact("pkg.parts")
+    single = _make_artifact("single")
+    registry.add_artifact(parts)
+    registry.add_artifact(single)
+    graph = ModuleGraph.from_path(repo)
+    manifest = BuildManifest(tmp_path / "out")
+    manifest.record(parts, graph.artifact_fingerprint(parts), [])
+
+    engine = FakeEngine()
+    results = list(build_incremental(engine, registry, graph, manifest))
+    assert [(r.artifact, r.reused) for r in results] == [
+        (parts, True),
+        (single, False),
+    ]
+    assert engine.built == [single]
+
+
+def test_reuse_unchanged(tmp_path: pathlib.Path):
+    from build123d import Box
+
+    parts = _make_artifact("pkg.parts")
+    output_dir = tmp_path / "out"
+    output = output_dir / "parts.step"
+    output.parent.mkdir(parents=True)
+    output.write_text("step")
+    geometry = geometry_fingerprint(parts, Result(model=Box(1, 2, 3)))
+    manifest = BuildManifest(output_dir)
+    manifest.record(parts, "closure", [output], geometry=geometry)
+    manifest.save()
+
+    manifest = BuildManifest(output_dir)
+    assert manifest.get(parts).geometry == geometry
+    results = list(
+        reuse_unchanged(
+            [
+                BuildResult(artifact=parts, result=Result(model=Box(1, 2, 3))),
+                BuildResult(artifact=parts, result=Result(model=Box(1, 2, 4))),
+                BuildResult(artifact=parts, error="boom"),
+            ],
+            manifest,
+        )
+    )
+    assert [r.reused for r in results] == [True, False, False]
+    assert results[0].geometry == geometry
+    assert results[1].geometry not in (None, geometry)
+    assert results[2].geometry is None
+
+    # Export settings are part of the fingerprint
+    assert geometry != geometry_fingerprint(
+        dataclasses.replace(parts, export_step=not parts.export_step),
+        Result(model=Box(1, 2, 3)),
+    )
+    # Missing outputs are exported again
+    output.unlink()
+    assert not manifest.is_unchanged(parts, geometry)
+
+
+def test_geometry_fingerprint_appearance():
+    from build123d import Box
+    from build123d import Color
+    from build123d import Compound
+    from build123d import Pos
+
+    parts = _make_artifact("pkg.parts")
+
+    def make_model(label: str, color: str, position: float = 0) -> Compound:
+        box = Box(1, 1, 1)
+        box.label = label
+        box.color = Color(color)
+        other = Box(1, 1, 1)
+        return Compound(
+            children=[Pos(position, 0, 0) * box, Pos(3 - position, 0, 0) * other]
+        )
+
+    geometry = geometry_fingerprint(parts, Result(model=make_model("A", "red")))
+    assert geometry == geometry_fingerprint(parts, Result(model=make_model("A", "red")))
+    # Relabeling, recoloring or moving the colors between nodes changes the outputs
+    assert geometry != geometry_fingerprint(parts, Result(model=make_model("B", "red")))
+    assert geometry != geometry_fingerprint(
+        parts, Result(model=make_model("A", "blue"))
+    )
+    assert geometry != geometry_fingerprint(
+        parts, Result(model=make_model("A", "red", position=3))
+    )
@@ -0,0 +1,186 @@
+import copy
+import pathlib
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+
+import numpy as np
+import pytest
+from build123d import Box
+from build123d import Color
+from build123d import Compound
+from build123d import Cylinder
+from build123d import Face
+from build123d import Location
+from build123d import Pos
+
+from mr import cached
+from mr.instancing import InstanceRegistry
+from mr.instancing import shape_key
+from mr.mesh import InstancedMesh
+from mr.mesh import Mesh
+from mr.mesh import shape_meshes
+from mr.mesh import write_3mf
+from mr.registry import collect
+from mr.step import has_instances
+
+NS = {"m": "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"}
+
+calls: list[float] = []
+
+
+@cached
+def instanced_fastener(length: float):
+    calls.append(length)
+    return Cylinder(1, length)
+
+
+def _rack(count: int) -> Compound:
+    fastener = Cylinder(1, 5)
+    parts = []
+    for index in range(count):
+        part = copy.copy(fastener)
+        part.location = Location((index * 3, 0, 0), (0, 0, 30))
+        parts.append(part)
+    return Compound(parts + [Pos(0, 10, 0) * Box(2, 2, 2)])
+
+
+def test_shape_key():
+    box = Box(1, 2, 3)
+    assert shape_key(box.wrapped) == shape_key((Pos(5, 0, 0) * box).wrapped)
+    assert shape_key(box.wrapped) == shape_key(copy.copy(box).wrapped)
+    assert shape_key(box.wrapped) != shape_key(Box(1, 2, 3).wrapped)
+
+
+def test_instance_registry_cached():
+    calls.clear()
+    registry = collect([sys.modules[__name__]])
+    fastener = registry.caches[__name__]["instanced_fastener"]
+    instances = InstanceRegistry()
+    instances.attach(fastener)
+    try:
+        first = instanced_fastener(5)
+        second = instanced_fastener(5)
+        other = instanced_fastener(6)
+    finally:
+        fastener.lookup_funcs.clear()
+        fastener.store_funcs.clear()
+    assert calls == [5, 6]
+    assert first is not second
+    assert shape_key(first.wrapped) == shape_key(second.wrapped)
+    assert shape_key(first.wrapped) != shape_key(other.wrapped)
+    # Moving an instance doesn't move the others
+    second.locate(Location((10, 0, 0)))
+    assert first.location.position.X == 0
+    assert len(instances) == 2
+
+
+def test_instance_registry_instance():
+    instances = InstanceRegistry()
+    first = instances.instance("box", lambda: Box(1, 1, 1))
+    second = instances.instance("box", lambda: pytest.fail("built again"))
+    assert shape_key(first.wrapped) == shape_key(second.wrapped)
+
+
+def test_dedupe():
+    # Boxes built separately with their geometry at different positions
+    model = Compound(
+        [Box(1, 1, 1).translate((x, 0, 0)) for x in (0, 5, 10)]
+        + [Box(2, 1, 1).translate((0, 10, 0))]
+    )
+    assert not has_instances(model)
+
+    deduped = InstanceRegistry().dedupe(model)
+    assert has_instances(deduped)
+    assert len(deduped.solids()) == 4
+    assert deduped.volume == pytest.approx(model.volume)
+    centers = sorted(
+        tuple(round(value, 6) for value in solid.center()) for solid in deduped.solids()
+    )
+    expected = sorted(
+        tuple(round(value, 6) for value in solid.center()) for solid in model.solids()
+    )
+    assert centers == expected
+
+
+def test_dedupe_tree():
+    boxes = []
+    for x in (0, 5, 10):
+        box = Box(1, 1, 1).translate((x, 0, 0))
+        box.label = f"box{x}"
+        box.color = Color("red")
+        boxes.append(box)
+    group = Compound(children=boxes, label="boxes", color=Color("blue"))
+    group.location = Location((0, 0, 7))
+    sheet = Face.make_rect(2, 2)
+    sheet.label = "sheet"
+    other = Pos(0, 10, 0) * Box(2, 1, 1)
+    model = Compound(children=[group, sheet, other], label="root")
+
+    deduped = InstanceRegistry().dedupe(model)
+    assert has_instances(deduped)
+    assert deduped.label == "root"
+    [new_group, new_sheet, new_other] = deduped.children
+    assert new_group.label == "boxes"
+    assert tuple(new_group.color) == tuple(Color("blue"))
+    assert new_group.location.position == group.location.position
+    assert [box.label for box in new_group.children] == ["box0", "box5", "box10"]
+    assert all(tuple(box.color) == (1, 0, 0, 1) for box in new_group.children)
+    for new_box, box in zip(new_group.children, boxes, strict=True):
+        assert tuple(new_box.center()) == pytest.approx(tuple(box.center()))
+    # The unchanged shapes share the geometry of the original ones
+    assert new_sheet.label == "sheet"
+    assert new_sheet.wrapped.IsSame(sheet.wrapped)
+    assert new_other.wrapped.IsSame(other.wrapped)
+    # The original tree is left as is
+    assert [box.parent for box in boxes] == [group] * 3
+    assert model.children == (group, sheet, other)
+
+
+def test_dedupe_unchanged():
+    model = Compound([Box(1, 1, 1), Pos(5, 0, 0) * Box(1, 2, 1)])
+    assert InstanceRegistry().dedupe(model) is model
+
+
+def test_shape_meshes_instanced():
+    meshes = list(shape_meshes(_rack(4)))
+    assert len(meshes) == 2
+    instanced = meshes[0]
+    assert isinstance(instanced, InstancedMesh)
+    assert instanced.transforms.shape == (4, 3, 4)
+    assert isinstance(meshes[1], Mesh)
+
+
+def _read_placed_vertices(path: pathlib.Path) -> list[np.ndarray]:
+    with zipfile.ZipFile(path) as archive:
+        root = ET.fromstring(archive.read("3D/3dmodel.model"))
+    objects = {}
+    for obj in root.iterfind("m:resources/m:object", NS):
+        objects[obj.get("id")] = np.array(
+            [
+                [float(vertex.get(axis)) for axis in "xyz"]
+                for vertex in obj.iterfind("m:mesh/m:vertices/m:vertex", NS)
+            ]
+        )
+    placed = []
+    for item in root.iterfind("m:build/m:item", NS):
+        vertices = objects[item.get("objectid")]
+        transform = item.get("transform")
+        if transform is not None:
+            matrix = np.array([float(value) for value in transform.split()])
+            matrix = matrix.reshape(4, 3)
+            vertices = vertices @ matrix[:3] + matrix[3]
+        placed.append(vertices)
+    return placed
+
+
+def test_write_3mf_instanced(tmp_path: pathlib.Path):
+    rack = _rack(4)
+    path = tmp_path / "rack.3mf"
+    write_3mf(shape_meshes(rack), path)
+    placed = _read_placed_vertices(path)
+    assert len(placed) == 5
+    for vertices, solid in zip(placed, rack.solids(), strict=True):
+        box = solid.bounding_box()
+        np.testing.assert_allclose(vertices.min(axis=0), tuple(box.min), atol=1e-3)
+        np.testing.assert_allclose(vertices.max(axis=0), tuple(box.max), atol=1e-3)
@@ -0,0 +1,115 @@
+import pathlib
+import sys
+import threading
+import time
+
+import pytest
+
+from mr import artifact
+from mr.build_engine import BuildEngine
+from mr.build_engine import DurationHistory
+from mr.config import ArtifactsConfig
+from mr.config import DefaultArtifactConfig
+from mr.config import RepoConfig
+from mr.limits import ExecutionLimits
+from mr.limits import LimitKind
+from mr.limits import run_with_limits
+from mr.registry import collect
+
+
+def _add(a: int, b: int) -> int:
+    return a + b
+
+
+def _fail():
+    raise ValueError("boom")
+
+
+def _sleep(seconds: float):
+    time.sleep(seconds)
+
+
+def _spin():
+    while True:
+        pass
+
+
+def _allocate(size: int):
+    data = bytearray(size)
+    time.sleep(10)
+    return len(data)
+
+
+def test_run_with_limits():
+    run = run_with_limits(_add, (1, 2), ExecutionLimits(timeout=10))
+    assert run.value == 3
+    assert run.exceeded is None
+    assert run.error is None
+
+
+def test_run_with_limits_error():
+    run = run_with_limits(_fail, (), ExecutionLimits(timeout=10))
+    assert run.exceeded is None
+    assert "ValueError: boom" in run.error
+
+
+def test_run_with_limits_timeout():
+    run = run_with_limits(_sleep, (10,), ExecutionLimits(timeout=0.2))
+    assert run.exceeded == LimitKind.TIMEOUT
+    assert run.duration < 5
+
+
+def test_run_with_limits_cancel():
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    run = run_with_limits(_sleep, (10,), ExecutionLimits(), cancel=cancel)
+    assert run.cancelled
+    assert run.exceeded is None
+    assert run.duration < 5
+
+
+def test_run_with_limits_cpu_time():
+    run = run_with_limits(_spin, (), ExecutionLimits(cpu_time=1, timeout=30))
+    assert run.exceeded == LimitKind.CPU_TIME
+
+
+@pytest.mark.skipif(
+    not pathlib.Path("/proc/self/status").exists(), reason="requires /proc"
+)
+def test_run_with_limits_max_memory():
+    run = run_with_limits(
+        _allocate, (512 * 1024 * 1024,), ExecutionLimits(max_memory=256, timeout=30)
+    )
+    assert run.exceeded == LimitKind.MAX_MEMORY
+
+
+@artifact(timeout=0.5)
+def limited_sleep():
+    time.sleep(10)
+
+
+@artifact
+def limited_spin():
+    _spin()
+
+
+@artifact(timeout=10)
+def limited_value():
+    return "value"
+
+
+def test_build_engine_limits(tmp_path: pathlib.Path):
+    registry = collect([sys.modules[__name__]])
+    config = RepoConfig(
+        artifacts=ArtifactsConfig(default_config=DefaultArtifactConfig(cpu_time=1))
+    )
+    history = DurationHistory(tmp_path / "durations.json")
+    with BuildEngine(config, max_workers=2, history=history) as engine:
+        results = {result.artifact.name: result for result in engine.build(registry)}
+    assert results["limited_sleep"].limit_exceeded == LimitKind.TIMEOUT
+    assert "timeout limit of 0.5" in results["limited_sleep"].error
+    assert results["limited_spin"].limit_exceeded == LimitKind.CPU_TIME
+    assert results["limited_spin"].artifact.cpu_time == 1
+    assert results["limited_value"].ok
+    assert results["limited_value"].result.model == "value"
+    assert results["limited_value"].limit_exceeded is None
@@ -0,0 +1,165 @@
+import collections
+import sys
+import threading
+import typing
+
+import pytest
+
+from mr import cached
+from mr.memory_cache import copy_value
+from mr.memory_cache import get_current
+from mr.memory_cache import MemoryCache
+from mr.registry import collect
+
+calls: list[typing.Any] = []
+
+
+@cached
+def memoized_func(value: int):
+    calls.append(value)
+    return {"value": value}
+
+
+@cached
+def memoized_box(size: float):
+    from build123d import Box
+
+    calls.append(size)
+    return Box(size, size, size)
+
+
+@pytest.fixture
+def memory() -> typing.Iterator[MemoryCache]:
+    module = sys.modules[__name__]
+    registry = collect([module])
+    for cached_obj in registry.caches[__name__].values():
+        cached_obj.lookup_funcs.clear()
+        cached_obj.store_funcs.clear()
+    calls.clear()
+    with MemoryCache().activate() as cache:
+        yield cache
+    assert get_current() is None
+
+
+def test_memory_cache_hit(memory: MemoryCache):
+    assert memoized_func(1) == {"value": 1}
+    assert memoized_func(1) == {"value": 1}
+    assert memoized_func(2) == {"value": 2}
+    assert calls == [1, 2]
+    stats = memory.stats
+    assert stats.hits == 1
+    assert stats.misses == 2
+    assert stats.entries == 2
+
+
+def test_memory_cache_returns_copies(memory: MemoryCache):
+    first = memoized_func(1)
+    first["value"] = 123
+    assert memoized_func(1) == {"value": 1}
+
+
+def test_memory_cache_shape_copies(memory: MemoryCache):
+    from build123d import Location
+
+    first = memoized_box(1.0)
+    first.move(Location((10, 0, 0)))
+    second = memoized_box(1.0)
+    assert calls == [1.0]
+    assert second.center().X == pytest.approx(0)
+    assert second.wrapped.TShape() == first.wrapped.TShape()
+
+
+class Point(typing.NamedTuple):
+    x: list
+    y: int
+
+
+class Items(list):
+    pass
+
+
+@pytest.mark.parametrize(
+    "value, key",
+    [
+        (Point([1], 2), 0),
+        (collections.defaultdict(list, {"a": [1]}), "a"),
+        (collections.OrderedDict(a=[1]), "a"),
+        (Items([[1], 2]), 0),
+        (([1], {"a": [2]}), 0),
+    ],
+)
+def test_copy_value(value: typing.Any, key: typing.Any):
+    copied = copy_value(value)
+    assert copied == value
+    assert type(copied) is type(value)
+    assert copied[key] is not value[key]
+
+
+def test_copy_value_default_factory():
+    copied = copy_value(collections.defaultdict(list))
+    copied["missing"].append(1)
+    assert copied == {"missing": [1]}
+
+
+def test_memory_cache_populated_by_lookup(memory: MemoryCache):
+    module = sys.modules[__name__]
+    cached_obj = collect([module]).caches[__name__]["memoized_func"]
+    cached_obj.lookup_funcs.append(lambda args, kwargs: {"value": "from_lookup"})
+    try:
+        assert memoized_func(3) == {"value": "from_lookup"}
+        cached_obj.lookup_funcs.clear()
+        assert memoized_func(3) == {"value": "from_lookup"}
+    finally:
+        cached_obj.lookup_funcs.clear()
+    assert calls == []
+
+
+@pytest.mark.parametrize(
+    "max_entries, max_size, expected_keys",
+    [
+        (2, None, ["k1", "k2"]),
+        (None, 250, ["k2"]),
+        (10, 1000, ["k0", "k1", "k2"]),
+    ],
+)
+def test_memory_cache_eviction(
+    max_entries: int | None, max_size: int | None, expected_keys: list[str]
+):
+    cache = MemoryCache(
+        max_entries=max_entries, max_size=max_size, sizeof=lambda v: 200
+    )
+    for i in range(3):
+        cache.put(f"k{i}", i)
+    assert [key for key in ["k0", "k1", "k2"] if cache.get(key) is not None] == (
+        expected_keys
+    )
+    assert cache.stats.evictions == 3 - len(expected_keys)
+
+
+def test_memory_cache_lru_order():
+    cache = MemoryCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_memory_cache_threads():
+    cache = MemoryCache(max_entries=50)
+
+    def worker(offset: int):
+        for i in range(200):
+            cache.put(f"{offset}-{i}", [i])
+            cache.get(f"{offset}-{i}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats
+    assert stats.entries == 50
+    assert stats.evictions == 8 * 200 - 50
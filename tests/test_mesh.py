@@ -0,0 +1,186 @@
+import concurrent.futures
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+from build123d import Box
+from build123d import Color
+from build123d import Mesher
+from build123d import Pos
+
+from mr import artifact
+from mr import mesh as mesh_module
+from mr.build_engine import BuildEngine
+from mr.build_engine import DurationHistory
+from mr.config import ArtifactsConfig
+from mr.config import DefaultArtifactConfig
+from mr.config import RepoConfig
+from mr.export import export_model
+from mr.export import ExportFormat
+from mr.export import ExportPipeline
+from mr.mesh import deduplicate
+from mr.mesh import Mesh
+from mr.mesh import shape_meshes
+from mr.mesh import SharedMesh
+from mr.mesh import tessellate
+from mr.mesh import write_3mf
+from mr.registry import collect
+
+
+@artifact
+def meshed_box():
+    return Box(1, 2, 3)
+
+
+def _vertex_sum(handle: SharedMesh) -> float:
+    return float(handle.load().vertices.sum())
+
+
+def test_tessellate():
+    mesh = tessellate(Box(1, 2, 3))
+    # The corners shared by the faces are merged
+    assert mesh.vertices.shape == (8, 3)
+    assert mesh.triangles.shape == (12, 3)
+    assert mesh.triangles.max() < len(mesh.vertices)
+    np.testing.assert_allclose(mesh.vertices.min(axis=0), [-0.5, -1, -1.5])
+    np.testing.assert_allclose(mesh.vertices.max(axis=0), [0.5, 1, 1.5])
+
+
+def test_tessellate_located():
+    mesh = tessellate(Pos(10, 0, 0) * Box(1, 2, 3))
+    np.testing.assert_allclose(mesh.vertices.min(axis=0), [9.5, -1, -1.5])
+
+
+def test_deduplicate():
+    mesh = Mesh(
+        vertices=np.array(
+            [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0], [0, 0, 0]], dtype=np.float32
+        ),
+        triangles=np.array([[0, 1, 2], [3, 4, 2], [0, 4, 1]], dtype=np.uint32),
+    )
+    result = deduplicate(mesh)
+    assert len(result.vertices) == 3
+    # The last triangle collapses into an edge
+    assert len(result.triangles) == 2
+    np.testing.assert_array_equal(
+        result.vertices[result.triangles[0]], mesh.vertices[mesh.triangles[0]]
+    )
+    np.testing.assert_array_equal(
+        result.vertices[result.triangles[1]], mesh.vertices[mesh.triangles[1]]
+    )
+
+
+def test_shared_mesh(tmp_path: pathlib.Path):
+    mesh = tessellate(Box(1, 2, 3))
+    handle = SharedMesh.create(mesh, directory=tmp_path)
+    loaded = handle.load()
+    np.testing.assert_array_equal(loaded.vertices, mesh.vertices)
+    np.testing.assert_array_equal(loaded.triangles, mesh.triangles)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(_vertex_sum, handle).result() == pytest.approx(
+            float(mesh.vertices.sum())
+        )
+    handle.release()
+    assert not pathlib.Path(handle.path).exists()
+    # Mappings stay valid after the release
+    np.testing.assert_array_equal(loaded.vertices, mesh.vertices)
+
+
+def test_write_3mf(tmp_path: pathlib.Path):
+    path = tmp_path / "box.3mf"
+    write_3mf([tessellate(Box(1, 2, 3))], path)
+    mesher = Mesher()
+    shapes = mesher.read(str(path))
+    assert len(shapes) == 1
+    assert shapes[0].volume == pytest.approx(6)
+
+
+def test_write_3mf_chunks(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(mesh_module, "_CHUNK_ROWS", 5)
+    path = tmp_path / "parts.3mf"
+    write_3mf(shape_meshes([Box(1, 2, 3), Pos(5, 0, 0) * Box(1, 1, 1)]), path)
+    shapes = Mesher().read(str(path))
+    assert sorted(shape.volume for shape in shapes) == pytest.approx([1, 6])
+
+
+def test_export_mesh(tmp_path: pathlib.Path):
+    mesh = tessellate(Box(1, 2, 3))
+    export_model(mesh, ExportFormat.THREE_MF, tmp_path / "box.3mf")
+    assert (tmp_path / "box.3mf").exists()
+    with pytest.raises(ValueError):
+        export_model(mesh, ExportFormat.STEP, tmp_path / "box.step")
+
+
+def test_export_3mf_writers(tmp_path: pathlib.Path):
+    box = Box(1, 2, 3)
+    box.label = "panel"
+    box.color = Color("red")
+    # The Build123D Mesher is the default, which keeps the labels and colors
+    export_model(box, ExportFormat.THREE_MF, tmp_path / "mesher.3mf")
+    [shape] = Mesher().read(str(tmp_path / "mesher.3mf"))
+    assert shape.label == "panel"
+    assert tuple(shape.color) == pytest.approx((1, 0, 0, 1))
+    export_model(box, ExportFormat.THREE_MF, tmp_path / "fast.3mf", mesh_tolerance=0.01)
+    [shape] = Mesher().read(str(tmp_path / "fast.3mf"))
+    assert shape.volume == pytest.approx(6)
+
+
+def test_build_engine_meshes(tmp_path: pathlib.Path):
+    registry = collect([sys.modules[__name__]])
+    config = RepoConfig(
+        artifacts=ArtifactsConfig(
+            default_config=DefaultArtifactConfig(export_step=False)
+        )
+    )
+    history = DurationHistory(tmp_path / "durations.json")
+    with (
+        BuildEngine(
+            config, max_workers=1, history=history, mesh_tolerance=0.01
+        ) as engine,
+        ExportPipeline(config, tmp_path / "out", max_workers=1) as pipeline,
+    ):
+        build_results = list(engine.build(registry))
+        [build_result] = build_results
+        handle = build_result.result.model
+        assert isinstance(handle, SharedMesh)
+        assert isinstance(handle.load(), Mesh)
+        [export_result] = pipeline.export(build_results)
+    assert export_result.ok
+    assert export_result.path == tmp_path / "out" / __name__ / "meshed_box.3mf"
+    assert Mesher().read(str(export_result.path))[0].volume == pytest.approx(6)
+    # The shared mesh is released once exported
+    assert not pathlib.Path(handle.path).exists()
+
+
+def test_build_engine_meshes_keep_step_shapes(tmp_path: pathlib.Path):
+    registry = collect([sys.modules[__name__]])
+    history = DurationHistory(tmp_path / "durations.json")
+    with BuildEngine(
+        RepoConfig(), max_workers=1, history=history, mesh_tolerance=0.01
+    ) as engine:
+        mesh_directory = pathlib.Path(engine.mesh_directory)
+        assert mesh_directory.is_dir()
+        [build_result] = engine.build(registry)
+        # STEP is exported by default, which needs the shape
+        assert build_result.result.model.volume == pytest.approx(6)
+    assert not mesh_directory.exists()
+
+
+def test_build_engine_releases_meshes(tmp_path: pathlib.Path):
+    registry = collect([sys.modules[__name__]])
+    config = RepoConfig(
+        artifacts=ArtifactsConfig(
+            default_config=DefaultArtifactConfig(export_step=False)
+        )
+    )
+    history = DurationHistory(tmp_path / "durations.json")
+    with BuildEngine(
+        config, max_workers=1, history=history, mesh_tolerance=0.01
+    ) as engine:
+        [build_result] = engine.build(registry)
+        handle = build_result.result.model
+        assert pathlib.Path(handle.path).parent == pathlib.Path(engine.mesh_directory)
+        assert pathlib.Path(handle.path).exists()
+    # Handles which were never exported are released with the engine
+    assert not pathlib.Path(handle.path).exists()
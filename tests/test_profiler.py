@@ -0,0 +1,139 @@
+import json
+import pathlib
+import sys
+import tracemalloc
+
+import pytest
+
+from mr import Artifact
+from mr import cached
+from mr.memory_cache import MemoryCache
+from mr.profiler import get_current
+from mr.profiler import Profiler
+from mr.registry import collect
+
+
+@cached
+def profiled_leaf(size: int):
+    return bytearray(size)
+
+
+@cached
+def profiled_helper(size: int):
+    first = profiled_leaf(size)
+    second = profiled_leaf(size)
+    return len(first) + len(second)
+
+
+def profiled_artifact():
+    return profiled_helper(1024 * 1024)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache_funcs():
+    module = sys.modules[__name__]
+    registry = collect([module])
+    for cached_obj in registry.caches[__name__].values():
+        cached_obj.lookup_funcs.clear()
+        cached_obj.store_funcs.clear()
+
+
+def _artifact() -> Artifact:
+    return Artifact(
+        module=__name__,
+        name="profiled_artifact",
+        func=profiled_artifact,
+        sample=False,
+    )
+
+
+def test_profiler_nested_spans():
+    profiler = Profiler()
+    with profiler.activate(), MemoryCache().activate():
+        assert profiler.call(_artifact()) == 2 * 1024 * 1024
+    assert get_current() is None
+
+    (root,) = profiler.spans
+    assert (root.kind, root.name) == ("artifact", f"{__name__}:profiled_artifact")
+    (helper,) = root.children
+    assert (helper.kind, helper.name, helper.cache_hit) == (
+        "cached",
+        f"{__name__}:profiled_helper",
+        False,
+    )
+    assert [(leaf.name, leaf.cache_hit) for leaf in helper.children] == [
+        (f"{__name__}:profiled_leaf", False),
+        (f"{__name__}:profiled_leaf", True),
+    ]
+    for span in root.iter_spans():
+        assert span.wall_ns > 0
+        assert span.cpu_ns >= 0
+        assert span.memory_peak is None
+    assert root.wall_ns >= helper.wall_ns
+
+
+def test_profiler_trace_memory():
+    profiler = Profiler(trace_memory=True)
+    with profiler.activate():
+        profiler.call(_artifact())
+    assert not tracemalloc.is_tracing()
+    (root,) = profiler.spans
+    (helper,) = root.children
+    for leaf in helper.children:
+        assert leaf.memory_peak >= 1024 * 1024
+    assert helper.memory_peak >= 2 * 1024 * 1024
+    assert root.memory_peak >= helper.memory_peak
+
+
+def test_profiler_boolean_ops():
+    from build123d import Box
+    from build123d import Cylinder
+
+    profiler = Profiler()
+    with profiler.activate():
+        with profiler.span("artifact", "outer") as outer:
+            Box(10, 10, 10) - Cylinder(2, 10)
+            with profiler.span("cached", "inner") as inner:
+                Box(10, 10, 10) + Box(1, 1, 20)
+                Box(10, 10, 10) & Box(5, 5, 5)
+    assert (outer.boolean_ops, inner.boolean_ops) == (3, 2)
+    # Only counted while a profiler is active
+    Box(1, 1, 1) - Box(2, 2, 2)
+    assert outer.boolean_ops == 3
+    assert profiler.to_dict()["spans"][0]["boolean_ops"] == 3
+
+
+def test_profiler_records_errors():
+    profiler = Profiler()
+
+    def failing():
+        raise ValueError("boom")
+
+    artifact = Artifact(module="mod", name="failing", func=failing, sample=False)
+    with pytest.raises(ValueError):
+        profiler.call(artifact)
+    (span,) = profiler.spans
+    assert span.error == "ValueError('boom')"
+
+
+def test_profiler_dump(tmp_path: pathlib.Path):
+    profiler = Profiler()
+    with profiler.activate():
+        profiler.call(_artifact())
+
+    json_path = tmp_path / "profile.json"
+    profiler.dump(json_path)
+    data = json.loads(json_path.read_text())
+    assert data["spans"][0]["children"][0]["name"] == f"{__name__}:profiled_helper"
+
+    trace_path = tmp_path / "trace.json"
+    profiler.dump(trace_path, chrome_trace=True)
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert [(event["cat"], event["ph"]) for event in events] == [
+        ("artifact", "X"),
+        ("cached", "X"),
+        ("cached", "X"),
+        ("cached", "X"),
+    ]
+    assert events[1]["args"]["cache_hit"] is False
+    assert events[0]["ts"] <= events[1]["ts"]
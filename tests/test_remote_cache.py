@@ -0,0 +1,219 @@
+import http.client
+import pathlib
+import sys
+import typing
+import urllib.parse
+import zlib
+
+import pytest
+from build123d import Box
+
+from mr import Artifact
+from mr import cached
+from mr import serialization
+from mr.cache_server import CacheServer
+from mr.incremental import BuildManifest
+from mr.incremental import ModuleGraph
+from mr.incremental import plan_build
+from mr.registry import collect
+from mr.remote_cache import ACTION_NAMESPACE
+from mr.remote_cache import content_digest
+from mr.remote_cache import CONTENT_NAMESPACE
+from mr.remote_cache import RemoteCache
+
+calls: list[typing.Any] = []
+
+
+@cached
+def remote_cached_func(value: int):
+    calls.append(value)
+    return {"value": value * 2}
+
+
+@pytest.fixture
+def server(tmp_path: pathlib.Path) -> typing.Iterator[CacheServer]:
+    with CacheServer(tmp_path / "server") as server:
+        yield server
+
+
+@pytest.fixture
+def remote(server: CacheServer) -> RemoteCache:
+    return RemoteCache(server.url)
+
+
+def test_blobs(server: CacheServer, remote: RemoteCache):
+    data = b"x" * 10000
+    key = content_digest(data)
+    assert remote.get_blob(CONTENT_NAMESPACE, key) is None
+    assert remote.put_blob(CONTENT_NAMESPACE, key, data)
+    assert remote.get_blob(CONTENT_NAMESPACE, key) == data
+    # Payloads are stored compressed
+    stored = server.path / CONTENT_NAMESPACE / key[:2] / key
+    assert zlib.decompress(stored.read_bytes()) == data
+    assert len(stored.read_bytes()) < len(data)
+    # Keys are validated by the server
+    assert not remote.put_blob(CONTENT_NAMESPACE, "../escape", data)
+    assert not remote.put_blob("other", key, data)
+
+
+@pytest.mark.parametrize(
+    "headers, status",
+    [({}, 411), ({"Content-Length": "abc"}, 400), ({"Content-Length": "-1"}, 400)],
+)
+def test_server_content_length(
+    server: CacheServer, headers: dict[str, str], status: int
+):
+    key = content_digest(b"key")
+    conn = http.client.HTTPConnection(
+        urllib.parse.urlsplit(server.url).netloc, timeout=10
+    )
+    try:
+        conn.putrequest("PUT", f"/{ACTION_NAMESPACE}/{key}")
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders()
+        assert conn.getresponse().status == status
+    finally:
+        conn.close()
+
+
+def test_find_missing(monkeypatch: pytest.MonkeyPatch, remote: RemoteCache):
+    monkeypatch.setattr("mr.remote_cache.BATCH_SIZE", 2)
+    keys = [content_digest(str(index).encode()) for index in range(5)]
+    for key in keys[:3]:
+        remote.put(key, key)
+    assert remote.find_missing(ACTION_NAMESPACE, keys) == set(keys[3:])
+    assert remote.find_missing(CONTENT_NAMESPACE, keys) == set(keys)
+
+
+@pytest.mark.parametrize(
+    "response",
+    [b"not json", b"{}", b'{"missing": "abc"}', b'{"missing": [[]]}', b"[]"],
+)
+def test_find_missing_invalid_response(
+    monkeypatch: pytest.MonkeyPatch, remote: RemoteCache, response: bytes
+):
+    monkeypatch.setattr(remote, "_request", lambda *args, **kwargs: response)
+    keys = {content_digest(str(index).encode()) for index in range(3)}
+    assert remote.find_missing(ACTION_NAMESPACE, keys) == keys
+
+
+def test_no_pickle(remote: RemoteCache):
+    key = content_digest(b"key")
+    # Pickled payloads written by anyone with access to the server are not loaded
+    remote.put_blob(ACTION_NAMESPACE, key, serialization.dumps(object()))
+    assert remote.get(key) is None
+    # Values which are not shapes nor JSON are not stored
+    assert not remote.put(key, object())
+    assert remote.put(key, {"value": [1, 2.5]})
+    assert remote.get(key) == {"value": [1, 2.5]}
+    assert remote.put(key, Box(1, 2, 3))
+    assert remote.get(key).volume == pytest.approx(6)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [(1, 2), {1: "a"}, {"a": [1, 2.5, None]}, frozenset({"x"}), b"data"],
+)
+def test_round_trip(remote: RemoteCache, value: typing.Any):
+    key = content_digest(b"key")
+    assert remote.put(key, value)
+    loaded = remote.get(key)
+    assert loaded == value
+    assert type(loaded) is type(value)
+
+
+def test_signed_entries(server: CacheServer):
+    remote = RemoteCache(server.url, secret="secret")
+    key = content_digest(b"key")
+    other_key = content_digest(b"other")
+    assert remote.put(key, {"value": 1})
+    assert remote.get(key) == {"value": 1}
+    assert RemoteCache(server.url, secret="other").get(key) is None
+    # Unsigned entries, and signed entries moved to another key, are ignored
+    RemoteCache(server.url).put(other_key, {"value": 2})
+    assert remote.get(other_key) is None
+    remote.put_blob(ACTION_NAMESPACE, other_key, remote.get_blob(ACTION_NAMESPACE, key))
+    assert remote.get(other_key) is None
+
+
+def test_server_token(tmp_path: pathlib.Path):
+    key = content_digest(b"key")
+    with CacheServer(tmp_path / "server", token="token") as server:
+        assert not RemoteCache(server.url).put(key, 1)
+        assert not RemoteCache(
+            server.url, headers={"Authorization": "Bearer other"}
+        ).put(key, 1)
+        remote = RemoteCache(server.url, headers={"Authorization": "Bearer token"})
+        assert remote.put(key, 1)
+        assert remote.get(key) == 1
+        assert remote.find_missing(ACTION_NAMESPACE, [key]) == set()
+
+
+def test_unavailable_server(tmp_path: pathlib.Path):
+    with CacheServer(tmp_path / "server") as server:
+        url = server.url
+    remote = RemoteCache(url, timeout=1)
+    key = content_digest(b"key")
+    assert remote.get(key) is None
+    assert not remote.put(key, 1)
+    assert remote.find_missing(ACTION_NAMESPACE, [key]) == {key}
+
+
+def test_attach(remote: RemoteCache):
+    registry = collect([sys.modules[__name__]])
+    cached_obj = registry.caches[__name__]["remote_cached_func"]
+    cached_obj.lookup_funcs.clear()
+    cached_obj.store_funcs.clear()
+    remote.attach_registry(registry)
+    calls.clear()
+    try:
+        assert remote_cached_func(2) == {"value": 4}
+        assert remote_cached_func(2) == {"value": 4}
+        assert calls == [2]
+    finally:
+        cached_obj.lookup_funcs.clear()
+        cached_obj.store_funcs.clear()
+
+
+def test_outputs(tmp_path: pathlib.Path, remote: RemoteCache):
+    key = content_digest(b"artifact")
+    output_dir = tmp_path / "out"
+    (output_dir / "parts").mkdir(parents=True)
+    (output_dir / "parts" / "main.step").write_text("step")
+    (output_dir / "parts" / "main.3mf").write_text("3mf")
+    assert remote.upload_outputs(
+        key,
+        output_dir,
+        [output_dir / "parts" / "main.step", "parts/main.3mf"],
+    )
+
+    other_dir = tmp_path / "other"
+    outputs = remote.download_outputs(key, other_dir)
+    assert sorted(outputs) == [
+        other_dir / "parts" / "main.3mf",
+        other_dir / "parts" / "main.step",
+    ]
+    assert (other_dir / "parts" / "main.step").read_text() == "step"
+    assert remote.download_outputs(content_digest(b"missing"), other_dir) is None
+
+
+def test_plan_build_downloads_outputs(tmp_path: pathlib.Path, remote: RemoteCache):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "parts.py").write_text("WIDTH = 10\n")
+    artifact = Artifact(module="parts", name="main", func=lambda: None, sample=False)
+    graph = ModuleGraph.from_path(repo)
+    fingerprint = graph.artifact_fingerprint(artifact)
+    runner_dir = tmp_path / "runner"
+    runner_dir.mkdir()
+    (runner_dir / "main.step").write_text("step")
+    assert remote.upload_outputs(fingerprint, runner_dir, ["main.step"])
+
+    manifest = BuildManifest(tmp_path / "out")
+    plan = plan_build([artifact], graph, manifest)
+    assert plan.changed == (artifact,)
+    plan = plan_build([artifact], graph, manifest, remote_cache=remote)
+    assert plan.reused == (artifact,)
+    assert (tmp_path / "out" / "main.step").read_text() == "step"
+    assert manifest.is_reusable(artifact, fingerprint)
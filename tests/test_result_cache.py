@@ -0,0 +1,90 @@
+import pathlib
+import sys
+import time
+import typing
+
+import pytest
+from pydantic import BaseModel
+
+from mr import Customizable
+from mr import customizable
+from mr.export import ExportFormat
+from mr.generator import generate
+from mr.registry import collect
+from mr.result_cache import ResultCache
+
+calls: list[typing.Any] = []
+
+
+class PlateParams(BaseModel):
+    width: float = 10
+    length: float = 20
+
+
+@customizable
+def cached_plate(params: PlateParams):
+    from build123d import Box
+
+    calls.append(params)
+    return Box(params.width, params.length, 1)
+
+
+@pytest.fixture
+def plate() -> Customizable:
+    calls.clear()
+    module = sys.modules[__name__]
+    return collect([module]).customizables[__name__]["cached_plate"]
+
+
+@pytest.fixture
+def cache(tmp_path: pathlib.Path) -> ResultCache:
+    return ResultCache(tmp_path / "results")
+
+
+def test_result_cache_key(cache: ResultCache, plate: Customizable):
+    def key(**kwargs) -> str:
+        return cache.make_key(plate, PlateParams(**kwargs), ExportFormat.STEP)
+
+    assert key() == key(width=10, length=20)
+    assert key(width=1) == key(width=1.0)
+    assert key(width=1) != key(width=2)
+    assert cache.make_key(plate, PlateParams(), ExportFormat.STEP) != cache.make_key(
+        plate, PlateParams(), ExportFormat.THREE_MF
+    )
+
+
+def test_generate_with_result_cache(cache: ResultCache, plate: Customizable):
+    first = generate(plate, '{"width": 5}', ExportFormat.STEP, result_cache=cache)
+    # Equivalent parameters hit the same entry
+    second = generate(
+        plate, '{"length": 20.0, "width": 5.0}', ExportFormat.STEP, result_cache=cache
+    )
+    assert first == second
+    assert len(calls) == 1
+    generate(plate, '{"width": 5}', ExportFormat.THREE_MF, result_cache=cache)
+    generate(plate, '{"width": 6}', ExportFormat.STEP, result_cache=cache)
+    assert len(calls) == 3
+
+
+def test_result_cache_ttl(
+    tmp_path: pathlib.Path, plate: Customizable, monkeypatch: pytest.MonkeyPatch
+):
+    cache = ResultCache(tmp_path / "results", ttl=60)
+    key = cache.make_key(plate, PlateParams(), ExportFormat.STEP)
+    cache.put(key, b"data")
+    assert cache.get(key) == b"data"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get(key) is None
+    monkeypatch.undo()
+    # Expired entries are removed
+    assert cache.get(key) is None
+
+
+def test_result_cache_lru(tmp_path: pathlib.Path):
+    cache = ResultCache(tmp_path / "results", max_size=2500)
+    for i in range(5):
+        cache.put(f"{i:064x}", b"x" * 1000)
+    assert cache.get(f"{4:064x}") == b"x" * 1000
+    assert cache.get(f"{0:064x}") is None
+    assert cache.disk_cache.size() <= 2500
@@ -0,0 +1,78 @@
+import copy
+import pathlib
+
+import pytest
+from build123d import Box
+from build123d import Color
+from build123d import Compound
+from build123d import Cylinder
+from build123d import export_step
+from build123d import import_step
+from build123d import Location
+from build123d import Pos
+
+from mr.step import count_instances
+from mr.step import has_instances
+from mr.step import write_step
+
+
+def _rack(count: int) -> Compound:
+    fastener = Cylinder(1, 5)
+    parts = []
+    for index in range(count):
+        part = copy.copy(fastener)
+        part.location = Location((index * 3, 0, 0))
+        parts.append(part)
+    return Compound(parts + [Pos(0, 10, 0) * Box(2, 2, 2)])
+
+
+def test_count_instances():
+    counts = count_instances(_rack(5))
+    assert sorted(counts.values()) == [1, 5]
+    assert has_instances(_rack(2))
+    assert not has_instances(Compound([Box(1, 1, 1), Box(1, 1, 1)]))
+
+
+def test_write_step_instanced(tmp_path: pathlib.Path):
+    write_step(_rack(50), tmp_path / "rack50.step")
+    export_step(_rack(50), tmp_path / "rack50-full.step")
+    instanced = (tmp_path / "rack50.step").stat().st_size
+    full = (tmp_path / "rack50-full.step").stat().st_size
+    # The geometry of the fastener is written once instead of for each placement
+    assert instanced < full / 4
+
+    model = import_step(tmp_path / "rack50.step")
+    assert len(model.solids()) == 51
+    assert model.volume == pytest.approx(_rack(50).volume, rel=1e-6)
+
+
+def test_write_step(tmp_path: pathlib.Path):
+    path = tmp_path / "box.step"
+    write_step(Box(1, 2, 3), path)
+    assert import_step(path).volume == pytest.approx(6)
+
+
+def test_write_step_instanced_labels_and_colors(tmp_path: pathlib.Path):
+    fastener = Cylinder(1, 5)
+    fastener.label = "fastener"
+    fastener.color = Color("red")
+    parts = []
+    for index in range(10):
+        part = copy.copy(fastener)
+        part.location = Location((index * 3, 0, 0))
+        parts.append(part)
+    parts[-1].color = Color("green")
+    plate = Pos(0, 10, 0) * Box(2, 2, 2)
+    plate.label = "plate"
+    rack = Compound(children=parts + [plate], label="rack")
+    assert has_instances(rack)
+    write_step(rack, tmp_path / "rack.step")
+
+    model = import_step(tmp_path / "rack.step")
+    assert model.label == "rack"
+    assert [child.label for child in model.children] == ["fastener"] * 10 + ["plate"]
+    colors = [tuple(child.color) for child in model.children[:10]]
+    assert colors == [(1, 0, 0, 1)] * 9 + [tuple(Color("green"))]
+    centers = [tuple(child.center()) for child in model.children[:10]]
+    assert centers == [pytest.approx((index * 3, 0, 0)) for index in range(10)]
+    assert model.volume == pytest.approx(rack.volume, rel=1e-6)
@@ -0,0 +1,225 @@
+import enum
+import pathlib
+import sys
+import typing
+
+import pytest
+from pydantic import BaseModel
+from pydantic import Field
+
+from mr import Customizable
+from mr import customizable
+from mr.config import RepoConfig
+from mr.export import ExportFormat
+from mr.generator import GeneratorPool
+from mr.registry import collect
+from mr.request_log import RequestLog
+from mr.result_cache import ResultCache
+from mr.sweep import enumerate_parameters
+from mr.sweep import field_values
+from mr.sweep import SweepBudget
+from mr.sweep import Sweeper
+
+
+class Finish(enum.Enum):
+    MATTE = "matte"
+    GLOSSY = "glossy"
+
+
+class BinParams(BaseModel):
+    width: int = Field(default=2, ge=1, le=3)
+    depth: float = Field(default=10.0, ge=5, le=15)
+    shape: typing.Literal["square", "round"] = "square"
+    finish: Finish = Finish.MATTE
+    label: str = ""
+
+
+@customizable
+def swept_bin(params: BinParams):
+    from build123d import Box
+
+    return Box(params.width, params.width, params.depth)
+
+
+class AliasedParams(BaseModel):
+    box_width: int = Field(alias="boxWidth", default=1, ge=1, le=3)
+
+
+@customizable
+def swept_lid(params: AliasedParams):
+    from build123d import Box
+
+    return Box(params.box_width, 1, 1)
+
+
+class SizeParams(BaseModel):
+    size: float
+
+
+@customizable
+def unbounded_plate(params: SizeParams):
+    pass
+
+
+@pytest.fixture
+def bin_customizable() -> Customizable:
+    return collect([sys.modules[__name__]]).customizables[__name__]["swept_bin"]
+
+
+@pytest.mark.parametrize(
+    "schema, expected",
+    [
+        ({"type": "boolean"}, [False, True]),
+        ({"enum": ["a", "b"]}, ["a", "b"]),
+        ({"const": 3}, [3]),
+        ({"type": "integer", "minimum": 1, "maximum": 3}, [1, 2, 3]),
+        ({"type": "integer", "minimum": 0, "maximum": 100}, [0, 25, 50, 75, 100]),
+        ({"type": "integer", "exclusiveMinimum": 0, "maximum": 2}, [1, 2]),
+        ({"type": "integer", "minimum": 0.5, "maximum": 3.5}, [1, 2, 3]),
+        ({"type": "integer", "exclusiveMinimum": 0.5, "maximum": 2}, [1, 2]),
+        (
+            {"type": "integer", "minimum": 0, "maximum": 100, "multipleOf": 5},
+            [0, 25, 50, 75, 100],
+        ),
+        (
+            {"type": "integer", "minimum": 1, "maximum": 12, "multipleOf": 5},
+            [5, 10],
+        ),
+        ({"type": "integer", "minimum": 1, "maximum": 4, "multipleOf": 5}, None),
+        (
+            {"type": "number", "exclusiveMinimum": 0, "maximum": 1, "multipleOf": 0.5},
+            [0.5, 1.0],
+        ),
+        ({"type": "number", "minimum": 0, "maximum": 4}, [0, 1, 2, 3, 4]),
+        (
+            {"type": "number", "exclusiveMinimum": 0, "exclusiveMaximum": 6},
+            [1, 2, 3, 4, 5],
+        ),
+        ({"type": "number", "minimum": 0, "maximum": 4, "default": 3}, [3, 0, 1, 2, 4]),
+        ({"anyOf": [{"enum": [1, 2]}, {"type": "null"}]}, [1, 2, None]),
+        ({"type": "number"}, None),
+        ({"type": "string", "default": "x"}, ["x"]),
+    ],
+)
+def test_field_values(schema: dict, expected: list | None):
+    assert field_values(schema) == expected
+
+
+def test_field_values_ref():
+    defs = {"Color": {"enum": ["red", "blue"]}}
+    assert field_values({"$ref": "#/$defs/Color"}, defs) == ["red", "blue"]
+
+
+def test_enumerate_parameters(bin_customizable: Customizable):
+    grid = list(enumerate_parameters(bin_customizable, samples=3))
+    assert len(grid) == 3 * 3 * 2 * 2
+    assert grid[0] == {
+        "width": 2,
+        "depth": 10.0,
+        "shape": "square",
+        "finish": "matte",
+        "label": "",
+    }
+    assert {item["depth"] for item in grid} == {5.0, 10.0, 15.0}
+    for item in grid:
+        BinParams.model_validate(item)
+
+
+def test_enumerate_parameters_required_field():
+    registry = collect([sys.modules[__name__]])
+    unbounded = registry.customizables[__name__]["unbounded_plate"]
+    with pytest.raises(ValueError):
+        list(enumerate_parameters(unbounded))
+
+
+def test_request_log(tmp_path: pathlib.Path, bin_customizable: Customizable):
+    log = RequestLog(tmp_path / "log.json")
+    log.record(bin_customizable, BinParams(width=1))
+    log.record(bin_customizable, BinParams(width=3))
+    log.record(bin_customizable, BinParams(width=3))
+    log.save()
+
+    loaded = RequestLog(tmp_path / "log.json")
+    assert loaded.total(bin_customizable) == 3
+    most_requested = loaded.most_requested(bin_customizable)
+    assert [count for _, count in most_requested] == [2, 1]
+    assert most_requested[0][0]["width"] == 3
+
+
+def test_request_log_aliases(tmp_path: pathlib.Path):
+    registry = collect([sys.modules[__name__]])
+    aliased = registry.customizables[__name__]["swept_lid"]
+    log = RequestLog(tmp_path / "log.json")
+    log.record(aliased, AliasedParams(boxWidth=3))
+    [(parameters, _)] = log.most_requested(aliased)
+    assert AliasedParams.model_validate(parameters).box_width == 3
+
+
+@pytest.fixture
+def pool(tmp_path: pathlib.Path) -> typing.Iterator[GeneratorPool]:
+    with GeneratorPool(
+        [__name__],
+        RepoConfig(),
+        max_workers=2,
+        result_cache=ResultCache(tmp_path / "results"),
+        request_log=RequestLog(tmp_path / "log.json"),
+    ) as generator_pool:
+        yield generator_pool
+
+
+def test_sweep(pool: GeneratorPool):
+    bin_customizable = pool.registry.customizables[__name__]["swept_bin"]
+    requested = BinParams(width=1, depth=7.5, label="popular")
+    pool.submit_validated(bin_customizable, requested).result()
+    pool.result_cache.disk_cache.evict(0)
+    assert pool.request_log.total(bin_customizable) == 1
+
+    sweeper = Sweeper(
+        pool,
+        request_log=pool.request_log,
+        budget=SweepBudget(max_variants=3),
+        samples=2,
+    )
+    report = sweeper.run()
+    assert report.generated == 3
+    assert report.exhausted
+    assert report.cpu_seconds > 0
+    # The most requested variant goes first, then the defaults
+    for params in (requested, BinParams()):
+        key = pool.result_cache.make_key(
+            bin_customizable, params, sweeper.export_formats[0]
+        )
+        assert pool.result_cache.get(key) is not None
+
+    # Sweeping again skips what is already cached
+    report = Sweeper(pool, budget=SweepBudget(max_variants=1), samples=2).run()
+    assert report.generated == 1
+    assert report.cached >= 1
+
+
+def test_sweep_without_result_cache():
+    with GeneratorPool([__name__], RepoConfig(), max_workers=1) as generator_pool:
+        with pytest.raises(ValueError):
+            Sweeper(generator_pool)
+
+
+def test_sweep_aliases(pool: GeneratorPool, tmp_path: pathlib.Path):
+    from build123d import import_brep
+
+    aliased = pool.registry.customizables[__name__]["swept_lid"]
+    params = AliasedParams(boxWidth=3)
+    pool.request_log.record(aliased, params)
+    report = Sweeper(
+        pool,
+        request_log=pool.request_log,
+        budget=SweepBudget(max_variants=1),
+        export_formats=(ExportFormat.BREP,),
+    ).run()
+    assert report.generated == 1
+    path = tmp_path / "swept.brep"
+    path.write_bytes(
+        pool.result_cache.get(
+            pool.result_cache.make_key(aliased, params, ExportFormat.BREP)
+        )
+    )
+    assert import_brep(path).bounding_box().size.X == pytest.approx(3)
@@ -165,6 +165,32 @@ def test_apply_repo_config_leaves_explicit_values():
     assert resolved.export_3mf is False
 
 
+def test_apply_repo_config_limits():
+    """apply_repo_config fills the execution limits the artifact doesn't set."""
+
+    def _dummy():
+        pass
+
+    artifact = Artifact(
+        module="test",
+        name="dummy",
+        func=_dummy,
+        sample=False,
+        export_step=True,
+        export_3mf=True,
+        timeout=5,
+    )
+    config = RepoConfig(
+        artifacts=ArtifactsConfig(
+            default_config=DefaultArtifactConfig(timeout=60, max_memory=1024)
+        )
+    )
+    resolved = apply_repo_config(artifact, config)
+    assert resolved.timeout == 5
+    assert resolved.cpu_time is None
+    assert resolved.max_memory == 1024
+
+
 def test_apply_repo_config_no_artifacts_section_uses_defaults():
     """When config.artifacts is None, DefaultArtifactConfig() defaults (True, True) are used."""
 
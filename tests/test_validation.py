@@ -0,0 +1,81 @@
+import sys
+
+import pytest
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import model_validator
+
+from mr import Customizable
+from mr import customizable
+from mr import FieldError
+from mr import GeneratorValidationError
+from mr.registry import collect
+from mr.validation import _validators
+from mr.validation import get_validator
+
+
+class Size(BaseModel):
+    width: float = Field(default=1, gt=0)
+    height: float = Field(default=1, gt=0)
+
+
+class PanelParams(BaseModel):
+    name: str = "panel"
+    size: Size = Size()
+    holes: list[int] = []
+
+    @model_validator(mode="after")
+    def check_holes(self) -> "PanelParams":
+        if len(self.holes) > 3:
+            raise ValueError("Too many holes")
+        return self
+
+
+@customizable
+def validated_panel(params: PanelParams):
+    pass
+
+
+@pytest.fixture
+def panel() -> Customizable:
+    return collect([sys.modules[__name__]]).customizables[__name__]["validated_panel"]
+
+
+def test_get_validator_cached(panel: Customizable):
+    validator = get_validator(panel)
+    assert get_validator(panel) is validator
+    assert validator.schema is PanelParams
+
+
+def test_collect_builds_validator(panel: Customizable):
+    assert panel.parameters_schema in _validators
+
+
+def test_validate_json(panel: Customizable):
+    validator = get_validator(panel)
+    params = validator.validate_json(b'{"size": {"width": 2}, "holes": [1, 2]}')
+    assert params == PanelParams(size=Size(width=2), holes=[1, 2])
+    assert validator.validate_python({"name": "x"}) == PanelParams(name="x")
+
+
+def test_validate_json_errors(panel: Customizable):
+    validator = get_validator(panel)
+    with pytest.raises(GeneratorValidationError) as exc_info:
+        validator.validate_json(b'{"size": {"width": -1}, "holes": [1, "x"]}')
+    assert exc_info.value.messages == ()
+    assert exc_info.value.fields == [
+        FieldError(("size", "width"), "Input should be greater than 0"),
+        FieldError(
+            ("holes", 1),
+            "Input should be a valid integer, unable to parse string as an integer",
+        ),
+    ]
+
+    with pytest.raises(GeneratorValidationError) as exc_info:
+        validator.validate_python({"holes": [1, 2, 3, 4]})
+    assert exc_info.value.messages == ("Value error, Too many holes",)
+    assert exc_info.value.fields == []
+
+    with pytest.raises(GeneratorValidationError) as exc_info:
+        validator.validate_json(b"{not json")
+    assert len(exc_info.value.messages) == 1